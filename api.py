@@ -0,0 +1,289 @@
+"""Versioned JSON API for integrations, under /api/v1.
+
+Requests authenticate with an API token (Authorization: Bearer <token>,
+created with api_tokens.py), not the browser session. Lists are paged with
+opaque cursors, fields= picks the columns returned and updated_since= keeps
+only tickets that changed since a given time.
+"""
+
+import base64
+import json
+import os
+from datetime import datetime
+
+import config  # noqa: F401 - loads .env
+from flask import Blueprint, abort, current_app, g, jsonify, request, url_for
+from werkzeug.exceptions import HTTPException
+
+from database_operations import (
+    TICKET_FIELDS,
+    TICKET_STATUSES,
+    get_api_token_user,
+    get_categories,
+    get_comments_page,
+    get_ticket,
+    get_ticket_changes,
+    insert_comment,
+    insert_ticket,
+    is_ticket_archived,
+    update_ticket,
+)
+from models import Comment
+
+API_PAGE_SIZE = int(os.getenv("API_PAGE_SIZE", 50))
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 500))
+
+COMMENT_FIELDS = Comment._fields
+# Lists leave out descriptions unless fields= asks for them
+LIST_TICKET_FIELDS = tuple(f for f in TICKET_FIELDS if f != "description")
+
+api = Blueprint("api", __name__, url_prefix="/api/v1")
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Reverses encode_cursor, aborting with 400 if cursor was tampered with."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        abort(400, description="Invalid cursor.")
+
+
+def requested_fields(allowed, default):
+    """Reads fields= (comma separated), rejecting names not in allowed."""
+    value = request.args.get("fields")
+    if not value:
+        return default
+    fields = tuple(dict.fromkeys(f.strip() for f in value.split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown or not fields:
+        abort(
+            400,
+            description=f"Unknown fields {unknown}; choose from {list(allowed)}.",
+        )
+    return fields
+
+
+def parse_timestamp(value):
+    """Turns an ISO 8601 time into the database's local "YYYY-MM-DD HH:MM:SS"."""
+    # fromisoformat only accepts a Z suffix from Python 3.11
+    if value[-1:] in ("Z", "z"):
+        value = value[:-1] + "+00:00"
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        abort(400, description="updated_since must be an ISO 8601 timestamp.")
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def page_limit():
+    limit = request.args.get("limit", API_PAGE_SIZE, type=int)
+    return max(1, min(limit, API_MAX_PAGE_SIZE))
+
+
+def json_body(*required):
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description="Expected a JSON object.")
+    missing = [name for name in required if name not in body]
+    if missing:
+        abort(400, description=f"Missing fields {missing}.")
+    return body
+
+
+def text(body, name):
+    value = body[name]
+    if not isinstance(value, str) or not value.strip():
+        abort(400, description=f"{name} must be a non-empty string.")
+    return value.strip()
+
+
+def category(body):
+    value = body["category_id"]
+    if type(value) is not int or value not in dict(get_categories()):
+        abort(400, description="Unknown category_id.")
+    return value
+
+
+def is_admin():
+    return g.api_user.role == "admin"
+
+
+def visible_ticket(ticket_id):
+    """Returns the ticket if the token's user may see it, else aborts with 404."""
+    ticket = get_ticket(ticket_id)
+    if ticket is None or not (is_admin() or ticket.user_id == g.api_user.user_id):
+        abort(404, description="Ticket not found.")
+    return ticket
+
+
+def project(row, fields):
+    values = row._asdict()
+    return {field: values[field] for field in fields}
+
+
+@api.before_request
+def authenticate():
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    user = get_api_token_user(token.strip()) if scheme.lower() == "bearer" else None
+    if user is None:
+        abort(401, description="A valid API token is required.")
+    g.api_user = user
+
+
+def http_error(e):
+    response = jsonify({"error": e.description})
+    response.status_code = e.code
+    if e.code == 401:
+        response.headers["WWW-Authenticate"] = "Bearer"
+    if getattr(e, "retry_after", None):
+        response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+@api.errorhandler(Exception)
+def unhandled_error(e):
+    current_app.logger.exception("Unhandled API error on %s", request.path)
+    return jsonify({"error": "Internal server error."}), 500
+
+
+@api.route("/tickets")
+def list_tickets():
+    after = request.args.get("cursor")
+    after = decode_cursor(after) if after else None
+    if after is not None and type(after) is not int:
+        abort(400, description="Invalid cursor.")
+    status = request.args.get("status") or None
+    if status not in (None, *TICKET_STATUSES):
+        abort(400, description=f"status must be one of {list(TICKET_STATUSES)}.")
+    updated_since = request.args.get("updated_since")
+
+    page = get_ticket_changes(
+        fields=requested_fields(TICKET_FIELDS, LIST_TICKET_FIELDS),
+        user_id=None if is_admin() else g.api_user.user_id,
+        status=status,
+        category_id=request.args.get("category_id", type=int),
+        updated_since=parse_timestamp(updated_since) if updated_since else None,
+        after=after,
+        limit=page_limit(),
+    )
+    # With no new rows the client keeps polling from where it was
+    last = page["last"] or after
+    return jsonify(
+        {
+            "tickets": page["tickets"],
+            "has_more": page["has_more"],
+            "next_cursor": encode_cursor(last) if last else None,
+        }
+    )
+
+
+@api.route("/tickets", methods=["POST"])
+def create_ticket():
+    body = json_body("title", "description", "category_id")
+    ticket_id = insert_ticket(
+        g.api_user.user_id,
+        category(body),
+        text(body, "title"),
+        text(body, "description"),
+    )
+    current_app.logger.info(
+        "Ticket %s created through the API by user %s", ticket_id, g.api_user.user_id
+    )
+    response = jsonify(project(get_ticket(ticket_id), TICKET_FIELDS))
+    response.status_code = 201
+    response.headers["Location"] = url_for("api.ticket", ticket_id=ticket_id)
+    return response
+
+
+@api.route("/tickets/<int:ticket_id>")
+def ticket(ticket_id):
+    fields = requested_fields(TICKET_FIELDS, TICKET_FIELDS)
+    return jsonify(project(visible_ticket(ticket_id), fields))
+
+
+@api.route("/tickets/<int:ticket_id>", methods=["PATCH"])
+def patch_ticket(ticket_id):
+    """Admins may change any field; a ticket's owner may edit it and close it."""
+    visible_ticket(ticket_id)
+    if is_ticket_archived(ticket_id):
+        abort(409, description="Archived tickets can't be changed.")
+    body = json_body()
+    changes = {}
+    for name in ("title", "description"):
+        if name in body:
+            changes[name] = text(body, name)
+    if "category_id" in body:
+        changes["category_id"] = category(body)
+    if "status" in body:
+        if body["status"] not in TICKET_STATUSES:
+            abort(400, description=f"status must be one of {list(TICKET_STATUSES)}.")
+        if not is_admin() and body["status"] != "closed":
+            abort(403, description="Only admins can reopen or progress tickets.")
+        changes["status"] = body["status"]
+    if not changes:
+        abort(400, description="Nothing to update.")
+
+    if not update_ticket(ticket_id, changes):
+        abort(404, description="Ticket not found.")
+    current_app.logger.info(
+        "Ticket %s updated through the API by user %s: %s",
+        ticket_id,
+        g.api_user.user_id,
+        sorted(changes),
+    )
+    return jsonify(project(get_ticket(ticket_id), TICKET_FIELDS))
+
+
+@api.route("/tickets/<int:ticket_id>/comments")
+def list_comments(ticket_id):
+    visible_ticket(ticket_id)
+    after = request.args.get("cursor")
+    after = decode_cursor(after) if after else 0
+    if type(after) is not int:
+        abort(400, description="Invalid cursor.")
+    fields = requested_fields(COMMENT_FIELDS, COMMENT_FIELDS)
+
+    comments, has_more = get_comments_page(ticket_id, after=after, limit=page_limit())
+    last = comments[-1].comment_id if comments else after
+    return jsonify(
+        {
+            "comments": [project(comment, fields) for comment in comments],
+            "has_more": has_more,
+            "next_cursor": encode_cursor(last),
+        }
+    )
+
+
+@api.route("/tickets/<int:ticket_id>/comments", methods=["POST"])
+def create_comment(ticket_id):
+    visible_ticket(ticket_id)
+    if is_ticket_archived(ticket_id):
+        abort(409, description="Archived tickets can't be commented on.")
+    message = text(json_body("message"), "message")
+    comment_id = insert_comment(ticket_id, g.api_user.user_id, message)
+    current_app.logger.info(
+        "Comment added to ticket %s through the API by user %s",
+        ticket_id,
+        g.api_user.user_id,
+    )
+    comments, _ = get_comments_page(ticket_id, after=comment_id - 1, limit=1)
+    if not comments or comments[0].comment_id != comment_id:
+        # The ticket, and the comment with it, was deleted in the meantime
+        abort(404, description="Ticket not found.")
+    return jsonify(project(comments[0], COMMENT_FIELDS)), 201
+
+
+# By status code too: the app's HTML handlers for codes would otherwise win
+for code in (400, 401, 403, 404, 405, 422, 429, 500):
+    api.register_error_handler(code, http_error)
+api.register_error_handler(HTTPException, http_error)
+
+
+def register_api(app):
+    app.register_blueprint(api)
@@ -0,0 +1,62 @@
+"""Creates, lists and revokes tokens for the /api/v1 JSON API.
+
+    python api_tokens.py create admin1 --name chatops-bot
+    python api_tokens.py list
+    python api_tokens.py revoke 3
+
+A token acts as the user it was created for, with that user's role. It is
+printed once, when created; only a hash of it is stored.
+"""
+
+import argparse
+import sys
+
+from database_operations import (
+    create_api_token,
+    get_api_tokens,
+    init_db,
+    revoke_api_token,
+)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage API tokens.")
+    actions = parser.add_subparsers(dest="action", required=True)
+    create = actions.add_parser("create", help="create a token for a user")
+    create.add_argument("username")
+    create.add_argument("--name", default="api", help="what the token is for")
+    listing = actions.add_parser("list", help="list tokens (not their values)")
+    listing.add_argument("username", nargs="?")
+    revoke = actions.add_parser("revoke", help="delete a token")
+    revoke.add_argument("token_id", type=int)
+    args = parser.parse_args(argv)
+
+    init_db()
+    if args.action == "create":
+        created = create_api_token(args.username, args.name)
+        if created is None:
+            print(f"No user named '{args.username}'.", file=sys.stderr)
+            return 1
+        token_id, token = created
+        print(
+            f"Token {token_id} for {args.username} (shown only once):", file=sys.stderr
+        )
+        print(token)
+        return 0
+
+    if args.action == "list":
+        for token in get_api_tokens(args.username):
+            print(
+                f"{token.token_id}\t{token.username}\t{token.name}\t{token.created_at}"
+            )
+        return 0
+
+    if not revoke_api_token(args.token_id):
+        print(f"No token with id {args.token_id}.", file=sys.stderr)
+        return 1
+    print(f"Token {args.token_id} revoked.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,60 @@
 from flask import (
     Flask,
     render_template,
+    stream_template,
     request,
     redirect,
     session,
     url_for,
     flash,
     jsonify,
+    abort,
 )
 from database_operations import (
     insert_ticket,
     get_user,
-    get_tickets_for_user,
-    get_all_tickets,
-    get_ticket,
-    get_comments_for_ticket,
+    get_tickets_page,
+    iter_tickets,
+    get_ticket_details,
+    get_comments_page,
+    is_ticket_archived,
     get_categories,
+    get_ticket_counts,
+    get_change_bounds,
     close_ticket,
     insert_comment,
     delete_ticket,
     update_ticket_status,
     insert_user,
     username_exists,
+    usernames_exist,
+    sync_username_index,
+    USERNAME_BATCH_LIMIT,
+    reference_cache_stats,
+    search_tickets,
+    SNIPPET_START,
+    SNIPPET_END,
+    TICKET_STATUSES,
+    TICKET_SORTS,
+    init_db,
+    get_db_connection,
 )
+from markupsafe import Markup, escape
+from password_hashing import HashingBusy
 from logger import configure_logging
 from error_handlers import register_error_handlers
+from metrics import register_metrics
+from api import register_api
+from events import register_events
+from archive import register_archive
+from rate_limit import rate_limited
+from static_assets import register_static_assets
+from template_cache import register_template_caches
+from setup_db import seed_sample_data
+from startup import phase, summary
+import itertools
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
+import config  # noqa: F401 - loads .env
 
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY")
@@ -37,10 +63,36 @@ DEBUG = ENV == "development"
 HOST = os.getenv("HOST", "127.0.0.1")
 PORT = int(os.getenv("PORT", 5000))
 DB_NAME = os.getenv("DB_NAME", "app.db")
+# Streamed pages are sent in pieces of about this many characters
+STREAM_BUFFER_CHARS = int(os.getenv("STREAM_BUFFER_CHARS", 8192))
+# Fill an empty database with the sample data on start (the demo deployment)
+SEED_SAMPLE_DATA = os.getenv("SEED_SAMPLE_DATA", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
 
 
-configure_logging()
-register_error_handlers(app)
+with phase("logging"):
+    configure_logging()
+with phase("extensions"):
+    register_error_handlers(app)
+    register_metrics(app)
+    register_api(app)
+    register_events(app)
+    register_archive(app)
+    register_template_caches(app)
+with phase("static assets"):
+    register_static_assets(app)
+with phase("migrations"):
+    init_db()
+if SEED_SAMPLE_DATA:
+    with phase("sample data"):
+        if seed_sample_data(get_db_connection()):
+            app.logger.info("Empty database filled with the sample data.")
+with phase("username index"):
+    sync_username_index()
+app.logger.info("App initialised: %s", summary())
 
 
 @app.context_processor
@@ -52,12 +104,23 @@ def inject_user():
     )
 
 
+@app.template_filter("highlight")
+def highlight(snippet):
+    """Escapes a search snippet and wraps its matched terms in <mark> tags."""
+    return (
+        escape(snippet)
+        .replace(SNIPPET_START, Markup("<mark>"))
+        .replace(SNIPPET_END, Markup("</mark>"))
+    )
+
+
 @app.route("/")
 def home():
     return render_template("login.html")
 
 
 @app.route("/login", methods=["POST"])
+@rate_limited("login")
 def login():
     try:
         username = request.form.get("username", "").strip()
@@ -71,22 +134,28 @@ def login():
         user = get_user(username, password)
 
         if user:
-            session["user_id"] = user[0]
-            session["username"] = username
-            session["role"] = user[1]
-            app.logger.info(f"User '{username}' logged in successfully.")
+            session["user_id"] = user.user_id
+            session["username"] = user.username
+            session["role"] = user.role
+            app.logger.info("User '%s' logged in successfully.", username)
             return redirect(url_for("dashboard"))
         else:
             flash("Incorrect username or password.", "error")
-            app.logger.warning(f"Login failed for username: {username}")
+            app.logger.warning("Login failed for username: %s", username)
             return redirect(url_for("home"))
 
+    except HashingBusy:
+        app.logger.warning("Login rejected: password hashing pool is saturated.")
+        flash("The service is busy. Please try again in a moment.", "error")
+        return render_template("login.html"), 503, {"Retry-After": "1"}
+
     except Exception:
         app.logger.exception("Unexpected error during login.")
         return render_template("error.html", message="Something went wrong."), 500
 
 
 @app.route("/signup", methods=["GET", "POST"])
+@rate_limited("signup", methods=("POST",))
 def signup():
     if request.method == "POST":
         username = request.form.get("username", "").strip()
@@ -102,28 +171,35 @@ def signup():
 
         if password != confirm_password:
             flash("Passwords do not match.", "error")
-            app.logger.warning(f"Password mismatch for '{username}'")
+            app.logger.warning("Password mismatch for '%s'", username)
             return render_template("signup.html")
 
         if len(password) < 6:
             flash("Password must be at least 6 characters.", "error")
-            app.logger.warning(f"Weak password on signup for '{username}'")
+            app.logger.warning("Weak password on signup for '%s'", username)
             return render_template("signup.html")
 
-        success = insert_user(username, email, password, role)
+        try:
+            success = insert_user(username, email, password, role)
+        except HashingBusy:
+            app.logger.warning("Signup rejected: password hashing pool is saturated.")
+            flash("The service is busy. Please try again in a moment.", "error")
+            return render_template("signup.html"), 503, {"Retry-After": "1"}
+
         if success:
-            app.logger.info(f"User '{username}' registered.")
+            app.logger.info("User '%s' registered.", username)
             flash("Account created! Please log in.", "success")
             return redirect(url_for("home"))
         else:
             flash("Username or email already exists.", "error")
-            app.logger.warning(f"Signup failed for '{username}' — duplicate.")
+            app.logger.warning("Signup failed for '%s' — duplicate.", username)
             return render_template("signup.html")
 
     return render_template("signup.html")
 
 
 @app.route("/check_username")
+@rate_limited("check_username")
 def check_username():
     username = request.args.get("username", "").strip()
     if not username:
@@ -133,6 +209,64 @@ def check_username():
     return jsonify({"exists": exists})
 
 
+@app.route("/check_usernames", methods=["POST"])
+@rate_limited("check_usernames")
+def check_usernames():
+    payload = request.get_json(silent=True) or {}
+    usernames = payload.get("usernames")
+    if (
+        not isinstance(usernames, list)
+        or len(usernames) > USERNAME_BATCH_LIMIT
+        or not all(isinstance(u, str) for u in usernames)
+    ):
+        return jsonify({"error": "Expected a list of usernames."}), 400
+
+    results = usernames_exist([u.strip() for u in usernames if u.strip()])
+    return jsonify({"results": results})
+
+
+def dashboard_filters():
+    """Reads the dashboard's filter query parameters, rejecting bad values."""
+    filters = {
+        "status": request.args.get("status") or None,
+        "category_id": request.args.get("category", type=int),
+        "username": request.args.get("user", "").strip() or None,
+        "sort": request.args.get("sort", "newest"),
+    }
+    if filters["status"] not in (None, *TICKET_STATUSES):
+        abort(400)
+    if filters["sort"] not in TICKET_SORTS:
+        abort(400)
+    return filters
+
+
+def guard_stream(rows, state):
+    """Yields rows; if reading fails mid-stream, logs it and ends the list early.
+
+    By then the 200 status and half the page are already sent, so an error
+    page is no longer possible; state["failed"] lets the template say so.
+    """
+    try:
+        yield from rows
+    except Exception:
+        app.logger.exception("Ticket list stream failed part way through.")
+        state["failed"] = True
+
+
+def buffered(chunks, size=None):
+    """Joins Jinja's many small chunks into pieces worth a write each."""
+    size = size or STREAM_BUFFER_CHARS
+    pending, length = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(pending)
+            pending, length = [], 0
+    if pending:
+        yield "".join(pending)
+
+
 @app.route("/dashboard")
 def dashboard():
     if "user_id" not in session:
@@ -140,17 +274,103 @@ def dashboard():
         app.logger.warning("Unauthorized dashboard access.")
         return redirect(url_for("home"))
 
+    filters = dashboard_filters()
+    # Read before the tickets, so the live feed replays anything in between
+    _, events_since = get_change_bounds()
     if session["role"] == "admin":
-        tickets = get_all_tickets()
+        query = dict(filters)
     else:
-        tickets = get_tickets_for_user(session["user_id"])
+        query = {
+            "user_id": session["user_id"],
+            "include_closed": False,
+            "sort": filters["sort"],
+        }
+
+    try:
+        page = get_tickets_page(
+            after=request.args.get("after"),
+            before=request.args.get("before"),
+            **query,
+        )
+    except ValueError:
+        app.logger.warning("Dashboard request with an invalid page cursor.")
+        abort(400)
+
+    if session["role"] == "admin":
+        return render_template(
+            "admin_dashboard.html",
+            tickets=page["tickets"],
+            page=page,
+            filters=filters,
+            statuses=TICKET_STATUSES,
+            sorts=TICKET_SORTS,
+            categories=get_categories(),
+            counts=get_ticket_counts(),
+            events_since=events_since,
+        )
 
     return render_template(
-        "admin_dashboard.html" if session["role"] == "admin" else "user_dashboard.html",
-        tickets=tickets,
+        "user_dashboard.html",
+        tickets=page["tickets"],
+        page=page,
+        # Users see only their own open tickets; only the sort carries over
+        filters=dict(filters, status=None, category_id=None, username=None),
+        events_since=events_since,
     )
 
 
+@app.route("/dashboard/all")
+def all_tickets():
+    """Every ticket matching the dashboard filters, streamed as it is read."""
+    if session.get("role") != "admin":
+        flash("Only admins can list every ticket.", "error")
+        app.logger.warning("Unauthorized all-tickets access.")
+        return redirect(url_for("home"))
+
+    filters = dashboard_filters()
+    tickets = iter_tickets(**filters)
+    # Run the query before anything is sent, so a failure here still gets
+    # the normal error page and status code
+    first = next(tickets, None)
+    rows = tickets if first is None else itertools.chain([first], tickets)
+
+    state = {"failed": False}
+    response = app.response_class(
+        buffered(
+            stream_template(
+                "ticket_list.html",
+                tickets=guard_stream(rows, state),
+                state=state,
+                filters=filters,
+            )
+        ),
+        mimetype="text/html",
+        # Tell proxies such as nginx to pass chunks on rather than buffer
+        headers={"X-Accel-Buffering": "no"},
+    )
+    # Ends the read transaction when the client goes away mid-list, rather
+    # than whenever the generator is collected; an open snapshot holds up
+    # WAL checkpoints
+    response.call_on_close(tickets.close)
+    return response
+
+
+@app.route("/search")
+def search():
+    if "user_id" not in session:
+        flash("Please log in to search tickets.", "error")
+        return redirect(url_for("home"))
+
+    query = request.args.get("q", "").strip()
+    results = []
+    if query:
+        # Same visibility as /dashboard: admins see everything
+        user_id = None if session["role"] == "admin" else session["user_id"]
+        results = search_tickets(query, user_id=user_id)
+
+    return render_template("search.html", query=query, results=results)
+
+
 @app.route("/create_ticket", methods=["GET", "POST"])
 def create_ticket():
     if "user_id" not in session:
@@ -168,7 +388,7 @@ def create_ticket():
         if not all([title, description, category_id]):
             flash("All fields are required to submit a ticket.", "error")
             app.logger.warning(
-                f"Ticket submission failed — missing fields (user {user_id})"
+                "Ticket submission failed — missing fields (user %s)", user_id
             )
             return render_template(
                 "create_ticket.html",
@@ -180,7 +400,7 @@ def create_ticket():
 
         try:
             insert_ticket(user_id, category_id, title, description)
-            app.logger.info(f"Ticket created by user {user_id}: '{title}'")
+            app.logger.info("Ticket created by user %s: '%s'", user_id, title)
             return redirect(
                 url_for(
                     "ticket_submitted",
@@ -191,7 +411,7 @@ def create_ticket():
             )
 
         except Exception:
-            app.logger.exception(f"Ticket creation failed for user {user_id}")
+            app.logger.exception("Ticket creation failed for user %s", user_id)
             flash("Something went wrong while creating your ticket.", "error")
             return render_template(
                 "create_ticket.html",
@@ -229,13 +449,46 @@ def ticket_submitted():
 
 @app.route("/ticket/<int:ticket_id>")
 def ticket_details(ticket_id):
-    ticket = get_ticket(ticket_id)
-    if not ticket:
-        app.logger.warning(f"Ticket {ticket_id} not found.")
+    details = get_ticket_details(ticket_id, before=request.args.get("before", type=int))
+    if not details:
+        app.logger.warning("Ticket %s not found.", ticket_id)
         return render_template("error.html", message="Ticket not found."), 404
 
-    comments = get_comments_for_ticket(ticket_id)
-    return render_template("ticket_details.html", ticket=ticket, comments=comments)
+    return render_template(
+        "ticket_details.html",
+        ticket=details["ticket"],
+        comments=details["comments"],
+        has_older=details["has_older"],
+        archived=details["archived"],
+    )
+
+
+@app.route("/ticket/<int:ticket_id>/comments")
+def ticket_comments(ticket_id):
+    if "user_id" not in session:
+        return jsonify({"error": "Login required."}), 401
+
+    after = request.args.get("after", type=int)
+    before = request.args.get("before", type=int)
+    if after is None and before is None:
+        return jsonify({"error": "Pass an 'after' or 'before' comment id."}), 400
+
+    comments, has_more = get_comments_page(ticket_id, after=after, before=before)
+    return jsonify(
+        {
+            "comments": [
+                {
+                    "comment_id": comment.comment_id,
+                    "user_id": comment.user_id,
+                    "message": comment.message,
+                    "created_at": comment.created_at,
+                    "username": comment.username,
+                }
+                for comment in comments
+            ],
+            "has_more": has_more,
+        }
+    )
 
 
 @app.route("/delete_ticket/<int:ticket_id>", methods=["POST"])
@@ -245,7 +498,7 @@ def delete_ticket_route(ticket_id):
         return redirect(url_for("home"))
 
     delete_ticket(ticket_id)
-    app.logger.info(f"Ticket {ticket_id} deleted by admin {session['user_id']}")
+    app.logger.info("Ticket %s deleted by admin %s", ticket_id, session["user_id"])
     return redirect(url_for("dashboard"))
 
 
@@ -257,12 +510,15 @@ def update_ticket_status_route(ticket_id):
 
     new_status = request.form.get("status")
     if new_status not in ["open", "in progress", "closed"]:
-        app.logger.warning(f"Invalid ticket status '{new_status}'")
+        app.logger.warning("Invalid ticket status '%s'", new_status)
         return redirect(url_for("ticket_details", ticket_id=ticket_id))
 
     update_ticket_status(ticket_id, new_status)
     app.logger.info(
-        f"Ticket {ticket_id} updated to '{new_status}' by admin {session['user_id']}"
+        "Ticket %s updated to '%s' by admin %s",
+        ticket_id,
+        new_status,
+        session["user_id"],
     )
     return redirect(url_for("ticket_details", ticket_id=ticket_id))
 
@@ -281,8 +537,12 @@ def add_comment():
         app.logger.warning("Comment submission failed — missing message or ticket ID.")
         return redirect(url_for("ticket_details", ticket_id=ticket_id))
 
+    if is_ticket_archived(ticket_id):
+        flash("Archived tickets can't be commented on.", "error")
+        return redirect(url_for("ticket_details", ticket_id=ticket_id))
+
     insert_comment(ticket_id, user_id, message)
-    app.logger.info(f"Comment added to ticket {ticket_id} by user {user_id}")
+    app.logger.info("Comment added to ticket %s by user %s", ticket_id, user_id)
     return redirect(url_for("ticket_details", ticket_id=ticket_id))
 
 
@@ -293,10 +553,17 @@ def confirm_close_ticket(ticket_id):
         return redirect(url_for("home"))
 
     close_ticket(ticket_id)
-    app.logger.info(f"Ticket {ticket_id} closed by user {session['user_id']}")
+    app.logger.info("Ticket %s closed by user %s", ticket_id, session["user_id"])
     return redirect(url_for("dashboard"))
 
 
+@app.route("/cache_stats")
+def cache_stats():
+    if "user_id" not in session or session["role"] != "admin":
+        abort(403)
+    return jsonify(reference_cache_stats())
+
+
 @app.route("/logout")
 def logout():
     session.clear()
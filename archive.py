@@ -0,0 +1,98 @@
+"""Archival of long-closed tickets, and the admin view of the archive at /archive.
+
+Every ARCHIVE_INTERVAL seconds each process moves tickets closed for more
+than ARCHIVE_AFTER_DAYS, with their comments, to the archive tables (see
+archive_closed_tickets). Batches run one after another with
+ARCHIVE_BATCH_PAUSE seconds between them, so a large backlog never holds
+the write lock for long. Several workers archiving at once only take turns.
+The same thread then prunes the live-update change log of entries older
+than CHANGES_RETENTION_DAYS (see prune_changes).
+
+Archived tickets stay readable at /ticket/<id> and through the API, but
+can no longer be changed or commented on.
+"""
+
+import os
+import threading
+
+import config  # noqa: F401 - loads .env
+from flask import flash, redirect, render_template, request, session, url_for
+
+from database_operations import (
+    ARCHIVE_AFTER_DAYS,
+    archive_closed_tickets,
+    get_archived_tickets_page,
+    prune_changes,
+)
+
+# Seconds between archival runs; 0 turns automatic archival off
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", 3600))
+ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", 0.05))
+
+_archiver = {"pid": None}
+_archiver_lock = threading.Lock()
+
+
+def run_archiver(app, stop, interval=None):
+    """Archives, then prunes old changes, every interval seconds until stop is set."""
+    interval = interval or ARCHIVE_INTERVAL
+    while not stop.wait(interval):
+        try:
+            archived = archive_closed_tickets(pause=ARCHIVE_BATCH_PAUSE)
+        except Exception:
+            app.logger.exception("Archiving closed tickets failed.")
+        else:
+            if archived:
+                app.logger.info(
+                    "Archived %s tickets closed over %g days ago.",
+                    archived,
+                    ARCHIVE_AFTER_DAYS,
+                )
+        try:
+            pruned = prune_changes()
+        except Exception:
+            app.logger.exception("Pruning old changes failed.")
+        else:
+            if pruned:
+                app.logger.info("Pruned %s old changes.", pruned)
+
+
+def start_archiver(app):
+    """Starts this process's archiver thread, once; returns its stop event.
+
+    Called on each request rather than at import, because a thread started
+    in a gunicorn master doesn't survive the fork into its workers.
+    """
+    if _archiver["pid"] == os.getpid():
+        return _archiver["stop"]
+    with _archiver_lock:
+        if _archiver["pid"] != os.getpid():
+            stop = threading.Event()
+            threading.Thread(
+                target=run_archiver, args=(app, stop), name="archiver", daemon=True
+            ).start()
+            _archiver.update(pid=os.getpid(), stop=stop)
+    return _archiver["stop"]
+
+
+def register_archive(app):
+    if ARCHIVE_INTERVAL > 0:
+
+        @app.before_request
+        def ensure_archiver():
+            start_archiver(app)
+
+    @app.route("/archive")
+    def archive():
+        if session.get("role") != "admin":
+            flash("Only admins can browse the archive.", "error")
+            app.logger.warning("Unauthorized archive access.")
+            return redirect(url_for("home"))
+
+        page = get_archived_tickets_page(after=request.args.get("after", type=int))
+        return render_template(
+            "archive.html",
+            tickets=page["tickets"],
+            page=page,
+            archive_after_days=ARCHIVE_AFTER_DAYS,
+        )
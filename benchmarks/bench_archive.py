@@ -0,0 +1,185 @@
+"""Hot-path latency before and after archiving closed tickets, and while archiving.
+
+Run from the project root:
+
+    python -m benchmarks.bench_archive --scale small
+    python -m benchmarks.bench_archive --scale medium --days 180
+
+Times the everyday queries against a scratch copy of a synthetic dataset
+(see benchmarks/dataset.py), archives every ticket closed more than --days
+ago, optimizes the search indexes, and times them again on the same live
+tickets. While the archival runs, another thread keeps adding comments,
+to show how long a writer waits behind each batch.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+
+import database_operations as db
+from archive import ARCHIVE_BATCH_PAUSE
+from benchmarks.bench_database_operations import copy_dataset
+from benchmarks.dataset import SCALES, ensure_dataset
+
+ROUNDS = 5
+CALLS = 200
+
+
+def hot_paths(ticket_ids, user_id, written):
+    """(label, callable) for the queries pages make on every request.
+
+    Comments go to the ticket written, so the reads see the same rows in
+    both runs.
+    """
+    picks = iter(ticket_ids * CALLS)
+    return [
+        ("get_ticket", lambda: db.get_ticket(next(picks))),
+        ("get_ticket_details", lambda: db.get_ticket_details(next(picks))),
+        ("dashboard, first page", lambda: db.get_tickets_page()),
+        ("dashboard, closed", lambda: db.get_tickets_page(status="closed")),
+        (
+            "user dashboard",
+            lambda: db.get_tickets_page(user_id=user_id, include_closed=False),
+        ),
+        ("search", lambda: db.search_tickets("printer")),
+        ("insert_comment", lambda: db.insert_comment(written, user_id, "Bench")),
+    ]
+
+
+def median_ms(call, calls=CALLS):
+    rounds = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(calls):
+            call()
+        rounds.append((time.perf_counter() - start) / calls * 1000)
+    return statistics.median(rounds)
+
+
+def all_tickets_ms():
+    """The streamed admin list of every ticket, which reads the whole table."""
+    return median_ms(lambda: sum(1 for _ in db.iter_tickets()), calls=1)
+
+
+def archive_with_writer(days, batch_size, ticket_id, user_id):
+    """Archives while another thread writes; returns (archived, batches, writes)."""
+    batches = []
+    archive_batch = db._archive_batch
+
+    def timed_batch(cutoff, size):
+        start = time.perf_counter()
+        moved = archive_batch(cutoff, size)
+        batches.append((time.perf_counter() - start) * 1000)
+        return moved
+
+    done = threading.Event()
+    writes = []
+
+    def writer():
+        while not done.is_set():
+            start = time.perf_counter()
+            db.insert_comment(ticket_id, user_id, "Written during archival")
+            writes.append((time.perf_counter() - start) * 1000)
+        db.close_db_connections()
+
+    db._archive_batch = timed_batch
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        archived = db.archive_closed_tickets(
+            days=days, batch_size=batch_size, pause=ARCHIVE_BATCH_PAUSE
+        )
+    finally:
+        done.set()
+        thread.join()
+        db._archive_batch = archive_batch
+    return archived, batches, writes
+
+
+def checkpoint():
+    db.get_db_connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[int(share * (len(ordered) - 1))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--days", type=float, default=db.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=db.ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    dataset = ensure_dataset(SCALES[args.scale])
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        copy_dataset(dataset, db.DB_NAME)
+        db.init_db()
+        conn = db.get_db_connection()
+        # Open tickets are never archived, so both runs read the same rows
+        live = [
+            ticket_id
+            for ticket_id, in conn.execute(
+                "SELECT ticket_id FROM tickets WHERE status = 'open' "
+                "ORDER BY random() LIMIT 101"
+            )
+        ]
+        # The writer during archival gets a ticket of its own
+        written = live.pop()
+        (user_id,) = conn.execute(
+            "SELECT user_id FROM tickets WHERE ticket_id = ?", (live[0],)
+        ).fetchone()
+        before_rows = conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]
+
+        checkpoint()
+        before = {
+            label: median_ms(call) for label, call in hot_paths(live, user_id, written)
+        }
+        before["all tickets, streamed"] = all_tickets_ms()
+
+        started = time.perf_counter()
+        archived, batches, writes = archive_with_writer(
+            args.days, args.batch_size, written, user_id
+        )
+        archive_seconds = time.perf_counter() - started
+        # As `setup_db.py --archive` does, so searches skip the archived rows
+        started = time.perf_counter()
+        db.optimize_search_index()
+        optimize_seconds = time.perf_counter() - started
+        # Both runs read from the main file, not a WAL full of the moves
+        checkpoint()
+
+        after = {
+            label: median_ms(call) for label, call in hot_paths(live, user_id, written)
+        }
+        after["all tickets, streamed"] = all_tickets_ms()
+        db.close_db_connections()
+
+    print(
+        f"archived {archived} of {before_rows} tickets in {archive_seconds:.2f} s, "
+        f"{len(batches)} batches of up to {args.batch_size}"
+    )
+    if batches:
+        print(
+            f"batch transaction: median {statistics.median(batches):.1f} ms, "
+            f"max {max(batches):.1f} ms"
+        )
+    print(f"optimize_search_index: {optimize_seconds:.2f} s")
+    print(
+        f"comment writes meanwhile: {len(writes)}, "
+        f"p50 {percentile(writes, 0.5):.2f} ms, p99 {percentile(writes, 0.99):.2f} ms, "
+        f"max {max(writes, default=0):.2f} ms"
+    )
+    print(f"\n{'(ms)':<26}{'before':>10}{'after':>10}{'change':>9}")
+    for label in before:
+        change = (after[label] / before[label] - 1) * 100
+        print(f"{label:<26}{before[label]:>10.3f}{after[label]:>10.3f}{change:>8.0f}%")
+
+
+if __name__ == "__main__":
+    main()
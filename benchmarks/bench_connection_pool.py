@@ -0,0 +1,61 @@
+"""Per-query overhead of a fresh connection versus the pooled connection.
+
+Run from the project root:
+
+    python -m benchmarks.bench_connection_pool
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+import database_operations
+from db_migrations import apply_migrations
+
+QUERIES = 5000
+
+
+def fresh_connection_query(db_name, ticket_id):
+    conn = sqlite3.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,))
+    row = cursor.fetchone()
+    conn.close()
+    return row
+
+
+def time_per_query(func):
+    start = time.perf_counter()
+    for i in range(QUERIES):
+        func(i % 100 + 1)
+    return (time.perf_counter() - start) / QUERIES * 1_000_000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_name)
+        apply_migrations(conn)
+        conn.executemany(
+            "INSERT INTO tickets (user_id, category_id, title, description, status) "
+            "VALUES (1, 1, ?, 'benchmark row', 'open')",
+            [(f"Ticket {i}",) for i in range(100)],
+        )
+        conn.commit()
+        conn.close()
+
+        database_operations.DB_NAME = db_name
+
+        before = time_per_query(lambda i: fresh_connection_query(db_name, i))
+        after = time_per_query(database_operations.get_ticket)
+        database_operations.close_db_connections()
+
+    print(f"{'mode':<20}{'us/query':>10}")
+    print(f"{'fresh connection':<20}{before:>10.1f}")
+    print(f"{'pooled connection':<20}{after:>10.1f}")
+    print(f"speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,645 @@
+"""Times every public function in database_operations against a synthetic dataset.
+
+Run from the project root. The dataset is generated on first use and cached
+in benchmarks/data/, and every run works on a fresh copy of it:
+
+    python -m benchmarks.bench_database_operations --scale small
+    python -m benchmarks.bench_database_operations --scale medium --output run.json
+    python -m benchmarks.bench_database_operations \
+        --compare benchmarks/baselines/small.json
+    python -m benchmarks.bench_database_operations --save-baseline
+
+Results are JSON. --compare exits with status 1 when any case got slower
+than the baseline by more than --threshold.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import database_operations as db
+import password_hashing
+from models import TicketSummary
+from benchmarks.dataset import (
+    HEAD_WORDS,
+    PASSWORD,
+    SCALES,
+    SEED,
+    dataset_path,
+    ensure_dataset,
+)
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+MIN_TIME = 0.2
+MAX_RUNS = 200
+THRESHOLD = 0.5
+# Changes smaller than this are timer noise, whatever the ratio
+NOISE_FLOOR_MS = 0.05
+
+CASES = {}
+
+
+def case(name, max_runs=MAX_RUNS):
+    """Registers a benchmark; name[variant] benchmarks database_operations.name.
+
+    The decorated function picks arguments from the workload and returns
+    (callable, args), so only the call itself is timed.
+    """
+
+    def register(func):
+        CASES[name] = (func, max_runs)
+        return func
+
+    return register
+
+
+class Workload:
+    """Ids and names drawn from the dataset, so each run hits real rows."""
+
+    def __init__(self, seed=SEED):
+        self.rng = random.Random(seed)
+        conn = db.get_db_connection()
+        (self.max_ticket_id,) = conn.execute(
+            "SELECT MAX(ticket_id) FROM tickets"
+        ).fetchone()
+        self.users = conn.execute("SELECT user_id, username FROM users").fetchall()
+        busy = conn.execute(
+            "SELECT ticket_id FROM comments GROUP BY ticket_id "
+            "ORDER BY COUNT(*) DESC LIMIT 100"
+        ).fetchall()
+        self.busy_tickets = [ticket_id for ticket_id, in busy]
+        self.cursor = db.encode_ticket_cursor(db.get_ticket(self.max_ticket_id // 2))
+        # Tickets delete_ticket may remove without spoiling the comment cases
+        ids = sorted(set(range(1, self.max_ticket_id + 1)) - set(self.busy_tickets))
+        self.rng.shuffle(ids)
+        self.disposable = iter(ids)
+        self.counter = 0
+
+    def ticket_id(self):
+        return self.rng.randint(1, self.max_ticket_id)
+
+    def user(self):
+        return self.rng.choice(self.users)
+
+    def unique(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+
+def time_case(func, workload, max_runs, min_time):
+    """Returns per-call timings in milliseconds."""
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < max_runs and (
+        len(timings) < 3 or time.perf_counter() - started < min_time
+    ):
+        call, args = func(workload)
+        start = time.perf_counter()
+        call(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered), 4),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "min_ms": round(ordered[0], 4),
+    }
+
+
+# Connection and transaction plumbing
+
+
+@case("get_db_connection")
+def _(w):
+    return db.get_db_connection, ()
+
+
+@case("close_db_connections")
+def _(w):
+    # Closing is only half the cost; the next query has to reopen
+    return (lambda: (db.close_db_connections(), db.get_db_connection())), ()
+
+
+@case("db_transaction")
+def _(w):
+    def empty_transaction():
+        with db.db_transaction():
+            pass
+
+    return empty_transaction, ()
+
+
+@case("close_group_writers")
+def _(w):
+    return db.close_group_writers, ()
+
+
+@case("retry_on_lock")
+def _(w):
+    return db.retry_on_lock(lambda: None), ()
+
+
+@case("labels_queries")
+def _(w):
+    return db.labels_queries(lambda: None), ()
+
+
+@case("init_db")
+def _(w):
+    return db.init_db, ()
+
+
+# Tickets
+
+
+@case("insert_ticket")
+def _(w):
+    user_id, _ = w.user()
+    return db.insert_ticket, (user_id, 1, "Benchmark", "Inserted by the benchmark")
+
+
+@case("get_ticket")
+def _(w):
+    return db.get_ticket, (w.ticket_id(),)
+
+
+@case("get_tickets_for_user")
+def _(w):
+    return db.get_tickets_for_user, (w.user()[0],)
+
+
+@case("get_all_tickets", max_runs=1)
+def _(w):
+    return db.get_all_tickets, ()
+
+
+@case("encode_ticket_cursor")
+def _(w):
+    return db.encode_ticket_cursor, (TicketSummary(w.ticket_id(), "d", "open", "x"),)
+
+
+@case("decode_ticket_cursor")
+def _(w):
+    return db.decode_ticket_cursor, (w.cursor,)
+
+
+@case("get_tickets_page[first]")
+def _(w):
+    return db.get_tickets_page, ()
+
+
+@case("get_tickets_page[after]")
+def _(w):
+    return (lambda: db.get_tickets_page(after=w.cursor)), ()
+
+
+@case("get_tickets_page[status]")
+def _(w):
+    return (lambda: db.get_tickets_page(status="in progress")), ()
+
+
+@case("get_tickets_page[category]")
+def _(w):
+    category_id = w.rng.randint(1, 10)
+    return (lambda: db.get_tickets_page(category_id=category_id)), ()
+
+
+@case("get_tickets_page[username]")
+def _(w):
+    username = w.user()[1]
+    return (lambda: db.get_tickets_page(username=username)), ()
+
+
+@case("get_tickets_page[user]")
+def _(w):
+    user_id = w.user()[0]
+    return (lambda: db.get_tickets_page(user_id=user_id, include_closed=False)), ()
+
+
+@case("iter_tickets", max_runs=1)
+def _(w):
+    # Streams every ticket, like the admin "all tickets" list
+    return (lambda: sum(1 for _ in db.iter_tickets())), ()
+
+
+@case("get_ticket_changes[first]")
+def _(w):
+    return (lambda: db.get_ticket_changes(limit=50)), ()
+
+
+@case("get_ticket_changes[since]")
+def _(w):
+    # Half the dataset changed since then; one API page of it
+    _, since = db.decode_ticket_cursor(w.cursor)
+    return (lambda: db.get_ticket_changes(updated_since=since, limit=50)), ()
+
+
+@case("update_ticket")
+def _(w):
+    return db.update_ticket, (w.ticket_id(), {"title": "Renamed by the benchmark"})
+
+
+@case("update_ticket_status")
+def _(w):
+    return db.update_ticket_status, (w.ticket_id(), "in progress")
+
+
+@case("close_ticket")
+def _(w):
+    return db.close_ticket, (w.ticket_id(),)
+
+
+@case("delete_ticket")
+def _(w):
+    return db.delete_ticket, (next(w.disposable),)
+
+
+@case("get_ticket_counts")
+def _(w):
+    return db.get_ticket_counts, ()
+
+
+@case("check_ticket_counts", max_runs=3)
+def _(w):
+    return db.check_ticket_counts, ()
+
+
+# Comments
+
+
+@case("get_comments_for_ticket")
+def _(w):
+    return db.get_comments_for_ticket, (w.rng.choice(w.busy_tickets),)
+
+
+@case("get_ticket_details")
+def _(w):
+    return db.get_ticket_details, (w.rng.choice(w.busy_tickets),)
+
+
+@case("get_comments_page")
+def _(w):
+    ticket_id = w.rng.choice(w.busy_tickets)
+    return (lambda: db.get_comments_page(ticket_id, after=0)), ()
+
+
+@case("insert_comment")
+def _(w):
+    return db.insert_comment, (w.ticket_id(), w.user()[0], "Benchmark comment")
+
+
+# Users, passwords and usernames
+
+
+@case("insert_user", max_runs=5)
+def _(w):
+    name = w.unique("bench")
+    return db.insert_user, (name, f"{name}@example.com", PASSWORD, "user")
+
+
+@case("get_user", max_runs=5)
+def _(w):
+    return db.get_user, (w.user()[1], PASSWORD)
+
+
+@case("sync_username_index", max_runs=5)
+def _(w):
+    return (lambda: (db.reset_caches(), db.sync_username_index())), ()
+
+
+@case("reset_caches")
+def _(w):
+    return db.reset_caches, ()
+
+
+@case("username_exists")
+def _(w):
+    name = w.user()[1] if w.rng.random() < 0.5 else w.unique("nobody")
+    return db.username_exists, (name,)
+
+
+@case("usernames_exist")
+def _(w):
+    names = [w.user()[1] for _ in range(10)] + [w.unique("nobody") for _ in range(10)]
+    return db.usernames_exist, (names,)
+
+
+# Changes log (the /events feed)
+
+
+@case("get_change_bounds")
+def _(w):
+    return db.get_change_bounds, ()
+
+
+@case("get_changes")
+def _(w):
+    # The dataset is loaded before the triggers exist; make a batch to read
+    after = db.get_change_bounds()[1]
+    for _ in range(10):
+        db.update_ticket_status(w.ticket_id(), w.rng.choice(db.TICKET_STATUSES))
+    return db.get_changes, (after,)
+
+
+@case("prune_changes", max_runs=3)
+def _(w):
+    return db.prune_changes, ()
+
+
+# API tokens
+
+
+@case("create_api_token")
+def _(w):
+    return db.create_api_token, (w.user()[1], "bench")
+
+
+@case("get_api_token_user")
+def _(w):
+    _, token = db.create_api_token(w.user()[1], "bench")
+    return db.get_api_token_user, (token,)
+
+
+@case("get_api_tokens")
+def _(w):
+    return db.get_api_tokens, (w.user()[1],)
+
+
+@case("revoke_api_token")
+def _(w):
+    token_id, _ = db.create_api_token(w.user()[1], "bench")
+    return db.revoke_api_token, (token_id,)
+
+
+# Reference data caches
+
+
+@case("get_reference")
+def _(w):
+    return db.get_reference, ("usernames", w.user()[0])
+
+
+@case("get_categories")
+def _(w):
+    return db.get_categories, ()
+
+
+@case("get_username")
+def _(w):
+    return db.get_username, (w.user()[0],)
+
+
+@case("invalidate_reference_cache")
+def _(w):
+    return db.invalidate_reference_cache, ()
+
+
+@case("reference_cache_stats")
+def _(w):
+    return db.reference_cache_stats, ()
+
+
+# Search
+
+
+@case("build_match_query")
+def _(w):
+    return db.build_match_query, ("printer won't print after update",)
+
+
+@case("search_tickets[admin]")
+def _(w):
+    return db.search_tickets, (" ".join(w.rng.sample(HEAD_WORDS, 2)),)
+
+
+@case("search_tickets[user]")
+def _(w):
+    query, user_id = w.rng.choice(HEAD_WORDS), w.user()[0]
+    return (lambda: db.search_tickets(query, user_id=user_id)), ()
+
+
+@case("rebuild_search_index", max_runs=1)
+def _(w):
+    return db.rebuild_search_index, ()
+
+
+@case("optimize_search_index", max_runs=1)
+def _(w):
+    return db.optimize_search_index, ()
+
+
+# Archive. Last, since every closed ticket in the dataset is old enough to
+# be archived, which would change what the cases above read.
+
+
+@case("archive_closed_tickets", max_runs=1)
+def _(w):
+    return db.archive_closed_tickets, ()
+
+
+def archived_ids(w):
+    if not hasattr(w, "archived"):
+        rows = db.get_db_connection().execute(
+            "SELECT ticket_id FROM archived_tickets ORDER BY ticket_id"
+        )
+        w.archived = [ticket_id for ticket_id, in rows] or [0]
+    return w.archived
+
+
+@case("get_ticket[archived]")
+def _(w):
+    return db.get_ticket, (w.rng.choice(archived_ids(w)),)
+
+
+@case("get_ticket_details[archived]")
+def _(w):
+    return db.get_ticket_details, (w.rng.choice(archived_ids(w)),)
+
+
+@case("is_ticket_archived")
+def _(w):
+    return db.is_ticket_archived, (w.ticket_id(),)
+
+
+@case("get_archived_tickets_page")
+def _(w):
+    ids = archived_ids(w)
+    return db.get_archived_tickets_page, (ids[len(ids) // 2],)
+
+
+def public_functions():
+    """Names of everything callable that database_operations exports."""
+    return sorted(
+        name
+        for name, value in vars(db).items()
+        if callable(value)
+        and not name.startswith("_")
+        and getattr(value, "__module__", None) == db.__name__
+    )
+
+
+def copy_dataset(source, target):
+    src = sqlite3.connect(source)
+    dst = sqlite3.connect(target)
+    src.backup(dst)
+    dst.close()
+    src.close()
+
+
+def run(dataset, names=None, min_time=MIN_TIME, max_runs=None, progress=None):
+    """Runs the cases against a scratch copy of dataset; returns the results dict."""
+    names = names or list(CASES)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        copy_dataset(dataset, db_name)
+
+        previous = db.DB_NAME
+        db.DB_NAME = db_name
+        db.close_db_connections()
+        db.reset_caches()
+        try:
+            # A dataset cached before the latest migrations gets them here
+            db.init_db()
+            workload = Workload()
+            for name in names:
+                func, case_runs = CASES[name]
+                runs = min(case_runs, max_runs or case_runs)
+                # insert_ticket prints a line per row
+                with contextlib.redirect_stdout(io.StringIO()):
+                    timings = time_case(func, workload, runs, min_time)
+                results[name] = summarize(timings)
+                if progress:
+                    progress(name, results[name])
+        finally:
+            db.close_db_connections()
+            db.reset_caches()
+            db.DB_NAME = previous
+            password_hashing.shutdown_pool()
+
+    return {
+        "meta": {
+            "dataset": os.path.basename(dataset),
+            "tickets": workload.max_ticket_id,
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "machine": platform.machine(),
+            "bcrypt_rounds": password_hashing.BCRYPT_ROUNDS,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """Returns [(name, baseline ms, current ms, ratio, regressed)] for every case.
+
+    A case the baseline doesn't have gets None for its baseline and ratio,
+    so it shows up as unchecked rather than silently passing.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            rows.append((name, None, result["median_ms"], None, False))
+            continue
+        old, new = before["median_ms"], result["median_ms"]
+        ratio = new / old if old else float("inf")
+        regressed = ratio > 1 + threshold and new - old > NOISE_FLOOR_MS
+        rows.append((name, old, new, ratio, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=SCALES, default="small")
+    size.add_argument("--tickets", type=int)
+    size.add_argument("--dataset", help="existing database to benchmark a copy of")
+    parser.add_argument("--only", nargs="+", help="case names or name prefixes")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME)
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare with")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store the results as benchmarks/baselines/<scale>.json",
+    )
+    args = parser.parse_args()
+
+    if args.dataset:
+        dataset, label = args.dataset, os.path.basename(args.dataset)
+    else:
+        tickets = args.tickets or SCALES[args.scale]
+        label = args.scale if not args.tickets else f"tickets-{tickets}"
+        if not os.path.exists(dataset_path(tickets)):
+            print(f"Generating a {tickets}-ticket dataset (cached for next time)...")
+        dataset = ensure_dataset(tickets)
+
+    names = list(CASES)
+    if args.only:
+        names = [n for n in names if any(n.startswith(p) for p in args.only)]
+
+    def report(name, result):
+        print(
+            f"{name:<32}{result['median_ms']:>10.3f} ms"
+            f"{result['p95_ms']:>10.3f} p95{result['runs']:>6} runs"
+        )
+
+    results = run(dataset, names, min_time=args.min_time, progress=report)
+
+    outputs = [args.output] if args.output else []
+    if args.save_baseline:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        outputs.append(os.path.join(BASELINE_DIR, f"{label}.json"))
+    for path in outputs:
+        with open(path, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Results written to {path}")
+
+    if not args.compare:
+        return 0
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'case':<32}{'baseline':>10}{'current':>10}{'change':>9}")
+    for name, old, new, ratio, regressed in rows:
+        if old is None:
+            print(f"{name:<32}{'-':>10}{new:>10.3f}  NOT IN BASELINE")
+            continue
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{name:<32}{old:>10.3f}{new:>10.3f}{ratio - 1:>+9.0%}{flag}")
+    status = 0
+    missing = [row[0] for row in rows if row[1] is None]
+    if missing:
+        print(
+            f"\n{len(missing)} case(s) not in the baseline, so not checked: "
+            f"{', '.join(missing)}. Refresh it with --save-baseline."
+        )
+        status = 1
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)} case(s) regressed: {', '.join(regressions)}")
+        status = 1
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""Write throughput, one commit per statement vs group commit.
+
+Several threads add comments as fast as they can, first with a
+transaction each and then with DB_GROUP_COMMIT on. synchronous defaults to
+FULL, where every commit waits for an fsync, which is the case group commit
+is for:
+
+    python -m benchmarks.bench_group_commit
+    python -m benchmarks.bench_group_commit --threads 32 --synchronous NORMAL
+"""
+
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import database_operations
+import metrics
+from benchmarks.loadtest import percentile
+from db_migrations import apply_migrations
+
+
+def seed(db_name):
+    conn = sqlite3.connect(db_name)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO categories (category_name) VALUES ('General')")
+    conn.execute(
+        "INSERT INTO tickets (user_id, category_id, title, description, status) "
+        "VALUES (1, 1, 'Busy ticket', 'Gets every comment', 'open')"
+    )
+    conn.commit()
+    conn.close()
+
+
+def run(threads, writes):
+    """Returns (writes per second, sorted latencies in ms)."""
+    latencies = []
+    lock = threading.Lock()
+    start_line = threading.Barrier(threads + 1)
+
+    def writer():
+        mine = []
+        start_line.wait()
+        for i in range(writes):
+            started = time.perf_counter()
+            database_operations.insert_comment(1, 1, f"Comment {i}")
+            mine.append((time.perf_counter() - started) * 1000)
+        database_operations.close_db_connections()
+        with lock:
+            latencies.extend(mine)
+
+    workers = [threading.Thread(target=writer) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    start_line.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    return threads * writes / elapsed, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--writes", type=int, default=100, help="per thread")
+    parser.add_argument("--synchronous", default="FULL")
+    parser.add_argument(
+        "--max-delay-ms",
+        type=float,
+        default=database_operations.DB_GROUP_COMMIT_MAX_DELAY_MS,
+    )
+    parser.add_argument(
+        "--max-batch", type=int, default=database_operations.DB_GROUP_COMMIT_MAX_BATCH
+    )
+    args = parser.parse_args()
+
+    database_operations.DB_SYNCHRONOUS = args.synchronous
+    database_operations.DB_GROUP_COMMIT_MAX_DELAY_MS = args.max_delay_ms
+    database_operations.DB_GROUP_COMMIT_MAX_BATCH = args.max_batch
+    metrics.METRICS_ENABLED = False
+
+    results = {}
+    # Each mode gets a fresh database (in the current directory, so the
+    # fsyncs hit a real disk rather than a tmpfs)
+    for mode, grouped in (("per statement", False), ("group commit", True)):
+        with tempfile.TemporaryDirectory(dir=".") as tmp:
+            database_operations.DB_NAME = os.path.join(tmp, "bench.db")
+            seed(database_operations.DB_NAME)
+            database_operations.DB_GROUP_COMMIT = grouped
+            results[mode] = run(args.threads, args.writes)
+            database_operations.close_group_writers()
+            database_operations.close_db_connections()
+
+    print(
+        f"{args.threads} threads x {args.writes} comments, "
+        f"synchronous={args.synchronous}, max delay {args.max_delay_ms} ms, "
+        f"max batch {args.max_batch}\n"
+    )
+    print(f"{'mode':<16}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode, (rate, latencies) in results.items():
+        print(
+            f"{mode:<16}{rate:>10.0f}"
+            f"{percentile(latencies, 50):>9.2f}{percentile(latencies, 99):>9.2f}"
+        )
+    speedup = results["group commit"][0] / results["per statement"][0]
+    print(f"\nthroughput: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Per-request logging cost, synchronous handlers vs the queued pipeline.
+
+"before" is the old configure_logging(): console and file handlers on the
+root logger at DEBUG, written by the request thread. "after" is the queued
+pipeline at LOG_LEVEL=INFO. Each times a request that logs a warning, with
+the console going to /dev/null and to a sink that blocks for a millisecond
+per write, and a debug() call that the level filters out:
+
+    python -m benchmarks.bench_logging
+"""
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import logger as app_logger
+
+ROUNDS = 3
+
+
+def legacy_logging(log_dir, stream):
+    """Installs the handlers configure_logging() used before the queue."""
+    root = logging.getLogger()
+    console_handler = logging.StreamHandler(stream)
+    console_handler.setLevel(logging.DEBUG)
+    console_handler.setFormatter(logging.Formatter("%(levelname)-8s | %(message)s"))
+    file_handler = logging.FileHandler(os.path.join(log_dir, "legacy.log"))
+    file_handler.setLevel(logging.WARNING)
+    file_handler.setFormatter(
+        logging.Formatter("%(asctime)s | %(levelname)-8s | %(message)s")
+    )
+    root.addHandler(console_handler)
+    root.addHandler(file_handler)
+    root.setLevel(logging.DEBUG)
+
+
+def clear_logging():
+    app_logger.stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+
+
+def best_per_call(func, count):
+    """Best average over ROUNDS runs of count calls, in microseconds."""
+    timings = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for i in range(count):
+            func(i)
+        timings.append((time.perf_counter() - start) / count * 1_000_000)
+    return min(timings)
+
+
+class SlowStream:
+    """A console that takes a millisecond per write, like a backed-up pipe."""
+
+    def __init__(self, stream, delay=0.001):
+        self.stream = stream
+        self.delay = delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+def request_cost(flask_app, count):
+    # Missing credentials: the login view logs a warning and re-renders. A
+    # fresh client each time, or the unread flash messages pile up in the
+    # session cookie and every request gets slower
+    return best_per_call(
+        lambda i: flask_app.test_client().post("/login", data={}), count
+    )
+
+
+def debug_cost(flask_app, count):
+    eager = best_per_call(
+        lambda i: flask_app.logger.debug(f"Ticket {i} viewed by user {i % 7}"), count
+    )
+    lazy = best_per_call(
+        lambda i: flask_app.logger.debug("Ticket %s viewed by user %s", i, i % 7),
+        count,
+    )
+    return eager, lazy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        os.environ["DB_NAME"] = os.path.join(tmp, "bench.db")
+        import database_operations
+
+        database_operations.DB_NAME = os.environ["DB_NAME"]
+        real_stderr = sys.stderr
+        try:
+            # Console output goes to /dev/null rather than the terminal
+            sys.stderr = devnull
+            import app
+
+            sinks = (("/dev/null", devnull), ("1 ms per write", SlowStream(devnull)))
+            for sink, stream in sinks:
+                sys.stderr = stream
+                clear_logging()
+                legacy_logging(tmp, stream)
+                before = request_cost(app.app, args.requests)
+                if stream is devnull:
+                    debug_before = debug_cost(app.app, args.requests * 10)
+
+                clear_logging()
+                app_logger.LOG_DIR, app_logger.LOG_LEVEL = tmp, "INFO"
+                app_logger.configure_logging()
+                after = request_cost(app.app, args.requests)
+                if stream is devnull:
+                    debug_after = debug_cost(app.app, args.requests * 10)
+                clear_logging()
+                rows.append((f"request, console -> {sink}", before, after))
+        finally:
+            sys.stderr = real_stderr
+        database_operations.close_db_connections()
+
+    rows.append(("filtered debug(), f-string", debug_before[0], debug_after[0]))
+    rows.append(("filtered debug(), lazy %s", debug_before[1], debug_after[1]))
+    print(f"{'':<36}{'before':>10}{'after':>10}  (us)")
+    for label, old, new in rows:
+        print(f"{label:<36}{old:>10.1f}{new:>10.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
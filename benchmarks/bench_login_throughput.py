@@ -0,0 +1,105 @@
+"""Login throughput under concurrency, inline bcrypt vs the hashing pool.
+
+A burst of concurrent logins runs while another thread keeps timing a
+cheap query, showing how much hashing starves the rest of the app.
+
+    python -m benchmarks.bench_login_throughput --threads 16 --logins 64
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+import database_operations
+import password_hashing
+from db_migrations import apply_migrations
+from password_hashing import HashingBusy
+
+
+def seed(db_name, rounds):
+    conn = sqlite3.connect(db_name)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO categories (category_name) VALUES ('General')")
+    conn.execute(
+        "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
+        (
+            "bench",
+            "bench@example.com",
+            bcrypt.hashpw(b"pass", bcrypt.gensalt(rounds)),
+            "user",
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def run_burst(threads, logins):
+    busy = 0
+    ok = 0
+    cheap = []
+    done = threading.Event()
+
+    def cheap_queries():
+        while not done.is_set():
+            start = time.perf_counter()
+            database_operations.get_categories()
+            cheap.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+
+    def login(_):
+        try:
+            return database_operations.get_user("bench", "pass") is not None
+        except HashingBusy:
+            return None
+
+    watcher = threading.Thread(target=cheap_queries)
+    watcher.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        for result in executor.map(login, range(logins)):
+            if result is None:
+                busy += 1
+            elif result:
+                ok += 1
+    elapsed = time.perf_counter() - start
+    done.set()
+    watcher.join()
+    return ok, busy, elapsed, cheap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--logins", type=int, default=64)
+    args = parser.parse_args()
+
+    rounds = password_hashing.BCRYPT_ROUNDS
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        seed(db_name, rounds)
+        database_operations.DB_NAME = db_name
+
+        print(f"bcrypt cost {rounds}, {args.threads} threads, {args.logins} logins")
+        print(f"{'mode':<12}{'ok':>6}{'busy':>6}{'logins/s':>10}{'cheap p95 ms':>14}")
+        for mode, workers in (
+            ("inline", 0),
+            ("pool", password_hashing.HASH_POOL_WORKERS),
+        ):
+            password_hashing.HASH_POOL_WORKERS = workers
+            if workers:
+                password_hashing.hash_password("warm-up")  # start the pool
+            ok, busy, elapsed, cheap = run_burst(args.threads, args.logins)
+            p95 = statistics.quantiles(cheap, n=20)[-1] if len(cheap) > 1 else 0
+            print(f"{mode:<12}{ok:>6}{busy:>6}{ok / elapsed:>10.1f}{p95:>14.2f}")
+        password_hashing.shutdown_pool()
+
+
+if __name__ == "__main__":
+    main()
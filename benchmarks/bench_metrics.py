@@ -0,0 +1,128 @@
+"""Overhead of the /metrics instrumentation on queries and requests.
+
+Times the same pooled query and the same cheap request with instrumentation
+on and off, and checks the difference against the budget:
+
+    python -m benchmarks.bench_metrics
+"""
+
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+import database_operations
+import metrics
+from db_migrations import apply_migrations
+
+QUERIES = 20_000
+REQUESTS = 3_000
+ROUNDS = 9
+# Budget: a statement may cost about a third more than a bare indexed
+# lookup, and a request (one observation plus its own statements) 50 us,
+# ~10% of the cheapest route on a small VM and far less of a real page
+QUERY_BUDGET_US = 5.0
+REQUEST_BUDGET_US = 50.0
+
+
+def set_instrumentation(app, enabled):
+    """Turns the timed connection and request timing on or off."""
+    metrics.METRICS_ENABLED = enabled
+    database_operations.close_db_connections()
+    saved = set_instrumentation.saved
+    after = app.after_request_funcs.setdefault(None, [])
+    if not saved:
+        # register_metrics wraps the Flask app's own wsgi_app
+        saved.update(
+            wsgi_app=app.wsgi_app,
+            plain_wsgi_app=type(app).wsgi_app.__get__(app),
+            after=[f for f in after if f.__module__ == "metrics"],
+        )
+    app.wsgi_app = saved["wsgi_app"] if enabled else saved["plain_wsgi_app"]
+    for func in saved["after"]:
+        if func in after:
+            after.remove(func)
+        if enabled:
+            after.append(func)
+
+
+set_instrumentation.saved = {}
+
+
+def per_call(func, count):
+    """Average time of count calls, in microseconds."""
+    start = time.perf_counter()
+    for i in range(count):
+        func(i)
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        conn = sqlite3.connect(db_name)
+        apply_migrations(conn)
+        conn.executemany(
+            "INSERT INTO tickets (user_id, category_id, title, description, status) "
+            "VALUES (1, 1, ?, 'benchmark row', 'open')",
+            [(f"Ticket {i}",) for i in range(100)],
+        )
+        conn.commit()
+        conn.close()
+
+        metrics.METRICS_DIR = tmp
+        database_operations.DB_NAME = db_name
+        import app
+        import rate_limit
+
+        rate_limit.RATE_LIMIT_ENABLED = False
+        client = app.app.test_client()
+        results = {False: ([], []), True: ([], [])}
+        # Alternate on and off, swapping which goes first each round, so
+        # drift and warm-up on a busy machine hit both alike
+        for round_number in range(ROUNDS):
+            order = (False, True) if round_number % 2 else (True, False)
+            for enabled in order:
+                set_instrumentation(app.app, enabled)
+                queries, requests = results[enabled]
+                queries.append(
+                    per_call(
+                        lambda i: database_operations.get_ticket(i % 100 + 1), QUERIES
+                    )
+                )
+                requests.append(
+                    per_call(
+                        lambda i: client.get(f"/check_username?username=u{i % 50}"),
+                        REQUESTS,
+                    )
+                )
+        database_operations.close_db_connections()
+
+    # Each round's off and on runs sit side by side, so compare them pairwise
+    # and take the median, which shrugs off rounds where something else ran
+    (query_off, request_off), (query_on, request_on) = results[False], results[True]
+    # get_ticket runs a single statement
+    per_statement = statistics.median(on - off for on, off in zip(query_on, query_off))
+    request_cost = statistics.median(
+        on - off for on, off in zip(request_on, request_off)
+    )
+    query_off, query_on = statistics.median(query_off), statistics.median(query_on)
+    request_off, request_on = statistics.median(request_off), statistics.median(
+        request_on
+    )
+
+    print(f"{'':<26}{'off':>10}{'on':>10}")
+    print(f"{'get_ticket (us)':<26}{query_off:>10.2f}{query_on:>10.2f}")
+    print(f"{'/check_username (us)':<26}{request_off:>10.1f}{request_on:>10.1f}")
+    print(
+        f"\nper SQL statement: {per_statement:+.2f} us (budget {QUERY_BUDGET_US} us)"
+        f"\nper request:       {request_cost:+.1f} us (budget {REQUEST_BUDGET_US} us)"
+    )
+    within = per_statement <= QUERY_BUDGET_US and request_cost <= REQUEST_BUDGET_US
+    print("within budget" if within else "OVER BUDGET")
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,98 @@
+"""Cost of a rate limit decision, per backend, and of the check on a request.
+
+    python -m benchmarks.bench_rate_limit
+    python -m benchmarks.bench_rate_limit --keys 100000 --decisions 200000
+
+Decisions spread over --keys clients, so the buckets are a realistic size
+and some of them run out. Exits with status 1 if a decision costs more
+than its budget.
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import rate_limit
+from rate_limit import Limit, MemoryBackend, SqliteBackend
+
+ROUNDS = 5
+# Budgets per decision: the memory backend is a dict update under a lock;
+# the SQLite one a single indexed upsert, still well under a bcrypt check
+MEMORY_BUDGET_US = 5.0
+SQLITE_BUDGET_US = 100.0
+# The full check on a request: key from the session or address, plus a decision
+CHECK_BUDGET_US = 15.0
+
+
+def per_decision(backend, keys, decisions):
+    """Median over ROUNDS of the average time per take(), in microseconds."""
+    limit = Limit(10, 60)
+    names = [f"login|ip:10.0.{i // 256}.{i % 256}" for i in range(keys)]
+    rounds = []
+    for _ in range(ROUNDS):
+        backend.reset()
+        now = time.time()
+        start = time.perf_counter()
+        for i in range(decisions):
+            backend.take(names[i % keys], limit, now + i * 0.0001)
+        rounds.append((time.perf_counter() - start) / decisions * 1_000_000)
+    return statistics.median(rounds)
+
+
+def per_check(decisions):
+    """Average time of rate_limit.check() inside a request, in microseconds."""
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.secret_key = "bench"  # nosec B105
+    rate_limit._limits["bench"] = Limit(10**9, 1)
+    rate_limit.backend = MemoryBackend()
+    rounds = []
+    with app.test_request_context("/login", environ_base={"REMOTE_ADDR": "10.0.0.1"}):
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            for _ in range(decisions):
+                rate_limit.check("bench")
+            rounds.append((time.perf_counter() - start) / decisions * 1_000_000)
+    del rate_limit._limits["bench"]
+    return statistics.median(rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--keys", type=int, default=10_000)
+    parser.add_argument("--decisions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rate_limit.RATE_LIMIT_ENABLED = True
+    with tempfile.TemporaryDirectory() as tmp:
+        results = [
+            (
+                "memory",
+                per_decision(MemoryBackend(), args.keys, args.decisions),
+                MEMORY_BUDGET_US,
+            ),
+            (
+                "sqlite",
+                per_decision(
+                    SqliteBackend(os.path.join(tmp, "limits.db")),
+                    args.keys,
+                    args.decisions // 10,
+                ),
+                SQLITE_BUDGET_US,
+            ),
+            ("check() on a request", per_check(args.decisions), CHECK_BUDGET_US),
+        ]
+
+    print(f"{'':<24}{'us/decision':>12}{'budget':>10}")
+    for name, cost, budget in results:
+        print(f"{name:<24}{cost:>12.2f}{budget:>10.1f}")
+    within = all(cost <= budget for _, cost, budget in results)
+    print("within budget" if within else "OVER BUDGET")
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
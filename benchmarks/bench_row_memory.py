@@ -0,0 +1,107 @@
+"""Memory held by ticket list rows, SELECT * tuples vs TicketSummary rows.
+
+Loads every ticket of a synthetic dataset (100k by default) the way the
+lists used to (SELECT * into plain tuples) and the way they do now
+(get_all_tickets(): projected TicketSummary rows), then does the same for a
+single dashboard page and times a rendered /dashboard:
+
+    python -m benchmarks.bench_row_memory
+    python -m benchmarks.bench_row_memory --tickets 1000000
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import database_operations
+from benchmarks.dataset import ensure_dataset
+
+
+def retained(load):
+    """Returns (bytes still allocated by load()'s result, peak bytes)."""
+    tracemalloc.start()
+    rows = load()
+    size, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del rows
+    return size, peak
+
+
+def legacy_rows(db_name, query, params=()):
+    conn = sqlite3.connect(db_name)
+    try:
+        return conn.execute(query, params).fetchall()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=100_000)
+    args = parser.parse_args()
+
+    source = ensure_dataset(args.tickets)
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "memory.db")
+        src, dst = sqlite3.connect(source), sqlite3.connect(db_name)
+        src.backup(dst)
+        src.close()
+        dst.close()
+        database_operations.DB_NAME = db_name
+        page_size = database_operations.DASHBOARD_PAGE_SIZE
+
+        rows = {
+            f"all {args.tickets} tickets": (
+                lambda: legacy_rows(db_name, "SELECT * FROM tickets"),
+                database_operations.get_all_tickets,
+            ),
+            f"dashboard page ({page_size})": (
+                lambda: legacy_rows(
+                    db_name,
+                    "SELECT * FROM tickets ORDER BY created_at DESC, ticket_id DESC "
+                    "LIMIT ?",
+                    (page_size + 1,),
+                ),
+                database_operations.get_tickets_page,
+            ),
+        }
+        # Warm the connection and caches so they aren't counted
+        database_operations.get_tickets_page()
+        results = {
+            name: (retained(before), retained(after))
+            for name, (before, after) in rows.items()
+        }
+
+        import app
+
+        client = app.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user_id=1, username="admin", role="admin")
+        client.get("/dashboard")
+        tracemalloc.start()
+        start = time.perf_counter()
+        client.get("/dashboard")
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        _, dashboard_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        database_operations.close_db_connections()
+
+    print(f"{'rows':<28}{'before MB':>11}{'after MB':>10}{'saved':>8}")
+    for name, ((before, _), (after, _)) in results.items():
+        print(
+            f"{name:<28}{before / 1e6:>11.2f}{after / 1e6:>10.2f}"
+            f"{1 - after / before:>8.0%}"
+        )
+    print(
+        f"\nGET /dashboard (admin): peak {dashboard_peak / 1e6:.2f} MB, "
+        f"{elapsed_ms:.1f} ms"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+"""Full-text search latency over a large synthetic comment corpus.
+
+Run from the project root (a million comments takes a few minutes to load):
+
+    python -m benchmarks.bench_search --comments 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+import database_operations
+from benchmarks.dataset import random_text
+from db_migrations import apply_migrations
+
+QUERIES = ["the", "printer", "vpn timeout", "pass", "disk", "term500", "term9000"]
+REPEATS = 20
+USERS = 1000
+
+
+def load_corpus(db_name, tickets, comments):
+    rng = random.Random(42)
+    conn = sqlite3.connect(db_name)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO categories (category_name) VALUES ('General')")
+    conn.execute(
+        "INSERT INTO users (username, email, password, role) "
+        "VALUES ('bench', 'bench@example.com', x'00', 'user')"
+    )
+    conn.executemany(
+        "INSERT INTO tickets (user_id, category_id, title, description, status) "
+        "VALUES (?, 1, ?, ?, 'open')",
+        (
+            (rng.randint(1, USERS), random_text(rng, 4), random_text(rng, 20))
+            for _ in range(tickets)
+        ),
+    )
+    conn.executemany(
+        "INSERT INTO comments (ticket_id, user_id, message) VALUES (?, 1, ?)",
+        ((rng.randint(1, tickets), random_text(rng, 15)) for _ in range(comments)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tickets", type=int, default=100_000)
+    parser.add_argument("--comments", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        start = time.perf_counter()
+        load_corpus(db_name, args.tickets, args.comments)
+        print(
+            f"loaded {args.tickets} tickets / {args.comments} comments "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        database_operations.DB_NAME = db_name
+        print(f"{'query':<20}{'admin ms':>10}{'user ms':>10}")
+        for query in QUERIES:
+            timings = []
+            for user_id in (None, 1):
+                start = time.perf_counter()
+                for _ in range(REPEATS):
+                    database_operations.search_tickets(query, user_id=user_id)
+                timings.append((time.perf_counter() - start) / REPEATS * 1000)
+            print(f"{query:<20}{timings[0]:>10.2f}{timings[1]:>10.2f}")
+        database_operations.close_db_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Template compile and render time, with and without the template caches.
+
+    python -m benchmarks.bench_templates
+
+Compiling every template is timed from source and from a warm bytecode
+cache, as a restarted worker would see them. /dashboard and /ticket/<id>
+are then timed with the {% cache %} fragments on and off, both the whole
+request and just render_template (from Flask's template signals).
+"""
+
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from flask import before_render_template, template_rendered
+from jinja2 import FileSystemBytecodeCache
+
+import database_operations
+import template_cache
+from db_migrations import apply_migrations
+from template_cache import FragmentCacheExtension
+
+ROUNDS = 7
+REQUESTS = 500
+
+
+def seed(db_name):
+    conn = sqlite3.connect(db_name)
+    apply_migrations(conn)
+    conn.execute("INSERT INTO categories (category_name) VALUES ('General')")
+    conn.execute(
+        "INSERT INTO users (username, email, password, role) "
+        "VALUES ('bench', 'bench@example.com', 'x', 'user')"
+    )
+    conn.executemany(
+        "INSERT INTO tickets (user_id, category_id, title, description, status) "
+        "VALUES (1, 1, ?, 'benchmark row', 'open')",
+        [(f"Ticket {i}",) for i in range(100)],
+    )
+    conn.executemany(
+        "INSERT INTO comments (ticket_id, user_id, message) VALUES (1, 1, ?)",
+        [(f"Comment {i}",) for i in range(20)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def compile_ms(app, cache_dir):
+    """Time to load every template into a new environment, in milliseconds."""
+    env = app.create_jinja_environment()
+    env.add_extension(FragmentCacheExtension)
+    # Filters are resolved at compile time, and the app registers its own
+    env.filters.update(app.jinja_env.filters)
+    if cache_dir:
+        env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    start = time.perf_counter()
+    for name in env.list_templates():
+        env.get_template(name)
+    return (time.perf_counter() - start) * 1000
+
+
+def per_request_us(client, path):
+    """Average (request, render) time for path, in microseconds."""
+    renders = []
+    started = []
+
+    def before(sender, **extra):
+        started.append(time.perf_counter())
+
+    def after(sender, **extra):
+        renders.append(time.perf_counter() - started.pop())
+
+    before_render_template.connect(before)
+    template_rendered.connect(after)
+    try:
+        start = time.perf_counter()
+        for _ in range(REQUESTS):
+            client.get(path).close()
+        elapsed = time.perf_counter() - start
+    finally:
+        before_render_template.disconnect(before)
+        template_rendered.disconnect(after)
+    return (
+        elapsed / REQUESTS * 1_000_000,
+        sum(renders) / REQUESTS * 1_000_000,
+    )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = os.path.join(tmp, "bench.db")
+        seed(db_name)
+        database_operations.DB_NAME = db_name
+        import app
+
+        cache_dir = os.path.join(tmp, "jinja")
+        os.makedirs(cache_dir)
+        compile_ms(app.app, cache_dir)
+        cold = statistics.median(compile_ms(app.app, None) for _ in range(ROUNDS))
+        warm = statistics.median(compile_ms(app.app, cache_dir) for _ in range(ROUNDS))
+
+        client = app.app.test_client()
+        with client.session_transaction() as sess:
+            sess.update(user_id=1, username="bench", role="user")
+        results = {}
+        for path in ("/dashboard", "/ticket/1"):
+            timings = {False: [], True: []}
+            for round_number in range(ROUNDS):
+                order = (False, True) if round_number % 2 else (True, False)
+                for enabled in order:
+                    template_cache.TEMPLATE_FRAGMENT_CACHE = enabled
+                    timings[enabled].append(per_request_us(client, path))
+            results[path] = {
+                enabled: [statistics.median(column) for column in zip(*runs)]
+                for enabled, runs in timings.items()
+            }
+        database_operations.close_db_connections()
+
+    print(f"compile all templates:  {cold:.1f} ms from source, {warm:.1f} ms cached")
+    print(f"\n{'(us)':<24}{'no fragments':>14}{'fragments':>12}{'saved':>8}")
+    for path, timing in results.items():
+        for column, label in enumerate(("request", "render")):
+            off, on = timing[False][column], timing[True][column]
+            name = f"{path} {label}"
+            print(f"{name:<24}{off:>14.0f}{on:>12.0f}{off - on:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
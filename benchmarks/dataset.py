@@ -0,0 +1,252 @@
+"""Seeded synthetic helpdesk dataset at a configurable scale.
+
+The same seed and size always produce the same rows, so benchmark runs on
+different machines or commits measure the same database:
+
+    python -m benchmarks.dataset --scale small      # 10k tickets
+    python -m benchmarks.dataset --scale medium     # 1M tickets
+    python -m benchmarks.dataset --tickets 250000 --out /tmp/tickets.db
+
+Rows are loaded into the bare tables first and the remaining migrations run
+afterwards, so indexes, search indexes and counters are built in one pass.
+"""
+
+import argparse
+import itertools
+import math
+import os
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+import bcrypt
+
+import password_hashing
+from db_migrations import apply_migrations
+
+SCALES = {"small": 10_000, "medium": 1_000_000, "large": 10_000_000}
+SEED = 42
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+PASSWORD = "benchpass"  # nosec B105 - shared by every synthetic user
+
+# Helpdesk terms at the head of a Zipf-distributed vocabulary, padded with
+# synthetic words so term frequencies look like real prose
+HEAD_WORDS = (
+    "the to and error not a printer is vpn on laptop password reset network "
+    "outage email server crash monitor keyboard access badge wifi slow login "
+    "timeout update install license backup restore database api warning disk"
+).split()
+VOCABULARY = HEAD_WORDS + [f"term{i}" for i in range(20_000)]
+CUM_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) for rank in range(len(VOCABULARY)))
+)
+
+CATEGORIES = (
+    "Software Issue",
+    "Access Request",
+    "Hardware Issue",
+    "Network Issue",
+    "UI Bug",
+    "Performance Issue",
+    "Security Issue",
+    "Database Error",
+    "API Failure",
+    "Other",
+)
+CATEGORY_IDS = range(1, len(CATEGORIES) + 1)
+CATEGORY_WEIGHTS = list(
+    itertools.accumulate(1 / (rank + 1) for rank in range(len(CATEGORIES)))
+)
+
+TICKETS_PER_USER = 20
+ADMIN_SHARE = 0.02
+COMMENTS_PER_TICKET = 3.0
+SPAN_DAYS = 730
+END = datetime(2025, 1, 1)
+BATCH = 10_000
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def random_text(rng, length):
+    return " ".join(rng.choices(VOCABULARY, cum_weights=CUM_WEIGHTS, k=length))
+
+
+def dataset_path(tickets, seed=SEED):
+    return os.path.join(DATA_DIR, f"tickets-{tickets}-seed{seed}.db")
+
+
+def _status(rng, age):
+    """Old tickets are mostly closed, recent ones mostly still open."""
+    if rng.random() < 0.9 * math.sqrt(age):
+        return "closed"
+    return "open" if rng.random() < 0.65 else "in progress"
+
+
+def _users(tickets, password_hash):
+    count = max(10, tickets // TICKETS_PER_USER)
+    admins = max(1, int(count * ADMIN_SHARE))
+    for user_id in range(1, count + 1):
+        name = f"admin{user_id}" if user_id <= admins else f"user{user_id}"
+        role = "admin" if user_id <= admins else "user"
+        yield user_id, name, f"{name}@example.com", password_hash, role
+
+
+def _tickets_and_comments(rng, tickets, users, admins, comments_per_ticket):
+    """Yields (ticket, [comments]) in creation order."""
+    # A few users file most of the tickets
+    owners = range(admins + 1, users + 1)
+    owner_weights = list(
+        itertools.accumulate((rank + 1) ** -0.7 for rank in range(len(owners)))
+    )
+    start = END - timedelta(days=SPAN_DAYS)
+    step = SPAN_DAYS * 86400 / tickets
+    comment_id = 0
+
+    for ticket_id in range(1, tickets + 1):
+        created = start + timedelta(seconds=(ticket_id - 1) * step)
+        age = 1 - ticket_id / tickets
+        user_id = rng.choices(owners, cum_weights=owner_weights)[0]
+        status = _status(rng, age)
+        ticket = (
+            ticket_id,
+            user_id,
+            rng.choices(CATEGORY_IDS, cum_weights=CATEGORY_WEIGHTS)[0],
+            random_text(rng, rng.randint(3, 7)).capitalize(),
+            random_text(rng, rng.randint(10, 40)),
+            status,
+            created.strftime(TIMESTAMP_FORMAT),
+        )
+
+        # Closed tickets collected more discussion on the way
+        mean = comments_per_ticket * (1.5 if status == "closed" else 0.5)
+        comments = []
+        posted = created
+        for n in range(int(rng.expovariate(1 / mean) + 0.5) if mean else 0):
+            comment_id += 1
+            posted += timedelta(minutes=rng.expovariate(1 / 240))
+            author = user_id if n % 2 else rng.randint(1, admins)
+            comments.append(
+                (
+                    comment_id,
+                    ticket_id,
+                    author,
+                    random_text(rng, rng.randint(5, 30)),
+                    posted.strftime(TIMESTAMP_FORMAT),
+                )
+            )
+        yield ticket, comments
+
+
+def generate(
+    db_name,
+    tickets,
+    seed=SEED,
+    comments_per_ticket=COMMENTS_PER_TICKET,
+    rounds=None,
+    progress=None,
+):
+    """Creates db_name holding a synthetic dataset; returns row counts.
+
+    Every user's password is PASSWORD, hashed once at BCRYPT_ROUNDS (or
+    rounds) with a salt derived from the seed.
+    """
+    rng = random.Random(seed)
+    rounds = rounds or password_hashing.BCRYPT_ROUNDS
+    salt_chars = "./ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+    salt = f"$2b${rounds:02d}${''.join(rng.choices(salt_chars, k=21))}e".encode()
+    password_hash = bcrypt.hashpw(PASSWORD.encode("utf-8"), salt)
+
+    conn = sqlite3.connect(db_name)
+    # A fresh file nobody else can see yet, so skip the journal while loading
+    conn.execute("PRAGMA journal_mode = OFF")
+    conn.execute("PRAGMA synchronous = OFF")
+    apply_migrations(conn, target=1)
+
+    users = list(_users(tickets, password_hash))
+    admins = sum(1 for user in users if user[4] == "admin")
+    conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?, ?)", users)
+    conn.executemany(
+        "INSERT INTO categories (category_name) VALUES (?)",
+        [(name,) for name in CATEGORIES],
+    )
+
+    counts = {"users": len(users), "tickets": 0, "comments": 0}
+    rows = _tickets_and_comments(rng, tickets, len(users), admins, comments_per_ticket)
+    while True:
+        chunk = list(itertools.islice(rows, BATCH))
+        if not chunk:
+            break
+        conn.executemany(
+            "INSERT INTO tickets VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [ticket for ticket, _ in chunk],
+        )
+        comments = [comment for _, batch in chunk for comment in batch]
+        conn.executemany("INSERT INTO comments VALUES (?, ?, ?, ?, ?)", comments)
+        conn.commit()
+        counts["tickets"] += len(chunk)
+        counts["comments"] += len(comments)
+        if progress:
+            progress(counts)
+
+    # A single file that can be copied or moved; the app switches it to WAL
+    conn.execute("PRAGMA journal_mode = DELETE")
+    apply_migrations(conn)
+    conn.execute("ANALYZE")
+    conn.close()
+    return counts
+
+
+def ensure_dataset(tickets, seed=SEED):
+    """Returns the cached dataset for tickets/seed, generating it if missing."""
+    path = dataset_path(tickets, seed)
+    if not os.path.exists(path):
+        os.makedirs(DATA_DIR, exist_ok=True)
+        partial = f"{path}.partial"
+        if os.path.exists(partial):
+            os.remove(partial)
+        generate(partial, tickets, seed=seed)
+        os.replace(partial, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=SCALES, default="small")
+    size.add_argument("--tickets", type=int)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument(
+        "--comments-per-ticket", type=float, default=COMMENTS_PER_TICKET
+    )
+    parser.add_argument("--out", help="database file to create")
+    args = parser.parse_args()
+
+    tickets = args.tickets or SCALES[args.scale]
+    out = args.out or dataset_path(tickets, args.seed)
+    if os.path.exists(out):
+        parser.error(f"{out} already exists")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+
+    start = time.perf_counter()
+
+    def report(counts):
+        if counts["tickets"] % (BATCH * 10) == 0:
+            print(f"{counts['tickets']} tickets, {counts['comments']} comments")
+
+    counts = generate(
+        out,
+        tickets,
+        seed=args.seed,
+        comments_per_ticket=args.comments_per_ticket,
+        progress=report,
+    )
+    print(
+        f"Wrote {counts['users']} users, {counts['tickets']} tickets and "
+        f"{counts['comments']} comments to {out} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
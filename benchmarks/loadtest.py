@@ -0,0 +1,392 @@
+"""HTTP load generator with per-route latency percentiles.
+
+Replays a weighted request mix from a scenario file (benchmarks/scenarios/)
+at a fixed arrival rate, either in-process through the Flask test client or
+against a running server:
+
+    python -m benchmarks.loadtest mixed
+    python -m benchmarks.loadtest mixed --rate 200 --duration 60
+    python -m benchmarks.loadtest benchmarks/scenarios/admin_triage.json \\
+        --url http://127.0.0.1:8000 --db app.db
+
+Requests are sent on a fixed schedule whether or not earlier ones have
+finished. Latency is measured from each request's scheduled start, so time
+spent queueing behind a slow server shows up in the percentiles rather
+than lowering the request rate.
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import queue
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from http.cookies import SimpleCookie
+from urllib.parse import quote, urlencode, urlsplit
+
+import config  # noqa: F401 - loads .env
+
+from benchmarks.dataset import HEAD_WORDS, PASSWORD, SEED, ensure_dataset, random_text
+
+SCENARIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios")
+STATUSES = ("open", "in progress", "closed")
+
+
+def load_scenario(name_or_path):
+    """Reads a scenario by file path or by name from benchmarks/scenarios/."""
+    path = name_or_path
+    if not os.path.exists(path):
+        path = os.path.join(SCENARIO_DIR, f"{name_or_path}.json")
+    with open(path) as f:
+        scenario = json.load(f)
+
+    for spec in scenario["requests"]:
+        spec.setdefault("method", "GET")
+        spec.setdefault("role", None)
+        spec.setdefault("expect", [200])
+        spec.setdefault("weight", 1)
+        if spec["role"] and not scenario["sessions"].get(spec["role"]):
+            raise ValueError(f"{spec['name']} needs '{spec['role']}' sessions")
+    return scenario
+
+
+class Workload:
+    """Fills request templates with ids and names that exist in the database."""
+
+    def __init__(self, db_name, seed=SEED):
+        self.rng = random.Random(seed)
+        conn = sqlite3.connect(f"file:{db_name}?mode=ro", uri=True)
+        (self.max_ticket_id,) = conn.execute(
+            "SELECT MAX(ticket_id) FROM tickets"
+        ).fetchone()
+        self.category_ids = [
+            row[0] for row in conn.execute("SELECT category_id FROM categories")
+        ]
+        self.usernames = {}
+        for username, role in conn.execute(
+            "SELECT username, role FROM users ORDER BY user_id"
+        ):
+            self.usernames.setdefault(role, []).append(username)
+        conn.close()
+        self.counter = 0
+
+    def variables(self):
+        self.counter += 1
+        existing = self.rng.choice(self.usernames["user"])
+        return {
+            "ticket_id": self.rng.randint(1, self.max_ticket_id or 1),
+            "category_id": self.rng.choice(self.category_ids),
+            "status": self.rng.choice(STATUSES),
+            "word": self.rng.choice(HEAD_WORDS),
+            "title": random_text(self.rng, 5).capitalize(),
+            "text": random_text(self.rng, 20),
+            "username_guess": (
+                existing if self.rng.random() < 0.5 else f"newuser{self.counter}"
+            ),
+        }
+
+
+def render(spec, variables):
+    """Returns (method, path, form) for one request from a scenario entry."""
+    form = spec.get("form")
+    if form:
+        form = {key: value.format_map(variables) for key, value in form.items()}
+    quoted = {key: quote(str(value)) for key, value in variables.items()}
+    return spec["method"], spec["path"].format_map(quoted), form
+
+
+class FlaskClientTarget:
+    """Sends requests in-process through Flask's test client."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def new_session(self):
+        return self.app.test_client()
+
+    def request(self, session, method, path, form=None):
+        """Returns (status, location)."""
+        response = session.open(path, method=method, data=form)
+        response.close()
+        return response.status_code, response.headers.get("Location")
+
+
+class HttpTarget:
+    """Sends requests to a running server over keep-alive connections."""
+
+    def __init__(self, url, timeout=30):
+        parts = urlsplit(url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.timeout = timeout
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            factory = (
+                http.client.HTTPSConnection
+                if self.https
+                else http.client.HTTPConnection
+            )
+            conn = factory(self.host, timeout=self.timeout)
+            self.local.conn = conn
+        return conn
+
+    def new_session(self):
+        return SimpleCookie()
+
+    def request(self, session, method, path, form=None):
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        cookie = "; ".join(f"{key}={morsel.value}" for key, morsel in session.items())
+        if cookie:
+            headers["Cookie"] = cookie
+
+        conn = self._connection()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            # Reconnect next time; the server may have closed the keep-alive
+            conn.close()
+            self.local.conn = None
+            raise
+        for header in response.headers.get_all("Set-Cookie") or []:
+            session.load(header)
+        return response.status, response.headers.get("Location")
+
+
+def log_in(target, role, username, password):
+    session = target.new_session()
+    status, location = target.request(
+        session, "POST", "/login", {"username": username, "password": password}
+    )
+    if status != 302 or not (location or "").endswith("/dashboard"):
+        raise RuntimeError(f"Could not log in as {role} '{username}' ({status}).")
+    return session
+
+
+def open_sessions(target, scenario, workload, password):
+    """Logs in the scenario's sessions; returns {role: Queue of sessions}."""
+    pools = {None: queue.Queue()}
+    # Anonymous requests still get a cookie jar of their own per worker
+    for _ in range(scenario.get("concurrency", 8)):
+        pools[None].put(target.new_session())
+    for role, count in scenario["sessions"].items():
+        names = workload.usernames.get(role, [])
+        if len(names) < count:
+            raise ValueError(f"Database has only {len(names)} {role} accounts.")
+        pools[role] = queue.Queue()
+        for username in names[:count]:
+            pools[role].put(log_in(target, role, username, password))
+    return pools
+
+
+class Stats:
+    """Collects latencies and errors per request name; thread-safe."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, name, latency, ok):
+        with self.lock:
+            self.latencies.setdefault(name, []).append(latency)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def report(self, elapsed):
+        routes = {}
+        for name, latencies in sorted(self.latencies.items()):
+            ordered = sorted(latencies)
+            routes[name] = {
+                "requests": len(ordered),
+                "throughput": round(len(ordered) / elapsed, 2),
+                "error_rate": round(self.errors.get(name, 0) / len(ordered), 4),
+                "p50_ms": percentile(ordered, 50),
+                "p95_ms": percentile(ordered, 95),
+                "p99_ms": percentile(ordered, 99),
+                "max_ms": round(ordered[-1], 2),
+            }
+        total = sum(route["requests"] for route in routes.values())
+        errors = sum(self.errors.values())
+        return {
+            "elapsed_s": round(elapsed, 2),
+            "requests": total,
+            "throughput": round(total / elapsed, 2) if elapsed else 0,
+            "error_rate": round(errors / total, 4) if total else 0,
+            "routes": routes,
+        }
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an already sorted list, in ms."""
+    index = max(0, math.ceil(p / 100 * len(ordered)) - 1)
+    return round(ordered[index], 2)
+
+
+def run(target, scenario, workload, rate=None, duration=None, password=PASSWORD):
+    """Replays scenario against target and returns the report dict."""
+    rate = rate or scenario["rate"]
+    duration = duration or scenario["duration"]
+    concurrency = scenario.get("concurrency", 8)
+    specs = scenario["requests"]
+    weights = [spec["weight"] for spec in specs]
+
+    print(
+        f"Logging in {sum(scenario['sessions'].values())} sessions...", file=sys.stderr
+    )
+    pools = open_sessions(target, scenario, workload, password)
+    stats = Stats()
+    work = queue.Queue()
+
+    def worker():
+        while True:
+            item = work.get()
+            if item is None:
+                return
+            scheduled, spec, (method, path, form) = item
+            session = pools[spec["role"]].get()
+            try:
+                status, location = target.request(session, method, path, form)
+                # A redirect to the login page means the session was rejected
+                ok = status in spec["expect"] and urlsplit(location or "").path != "/"
+            except Exception:
+                ok = False
+            finally:
+                pools[spec["role"]].put(session)
+            stats.record(spec["name"], (time.perf_counter() - scheduled) * 1000, ok)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+
+    start = time.perf_counter()
+    for n in range(int(rate * duration)):
+        scheduled = start + n / rate
+        spec = workload.rng.choices(specs, weights=weights)[0]
+        request = render(spec, workload.variables())
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        work.put((scheduled, spec, request))
+
+    for _ in threads:
+        work.put(None)
+    for thread in threads:
+        thread.join()
+    return stats.report(time.perf_counter() - start)
+
+
+def print_report(report, stream=sys.stdout):
+    print(
+        f"{'route':<22}{'reqs':>7}{'req/s':>8}{'err%':>7}"
+        f"{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)",
+        file=stream,
+    )
+    for name, route in report["routes"].items():
+        print(
+            f"{name:<22}{route['requests']:>7}{route['throughput']:>8.1f}"
+            f"{route['error_rate']:>7.1%}{route['p50_ms']:>9.1f}"
+            f"{route['p95_ms']:>9.1f}{route['p99_ms']:>9.1f}{route['max_ms']:>9.1f}",
+            file=stream,
+        )
+    print(
+        f"\n{report['requests']} requests in {report['elapsed_s']}s "
+        f"({report['throughput']} req/s), {report['error_rate']:.1%} errors",
+        file=stream,
+    )
+
+
+def in_process_target(db_name):
+    """Points the app at db_name and returns a FlaskClientTarget for it."""
+    import database_operations
+
+    database_operations.close_db_connections()
+    database_operations.DB_NAME = db_name
+    database_operations.reset_caches()
+
+    import app
+    import rate_limit
+
+    # Every simulated client shares one address; measure the routes instead
+    rate_limit.RATE_LIMIT_ENABLED = False
+    database_operations.init_db()
+    database_operations.sync_username_index()
+    return FlaskClientTarget(app.app)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenario", help="scenario name or path to a JSON file")
+    parser.add_argument("--url", help="server to load; default is in-process")
+    parser.add_argument(
+        "--db",
+        default=os.getenv("DB_NAME"),
+        help="database the server uses, read for ids and usernames",
+    )
+    parser.add_argument(
+        "--tickets",
+        type=int,
+        default=10_000,
+        help="in-process only: size of the synthetic dataset to run against",
+    )
+    parser.add_argument("--rate", type=float, help="requests per second")
+    parser.add_argument("--duration", type=float, help="seconds to run for")
+    parser.add_argument("--password", default=PASSWORD)
+    parser.add_argument("--output", help="write the report as JSON here")
+    args = parser.parse_args()
+
+    scenario = load_scenario(args.scenario)
+    if args.url:
+        if not args.db:
+            parser.error("--db is required with --url")
+        target, db_name = HttpTarget(args.url), args.db
+        results = run(
+            target,
+            scenario,
+            Workload(db_name),
+            args.rate,
+            args.duration,
+            args.password,
+        )
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_name = os.path.join(tmp, "loadtest.db")
+            source = sqlite3.connect(ensure_dataset(args.tickets))
+            scratch = sqlite3.connect(db_name)
+            source.backup(scratch)
+            scratch.close()
+            source.close()
+            target = in_process_target(db_name)
+            results = run(
+                target,
+                scenario,
+                Workload(db_name),
+                args.rate,
+                args.duration,
+                args.password,
+            )
+
+    print_report(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
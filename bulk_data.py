@@ -0,0 +1,337 @@
+"""Streams tickets and comments in and out of the database in bulk.
+
+    python bulk_data.py import tickets old_tickets.csv
+    python bulk_data.py import comments old_comments.ndjson --resume
+    python bulk_data.py export tickets tickets.ndjson
+
+Imports are validated row by row and written with executemany in batched
+transactions; a batch the database refuses is retried a row at a time to
+find and report the bad rows. Exports stream straight from a cursor, so
+memory use doesn't grow with the table.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+import time
+from datetime import datetime
+
+import config  # noqa: F401 - loads .env
+
+from database_operations import (
+    TICKET_STATUSES,
+    db_transaction,
+    get_db_connection,
+    init_db,
+    retry_on_lock,
+)
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", 5000))
+PROGRESS_INTERVAL = 1.0
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+def _text(value):
+    value = str(value).strip()
+    if not value:
+        raise ValueError("must not be empty")
+    return value
+
+
+def _status(value):
+    value = _text(value)
+    if value not in TICKET_STATUSES:
+        raise ValueError(f"must be one of {', '.join(TICKET_STATUSES)}")
+    return value
+
+
+def _timestamp(value):
+    return datetime.strptime(str(value).strip(), TIMESTAMP_FORMAT).strftime(
+        TIMESTAMP_FORMAT
+    )
+
+
+# Column -> (parser, required). The first column is the primary key, which
+# may be left blank to let SQLite assign one.
+TABLES = {
+    "tickets": {
+        "ticket_id": (int, False),
+        "user_id": (int, True),
+        "category_id": (int, True),
+        "title": (_text, True),
+        "description": (_text, True),
+        "status": (_status, True),
+        "created_at": (_timestamp, False),
+    },
+    "comments": {
+        "comment_id": (int, False),
+        "ticket_id": (int, True),
+        "user_id": (int, True),
+        "message": (_text, True),
+        "created_at": (_timestamp, False),
+    },
+}
+
+
+def detect_format(path, fmt=None):
+    """Returns 'csv' or 'ndjson' from an explicit format or the file extension."""
+    if fmt:
+        return fmt
+    fmt = FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt is None:
+        raise ValueError(f"Can't tell the format of '{path}', pass --format.")
+    return fmt
+
+
+def read_records(stream, fmt):
+    """Yields (line number, record) without reading the whole file."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except json.JSONDecodeError:
+            yield line_number, None
+
+
+def validate_record(table, record, now):
+    """Returns the record as a tuple in column order, or raises ValueError."""
+    if not isinstance(record, dict):
+        raise ValueError("not a JSON object")
+    row = []
+    for column, (parse, required) in TABLES[table].items():
+        value = record.get(column)
+        if value is None or value == "":
+            if required:
+                raise ValueError(f"{column} is required")
+            row.append(now if column == "created_at" else None)
+            continue
+        try:
+            row.append(parse(value))
+        except ValueError as e:
+            raise ValueError(f"{column}: {e}") from None
+    return tuple(row)
+
+
+def get_import_progress(source):
+    """Returns how many records of source earlier runs already committed."""
+    row = (
+        get_db_connection()
+        .execute("SELECT records_done FROM import_progress WHERE source = ?", (source,))
+        .fetchone()
+    )
+    return row[0] if row else 0
+
+
+def _insert_sql(table):
+    columns = list(TABLES[table])
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "  # nosec B608
+        f"VALUES ({', '.join('?' for _ in columns)})"
+    )
+
+
+def _save_progress(conn, source, records_done):
+    conn.execute(
+        """
+        INSERT INTO import_progress (source, records_done, updated_at)
+        VALUES (?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT (source) DO UPDATE SET
+            records_done = excluded.records_done,
+            updated_at = excluded.updated_at
+        """,
+        (source, records_done),
+    )
+
+
+@retry_on_lock
+def _write_batch(table, batch, source, records_done):
+    """Inserts a batch of (line number, row) and checkpoints it in one transaction.
+
+    Returns [(line number, error)] for the rows the database refused. If
+    executemany hits a constraint (a duplicate id, say), the batch is
+    rolled back and written again one row at a time: a failed INSERT only
+    undoes itself, so the good rows still commit with the checkpoint.
+    """
+    sql = _insert_sql(table)
+    try:
+        with db_transaction() as conn:
+            conn.executemany(sql, [row for _, row in batch])
+            _save_progress(conn, source, records_done)
+        return []
+    except sqlite3.IntegrityError:
+        pass
+
+    rejected = []
+    with db_transaction() as conn:
+        for line_number, row in batch:
+            try:
+                conn.execute(sql, row)
+            except sqlite3.IntegrityError as e:
+                rejected.append((line_number, str(e)))
+        _save_progress(conn, source, records_done)
+    return rejected
+
+
+class Progress:
+    """Prints a running count to stderr at most once per interval."""
+
+    def __init__(self, label, interval=PROGRESS_INTERVAL, stream=sys.stderr):
+        self.label = label
+        self.interval = interval
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.last = self.started
+
+    def update(self, count, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last < self.interval:
+            return
+        self.last = now
+        rate = count / max(now - self.started, 1e-9)
+        print(f"{self.label}: {count} rows ({rate:.0f}/s)", file=self.stream)
+
+
+def import_rows(
+    table, stream, fmt, source=None, resume=False, batch_size=None, errors=sys.stderr
+):
+    """Validates and inserts every record from stream into table.
+
+    With a source name each committed batch is checkpointed, and resume=True
+    skips the records an earlier, interrupted run already loaded. Invalid
+    records, and those the database refuses (a duplicate id, say), are
+    reported to errors with their line number and skipped. Returns a dict
+    of counts.
+    """
+    batch_size = batch_size or BULK_BATCH_SIZE
+    skip = get_import_progress(source) if source and resume else 0
+    now = datetime.now().strftime(TIMESTAMP_FORMAT)
+    progress = Progress(f"Importing {table}")
+    counts = {"imported": 0, "rejected": 0, "skipped": skip}
+
+    def write(batch, records_done):
+        rejected = _write_batch(table, batch, source, records_done)
+        for line_number, error in rejected:
+            print(f"line {line_number}: {error}", file=errors)
+        counts["rejected"] += len(rejected)
+        counts["imported"] += len(batch) - len(rejected)
+
+    seen = 0
+    batch = []
+    for line_number, record in read_records(stream, fmt):
+        seen += 1
+        if seen <= skip:
+            continue
+        try:
+            batch.append((line_number, validate_record(table, record, now)))
+        except ValueError as e:
+            counts["rejected"] += 1
+            print(f"line {line_number}: {e}", file=errors)
+        if len(batch) >= batch_size:
+            write(batch, seen)
+            batch = []
+            progress.update(counts["imported"])
+
+    if batch or (source and seen > skip):
+        write(batch, seen)
+    progress.update(counts["imported"], force=True)
+    return counts
+
+
+def export_rows(table, stream, fmt):
+    """Writes every row of table to stream in primary key order; returns the count."""
+    columns = list(TABLES[table])
+    cursor = get_db_connection().execute(
+        f"SELECT {', '.join(columns)} FROM {table} "  # nosec B608
+        f"ORDER BY {columns[0]}"
+    )
+    progress = Progress(f"Exporting {table}")
+
+    if fmt == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(columns)
+        write = writer.writerow
+    else:
+
+        def write(row):
+            stream.write(json.dumps(dict(zip(columns, row))) + "\n")
+
+    count = 0
+    # Iterating the cursor pulls rows one at a time, unlike fetchall()
+    for row in cursor:
+        write(row)
+        count += 1
+        if count % 1000 == 0:
+            progress.update(count)
+    progress.update(count, force=True)
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export tickets.")
+    parser.add_argument("action", choices=("import", "export"))
+    parser.add_argument("table", choices=sorted(TABLES))
+    parser.add_argument("path", help="file to read or write, '-' for stdin/stdout")
+    parser.add_argument("--format", choices=("csv", "ndjson"))
+    parser.add_argument(
+        "--batch-size", type=int, default=BULK_BATCH_SIZE, help="rows per commit"
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the records an earlier run of this import already committed",
+    )
+    args = parser.parse_args(argv)
+
+    if args.path == "-" and not args.format:
+        parser.error("--format is required when streaming through stdin/stdout")
+    if args.path == "-" and args.resume:
+        parser.error("--resume needs a file, not stdin")
+    try:
+        fmt = detect_format(args.path, args.format)
+    except ValueError as e:
+        parser.error(str(e))
+
+    init_db()
+    if args.action == "export":
+        if args.path == "-":
+            count = export_rows(args.table, sys.stdout, fmt)
+        else:
+            with open(args.path, "w", newline="", encoding="utf-8") as stream:
+                count = export_rows(args.table, stream, fmt)
+        print(f"Exported {count} {args.table}.", file=sys.stderr)
+        return 0
+
+    if args.path == "-":
+        counts = import_rows(args.table, sys.stdin, fmt, batch_size=args.batch_size)
+    else:
+        source = f"{args.table}:{os.path.abspath(args.path)}"
+        with open(args.path, newline="", encoding="utf-8") as stream:
+            counts = import_rows(
+                args.table,
+                stream,
+                fmt,
+                source=source,
+                resume=args.resume,
+                batch_size=args.batch_size,
+            )
+    print(
+        f"Imported {counts['imported']} {args.table}, "
+        f"rejected {counts['rejected']}, skipped {counts['skipped']} already loaded.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
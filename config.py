@@ -0,0 +1,10 @@
+"""Loads .env into the environment, once per process.
+
+Modules import this before reading their settings with os.getenv, so the
+file is found and parsed a single time however many modules need it.
+Variables already set in the environment win over .env.
+"""
+
+from dotenv import load_dotenv
+
+load_dotenv()
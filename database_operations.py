@@ -1,180 +1,1504 @@
+import contextvars
+import hashlib
+import secrets
 import sqlite3
-from datetime import datetime
-import bcrypt
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import wraps
+import logging
 import os
-from dotenv import load_dotenv
+import sys
+import config  # noqa: F401 - loads .env
+import metrics
+from db_migrations import apply_migrations
+from group_commit import GroupCommitWriter
+from models import (
+    ApiToken,
+    ArchivedTicket,
+    Category,
+    Change,
+    Comment,
+    Ticket,
+    TicketSummary,
+    User,
+    row_factory,
+)
+from password_hashing import HashingBusy, hash_password, check_password, needs_rehash
+from username_index import UsernameIndex
+from reference_cache import ReferenceCache
 
-load_dotenv()
-DB_NAME = os.getenv("DB_NAME")
+DB_NAME = os.getenv("DB_NAME", "app.db")
+logger = logging.getLogger(__name__)
+
+# Connection tuning (see .env.example)
+DB_JOURNAL_MODE = os.getenv("DB_JOURNAL_MODE", "WAL")
+DB_SYNCHRONOUS = os.getenv("DB_SYNCHRONOUS", "NORMAL")
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", 8192))
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", 64 * 1024 * 1024))
+DB_LOCK_RETRIES = int(os.getenv("DB_LOCK_RETRIES", 5))
+DB_LOCK_BACKOFF = float(os.getenv("DB_LOCK_BACKOFF", 0.05))
+# Opt-in: ticket/comment writes from all threads are committed in batches by
+# one writer thread per process (see group_commit.py)
+DB_GROUP_COMMIT = os.getenv("DB_GROUP_COMMIT", "false").lower() in ("1", "true", "yes")
+DB_GROUP_COMMIT_MAX_BATCH = int(os.getenv("DB_GROUP_COMMIT_MAX_BATCH", 64))
+DB_GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("DB_GROUP_COMMIT_MAX_DELAY_MS", 0))
+# Longest a request waits for the writer thread to commit its write
+DB_GROUP_COMMIT_TIMEOUT_MS = float(os.getenv("DB_GROUP_COMMIT_TIMEOUT_MS", 30000))
+
+DASHBOARD_PAGE_SIZE = int(os.getenv("DASHBOARD_PAGE_SIZE", 25))
+# Ticket lists show this much of each description
+TICKET_SUMMARY_CHARS = 100
+# Rows fetched at a time by iter_tickets() for streamed lists
+STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+TICKET_STATUSES = ("open", "in progress", "closed")
+TICKET_SORTS = {"newest": "DESC", "oldest": "ASC"}
+# Columns API clients can ask for with fields=
+TICKET_FIELDS = (
+    "ticket_id",
+    "user_id",
+    "category_id",
+    "title",
+    "description",
+    "status",
+    "created_at",
+    "updated_at",
+)
+# Ticket columns update_ticket() may change
+TICKET_EDITABLE = ("title", "description", "category_id", "status")
+
+SEARCH_RESULTS_LIMIT = int(os.getenv("SEARCH_RESULTS_LIMIT", 20))
+SEARCH_CANDIDATES = int(os.getenv("SEARCH_CANDIDATES", 500))
+# Control characters can't appear in escaped HTML, so templates can safely
+# swap them for <mark> tags after escaping the snippet text.
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+USERNAME_BLOOM_FP_RATE = float(os.getenv("USERNAME_BLOOM_FP_RATE", 0.01))
+USERNAME_BATCH_LIMIT = int(os.getenv("USERNAME_BATCH_LIMIT", 100))
+
+COMMENT_PAGE_SIZE = int(os.getenv("COMMENT_PAGE_SIZE", 50))
+
+# Changes log rows read per query, and how long they are kept
+CHANGES_BATCH_SIZE = int(os.getenv("CHANGES_BATCH_SIZE", 100))
+CHANGES_RETENTION_DAYS = float(os.getenv("CHANGES_RETENTION_DAYS", 7))
+
+# Closed tickets untouched for this many days move to the archive tables,
+# this many tickets (with their comments) per write transaction
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", 90))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 100))
+
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", 300))
+REFERENCE_CACHE_MAX_ENTRIES = int(os.getenv("REFERENCE_CACHE_MAX_ENTRIES", 10000))
+
+_local = threading.local()
+_group_writers = {}
+_group_writers_lock = threading.Lock()
+_username_index = UsernameIndex(fp_rate=USERNAME_BLOOM_FP_RATE)
+
+DB_QUERY_SECONDS = metrics.Histogram(
+    "db_query_duration_seconds",
+    "Time spent executing SQL statements, by database_operations function.",
+    ("query",),
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1.0),
+)
+DB_LOCK_RETRIES_TOTAL = metrics.Counter(
+    "db_lock_retries_total",
+    "Retries after the database was locked, by function.",
+    ("function",),
+)
+
+
+# The database_operations function whose SQL is running, for DB_QUERY_SECONDS.
+# Set by retry_on_lock and labels_queries, so timing a statement only reads it.
+_query_label = contextvars.ContextVar("query_label", default="other")
+
+
+def labels_queries(func):
+    """Labels the SQL func runs, itself or through helpers, with its name."""
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _query_label.set(func.__name__)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _query_label.reset(token)
+
+    return wrapper
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor that records how long each statement takes to execute.
+
+    Only execute() is timed. It runs the statement up to its first row, so
+    sorts and aggregates are included, but fetching a long result isn't.
+    """
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _query_label.get())
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _query_label.get())
+
+
+class _TimedConnection(sqlite3.Connection):
+    """Connection whose cursors, including conn.execute()'s, are timed."""
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+    # Timed here too rather than through cursor(), saving a call per query
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _query_label.get())
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - start, _query_label.get())
+
+
+def _open_connection(db_name):
+    """Opens a new connection and applies the configured pragmas."""
+    # uri=True lets DB_NAME be a file: URI, such as the tests' in-memory
+    # databases; plain paths are opened as before
+    conn = sqlite3.connect(
+        db_name,
+        uri=True,
+        timeout=DB_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+        factory=_TimedConnection if metrics.METRICS_ENABLED else sqlite3.Connection,
+    )
+    conn.execute(f"PRAGMA journal_mode = {DB_JOURNAL_MODE}")
+    conn.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+    conn.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+    # Negative cache_size is in KiB rather than pages
+    conn.execute(f"PRAGMA cache_size = {-DB_CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {DB_MMAP_SIZE}")
+    return conn
 
 
 def get_db_connection():
-    return sqlite3.connect(DB_NAME)
+    """Returns this thread's pooled connection, opening one if needed.
 
+    Connections are kept per thread and per process, so a gunicorn worker
+    forked from a parent that already held a connection opens its own.
+    """
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        _local.pid = pid
+        _local.connections = {}
+
+    conn = _local.connections.get(DB_NAME)
+    if conn is None:
+        conn = _open_connection(DB_NAME)
+        _local.connections[DB_NAME] = conn
+    return conn
+
+
+def close_db_connections():
+    """Closes every pooled connection held by the current thread."""
+    for conn in getattr(_local, "connections", {}).values():
+        conn.close()
+    _local.connections = {}
 
-def insert_ticket(user_id, category_id, title, description, status="open"):
-    created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+@contextmanager
+def db_transaction():
+    """Yields the pooled connection, committing on success and rolling back on error."""
     conn = get_db_connection()
-    cursor = conn.cursor()
+    with conn:
+        yield conn
+
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
 
+def retry_on_lock(func):
+    """Retries func with exponential backoff while the database is locked.
+
+    Its SQL is labelled with func's name in the query metrics, as with
+    labels_queries.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        token = _query_label.set(func.__name__)
+        try:
+            delay = DB_LOCK_BACKOFF
+            for attempt in range(DB_LOCK_RETRIES + 1):
+                try:
+                    return func(*args, **kwargs)
+                except sqlite3.OperationalError as e:
+                    if not _is_lock_error(e) or attempt == DB_LOCK_RETRIES:
+                        raise
+                    DB_LOCK_RETRIES_TOTAL.inc(func.__name__)
+                    time.sleep(delay)
+                    delay *= 2
+        finally:
+            _query_label.reset(token)
+
+    return wrapper
+
+
+def _placeholders(values):
+    return ", ".join("?" for _ in values)
+
+
+def _summary_sql(column):
+    """SQL for the start of a description column, as ticket lists show it."""
+    return (
+        f"CASE WHEN length({column}) > {TICKET_SUMMARY_CHARS} "
+        f"THEN substr({column}, 1, {TICKET_SUMMARY_CHARS}) || '...' "
+        f"ELSE {column} END"
+    )
+
+
+# Column lists matching the row types in models.py
+_TICKET_COLUMNS = ", ".join(TICKET_FIELDS)
+# Lists never load whole descriptions, only the start of them
+_TICKET_SUMMARY_COLUMNS = (
+    f"ticket_id, {_summary_sql('description')}, status, created_at"
+)
+_COMMENT_COLUMNS = (
+    "comments.comment_id, comments.ticket_id, comments.user_id, "
+    "comments.message, comments.created_at, users.username"
+)
+
+
+def _group_writer():
+    """Returns the group commit writer for the current DB_NAME."""
+    with _group_writers_lock:
+        writer = _group_writers.get(DB_NAME)
+        if writer is None:
+            db_name = DB_NAME
+            writer = GroupCommitWriter(
+                lambda: _open_connection(db_name),
+                max_batch=DB_GROUP_COMMIT_MAX_BATCH,
+                max_delay=DB_GROUP_COMMIT_MAX_DELAY_MS / 1000,
+                retry=retry_on_lock,
+                timeout=DB_GROUP_COMMIT_TIMEOUT_MS / 1000,
+            )
+            _group_writers[DB_NAME] = writer
+        return writer
+
+
+def close_group_writers():
+    """Stops every group commit writer thread in this process."""
+    with _group_writers_lock:
+        for writer in _group_writers.values():
+            writer.close()
+        _group_writers.clear()
+
+
+def _write(func, *args):
+    """Runs func(conn, *args) and commits, returning once the write is durable.
+
+    With DB_GROUP_COMMIT on, the write is handed to the writer thread and
+    committed together with other threads' writes; otherwise it gets a
+    transaction of its own on this thread's connection. Either way locks
+    are retried in exactly one place (the writer retries whole batches), so
+    callers must not wrap _write in retry_on_lock as well.
+    """
+    if DB_GROUP_COMMIT:
+        return _group_writer().submit(_labelled_write, func, *args)
+    return _write_here(func, *args)
+
+
+@retry_on_lock
+def _write_here(func, *args):
+    with db_transaction() as conn:
+        return _labelled_write(conn, func, *args)
+
+
+def _labelled_write(conn, func, *args):
+    """Runs func(conn, *args) with its SQL labelled with func's name."""
+    token = _query_label.set(func.__name__)
+    try:
+        return func(conn, *args)
+    finally:
+        _query_label.reset(token)
+
+
+@retry_on_lock
+def init_db():
+    """Applies any pending schema migrations; safe to run on every startup."""
+    return apply_migrations(get_db_connection())
+
+
+def _now():
+    """The current local time, formatted like the created_at columns."""
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _insert_ticket_row(conn, user_id, category_id, title, description, status):
+    created_at = _now()
+    cursor = conn.cursor()
     cursor.execute(
         """
-        INSERT INTO tickets (user_id, category_id, title, description, status, created_at)
-        VALUES (?, ?, ?, ?, ?, ?)
+        INSERT INTO tickets
+            (user_id, category_id, title, description, status, created_at, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
     """,
-        (user_id, category_id, title, description, status, created_at),
+        (user_id, category_id, title, description, status, created_at, created_at),
     )
+    return cursor.lastrowid
 
-    conn.commit()
-    conn.close()
 
-    print(f"Inserted ticket for user_id {user_id} with status '{status}'.")
+def insert_ticket(user_id, category_id, title, description, status="open"):
+    """Inserts a ticket and returns its ticket_id."""
+    ticket_id = _write(
+        _insert_ticket_row, user_id, category_id, title, description, status
+    )
+    logger.debug("Inserted ticket for user_id %s with status '%s'.", user_id, status)
+    return ticket_id
 
 
 def insert_user(username, email, password, role):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    try:
-        hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt())
+    hashed_password = hash_password(password)
+    return _insert_user_row(username, email, hashed_password, role)
 
-        cursor.execute(
-            "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
-            (username, email, hashed_password, role),
-        )
-        conn.commit()
+
+@retry_on_lock
+def _insert_user_row(username, email, hashed_password, role):
+    try:
+        with db_transaction() as conn:
+            conn.execute(
+                "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
+                (username, email, hashed_password, role),
+            )
+        _username_index.add(username)
         success = True
     except sqlite3.IntegrityError:
         success = False
-    finally:
-        conn.close()
     return success
 
 
 def get_user(username, password):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT user_id, password, role FROM users WHERE username = ?", (username,)
-    )
-    user = cursor.fetchone()
-    conn.close()
+    user = _get_user_row(username)
 
     if user:
         stored_hashed_password = user[1]
 
-        if bcrypt.checkpw(password.encode("utf-8"), stored_hashed_password):
-            return (user[0], user[2])
+        if check_password(password, stored_hashed_password):
+            if needs_rehash(stored_hashed_password):
+                _rehash_password(user[0], password)
+            return User(user[0], user[2], username)
 
     return None
 
 
+def _rehash_password(user_id, password):
+    """Upgrades a stored hash to the configured cost; skipped if the pool is busy."""
+    try:
+        hashed_password = hash_password(password)
+    except HashingBusy:
+        return
+    _update_password(user_id, hashed_password)
+
+
+@retry_on_lock
+def _update_password(user_id, hashed_password):
+    with db_transaction() as conn:
+        conn.execute(
+            "UPDATE users SET password = ? WHERE user_id = ?",
+            (hashed_password, user_id),
+        )
+
+
+@retry_on_lock
+def _get_user_row(username):
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT user_id, password, role FROM users WHERE username = ?", (username,)
+        )
+        return cursor.fetchone()
+
+
+@retry_on_lock
 def get_tickets_for_user(user_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT * FROM tickets WHERE user_id = ? AND status != 'closed'", (user_id,)
-    )
-    tickets = cursor.fetchall()
-    conn.close()
-    return tickets
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(TicketSummary)
+        cursor.execute(
+            f"SELECT {_TICKET_SUMMARY_COLUMNS} FROM tickets "  # nosec B608
+            "WHERE user_id = ? AND status != 'closed'",
+            (user_id,),
+        )
+        return cursor.fetchall()
 
 
+@retry_on_lock
 def get_all_tickets():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tickets")
-    tickets = cursor.fetchall()
-    conn.close()
-    return tickets
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(TicketSummary)
+        cursor.execute(f"SELECT {_TICKET_SUMMARY_COLUMNS} FROM tickets")  # nosec B608
+        return cursor.fetchall()
+
+
+def encode_ticket_cursor(ticket):
+    """Builds a keyset cursor from a Ticket or TicketSummary's id and created_at."""
+    return f"{ticket.ticket_id}:{ticket.created_at}"
+
+
+def decode_ticket_cursor(cursor):
+    """Parses a cursor from encode_ticket_cursor, raising ValueError if malformed."""
+    ticket_id, created_at = cursor.split(":", 1)
+    return int(ticket_id), created_at
+
+
+def _ticket_filters(status, category_id, username, user_id, include_closed):
+    """Returns (conditions, params) for the dashboard's ticket filters."""
+    conditions = []
+    params = []
+    if status:
+        conditions.append("status = ?")
+        params.append(status)
+    if not include_closed:
+        conditions.append("status != 'closed'")
+    if category_id:
+        conditions.append("category_id = ?")
+        params.append(category_id)
+    if user_id:
+        conditions.append("user_id = ?")
+        params.append(user_id)
+    if username:
+        conditions.append("user_id = (SELECT user_id FROM users WHERE username = ?)")
+        params.append(username)
+    return conditions, params
+
+
+@retry_on_lock
+def get_tickets_page(
+    status=None,
+    category_id=None,
+    username=None,
+    user_id=None,
+    include_closed=True,
+    sort="newest",
+    after=None,
+    before=None,
+    page_size=None,
+):
+    """Returns one page of tickets using keyset pagination on (created_at, ticket_id).
+
+    Pass the ``next`` cursor of a page as ``after`` to move forward, or its
+    ``prev`` cursor as ``before`` to move back. Filters and ordering are
+    applied in SQL so only page_size + 1 rows are ever read.
+    """
+    if sort not in TICKET_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'")
+    page_size = page_size or DASHBOARD_PAGE_SIZE
+
+    conditions, params = _ticket_filters(
+        status, category_id, username, user_id, include_closed
+    )
 
+    backwards = before is not None
+    order = TICKET_SORTS[sort]
+    if backwards:
+        order = "ASC" if order == "DESC" else "DESC"
 
+    cursor_value = before if backwards else after
+    if cursor_value:
+        ticket_id, created_at = decode_ticket_cursor(cursor_value)
+        operator = "<" if order == "DESC" else ">"
+        conditions.append(f"(created_at, ticket_id) {operator} (?, ?)")
+        params.extend([created_at, ticket_id])
+
+    # Only fixed fragments are interpolated; all values are bound parameters
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order_by = f"ORDER BY created_at {order}, ticket_id {order}"
+    query = (
+        f"SELECT {_TICKET_SUMMARY_COLUMNS} FROM tickets "  # nosec B608
+        f"{where} {order_by} LIMIT ?"
+    )
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(TicketSummary)
+        cursor.execute(query, (*params, page_size + 1))
+        tickets = cursor.fetchall()
+
+    has_more = len(tickets) > page_size
+    tickets = tickets[:page_size]
+    if backwards:
+        tickets.reverse()
+
+    has_next = True if backwards else has_more
+    has_prev = has_more if backwards else bool(after)
+    return {
+        "tickets": tickets,
+        "next": encode_ticket_cursor(tickets[-1]) if tickets and has_next else None,
+        "prev": encode_ticket_cursor(tickets[0]) if tickets and has_prev else None,
+    }
+
+
+def iter_tickets(
+    status=None,
+    category_id=None,
+    username=None,
+    user_id=None,
+    include_closed=True,
+    sort="newest",
+):
+    """Yields every matching TicketSummary, reading STREAM_BATCH_SIZE at a time.
+
+    Runs in one read transaction, so the whole list comes from one snapshot,
+    and never holds more than a batch of rows. The transaction ends when the
+    generator is exhausted or closed (e.g. the client disconnects). It is on
+    a connection of its own, not this thread's pooled one: queries the
+    caller runs between rows would otherwise join the stream's transaction,
+    and their commits would end it.
+    """
+    if sort not in TICKET_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'")
+    conditions, params = _ticket_filters(
+        status, category_id, username, user_id, include_closed
+    )
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = TICKET_SORTS[sort]
+    query = (
+        f"SELECT {_TICKET_SUMMARY_COLUMNS} FROM tickets {where} "  # nosec B608
+        f"ORDER BY created_at {order}, ticket_id {order}"
+    )
+    conn = None
+    token = _query_label.set("iter_tickets")
+    try:
+        try:
+            conn = _open_connection(DB_NAME)
+            conn.execute("BEGIN")
+            cursor = conn.cursor()
+            cursor.row_factory = row_factory(TicketSummary)
+            cursor.execute(query, params)
+        finally:
+            # Not held across the yields, which run the caller's code
+            _query_label.reset(token)
+        while True:
+            rows = cursor.fetchmany(STREAM_BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        if conn is not None:
+            # Closing rolls the read transaction back
+            conn.close()
+
+
+def _fetch_ticket(cursor, ticket_id):
+    """Returns (Ticket, archived), reading through to the archive on a miss.
+
+    Live tickets cost the one primary key lookup they always did; only
+    tickets that aren't live pay for the second.
+    """
+    cursor.row_factory = row_factory(Ticket)
+    for table in ("tickets", "archived_tickets"):
+        cursor.execute(
+            f"SELECT {_TICKET_COLUMNS} FROM {table} WHERE ticket_id = ?",  # nosec B608
+            (ticket_id,),
+        )
+        ticket = cursor.fetchone()
+        if ticket is not None:
+            return ticket, table == "archived_tickets"
+    return None, False
+
+
+def _is_live(conn, ticket_id):
+    """Whether the ticket is in tickets, so an empty comment read needn't go on.
+
+    Archival moves a ticket and its comments in one transaction, so live
+    comments found missing before this check are in the archive after it.
+    """
+    row = conn.execute(
+        "SELECT 1 FROM tickets WHERE ticket_id = ?", (ticket_id,)
+    ).fetchone()
+    return row is not None
+
+
+@retry_on_lock
 def get_ticket(ticket_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,))
-    ticket = cursor.fetchone()
-    conn.close()
-    return ticket
+    """Returns the Ticket, live or archived, or None."""
+    with db_transaction() as conn:
+        return _fetch_ticket(conn.cursor(), ticket_id)[0]
+
 
+@retry_on_lock
+def is_ticket_archived(ticket_id):
+    with db_transaction() as conn:
+        row = conn.execute(
+            "SELECT 1 FROM archived_tickets WHERE ticket_id = ?", (ticket_id,)
+        ).fetchone()
+        return row is not None
 
+
+@retry_on_lock
 def get_comments_for_ticket(ticket_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    """Returns every comment on a ticket, from the archive if it was archived."""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(Comment)
+
+        for table in ("comments", "archived_comments"):
+            cursor.execute(
+                f"""
+                SELECT {_COMMENT_COLUMNS}
+                FROM {table} AS comments
+                JOIN users ON comments.user_id = users.user_id
+                WHERE comments.ticket_id = ?
+                ORDER BY comments.created_at ASC
+            """,  # nosec B608
+                (ticket_id,),
+            )
+            comments = cursor.fetchall()
+            if comments or _is_live(conn, ticket_id):
+                break
+        return comments
 
+
+def _fetch_comments_page(
+    cursor, ticket_id, after=None, before=None, limit=None, table="comments"
+):
+    """Returns (comments, has_more) for one keyset page, oldest first.
+
+    With after, the page holds the comments immediately newer than that id
+    and has_more means even newer ones exist. Otherwise it holds the newest
+    comments (older than before, if given) and has_more means older exist.
+    table is "archived_comments" for an archived ticket.
+    """
+    limit = limit or COMMENT_PAGE_SIZE
+    if after is not None:
+        condition, params, order = "AND comments.comment_id > ?", (after,), "ASC"
+    elif before is not None:
+        condition, params, order = "AND comments.comment_id < ?", (before,), "DESC"
+    else:
+        condition, params, order = "", (), "DESC"
+
+    cursor.row_factory = row_factory(Comment)
     cursor.execute(
-        """
-        SELECT comments.comment_id, comments.ticket_id, comments.user_id, comments.message, comments.created_at, users.username
-        FROM comments
+        f"""
+        SELECT {_COMMENT_COLUMNS}
+        FROM {table} AS comments
         JOIN users ON comments.user_id = users.user_id
-        WHERE comments.ticket_id = ?
-        ORDER BY comments.created_at ASC
-    """,
-        (ticket_id,),
+        WHERE comments.ticket_id = ? {condition}
+        ORDER BY comments.comment_id {order}
+        LIMIT ?
+    """,  # nosec B608
+        (ticket_id, *params, limit + 1),
     )
-
     comments = cursor.fetchall()
-    conn.close()
-    return comments
+    has_more = len(comments) > limit
+    comments = comments[:limit]
+    if order == "DESC":
+        comments.reverse()
+    return comments, has_more
+
 
+@retry_on_lock
+def get_ticket_details(ticket_id, before=None, limit=None):
+    """Loads a ticket and a page of its newest comments in one read transaction.
+
+    Returns None if the ticket doesn't exist, otherwise a dict with the
+    ticket row, its comments (oldest first), whether older ones exist and
+    whether the ticket was archived.
+    """
+    with db_transaction() as conn:
+        # One snapshot, so the comments always match the ticket shown
+        conn.execute("BEGIN")
+        cursor = conn.cursor()
+        ticket, archived = _fetch_ticket(cursor, ticket_id)
+        if ticket is None:
+            return None
+        comments, has_older = _fetch_comments_page(
+            cursor,
+            ticket_id,
+            before=before,
+            limit=limit,
+            table="archived_comments" if archived else "comments",
+        )
 
+    return {
+        "ticket": ticket,
+        "comments": comments,
+        "has_older": has_older,
+        "archived": archived,
+    }
+
+
+@retry_on_lock
+def get_comments_page(ticket_id, after=None, before=None, limit=None):
+    """Returns (comments, has_more) for the comments after or before an id."""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        for table in ("comments", "archived_comments"):
+            page = _fetch_comments_page(
+                cursor, ticket_id, after=after, before=before, limit=limit, table=table
+            )
+            if page[0] or _is_live(conn, ticket_id):
+                break
+        return page
+
+
+@retry_on_lock
 def delete_ticket(ticket_id):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with db_transaction() as conn:
+        cursor = conn.cursor()
 
-    # First delete comments linked to ticket (because of FK constraint)
-    cursor.execute("DELETE FROM comments WHERE ticket_id = ?", (ticket_id,))
+        # An archived ticket is deleted from the archive
+        cursor.execute(
+            "DELETE FROM archived_comments WHERE ticket_id = ?", (ticket_id,)
+        )
+        cursor.execute("DELETE FROM archived_tickets WHERE ticket_id = ?", (ticket_id,))
 
-    cursor.execute("DELETE FROM tickets WHERE ticket_id = ?", (ticket_id,))
-    conn.commit()
-    conn.close()
+        # First delete comments linked to ticket (because of FK constraint)
+        cursor.execute("DELETE FROM comments WHERE ticket_id = ?", (ticket_id,))
+
+        cursor.execute("DELETE FROM tickets WHERE ticket_id = ?", (ticket_id,))
+
+
+def _update_ticket_status_row(conn, ticket_id, new_status):
+    conn.execute(
+        "UPDATE tickets SET status = ?, updated_at = ? WHERE ticket_id = ?",
+        (new_status, _now(), ticket_id),
+    )
 
 
 def update_ticket_status(ticket_id, new_status):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    _write(_update_ticket_status_row, ticket_id, new_status)
 
-    cursor.execute(
-        "UPDATE tickets SET status = ? WHERE ticket_id = ?", (new_status, ticket_id)
+
+def _update_ticket_row(conn, ticket_id, changes):
+    columns = [column for column in TICKET_EDITABLE if column in changes]
+    assignments = ", ".join(f"{column} = ?" for column in columns)
+    cursor = conn.execute(
+        f"UPDATE tickets SET {assignments}, updated_at = ? "  # nosec B608
+        "WHERE ticket_id = ?",
+        (*(changes[column] for column in columns), _now(), ticket_id),
     )
-    conn.commit()
-    conn.close()
+    return cursor.rowcount > 0
 
 
-def get_categories():
+def update_ticket(ticket_id, changes):
+    """Sets the TICKET_EDITABLE columns in changes; False if there's no such ticket."""
+    unknown = set(changes) - set(TICKET_EDITABLE)
+    if unknown or not changes:
+        raise ValueError(f"Can't update ticket fields {sorted(unknown) or 'none'}")
+    return _write(_update_ticket_row, ticket_id, changes)
+
+
+@retry_on_lock
+def get_ticket_changes(
+    fields=TICKET_FIELDS,
+    user_id=None,
+    status=None,
+    category_id=None,
+    updated_since=None,
+    after=None,
+    limit=None,
+):
+    """Returns a page of tickets as dicts of fields, least recently changed first.
+
+    Keyset-paged on change_seq, which every write to a ticket raises past
+    any committed before it: the result's "last" is the change_seq of its
+    last ticket, to pass as after for the next page. A ticket that changes
+    moves to the end, so after a key also finds every later change.
+    updated_since keeps tickets updated at or after that timestamp.
+    """
+    unknown = set(fields) - set(TICKET_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown ticket fields {sorted(unknown)}")
+    limit = limit or DASHBOARD_PAGE_SIZE
+    # The paging key is always read, even when fields leaves it out
+    columns = [*fields, "change_seq"]
+
+    conditions, params = _ticket_filters(status, category_id, None, user_id, True)
+    if updated_since:
+        conditions.append("updated_at >= ?")
+        params.append(updated_since)
+    if after:
+        conditions.append("change_seq > ?")
+        params.append(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    query = (
+        f"SELECT {', '.join(columns)} FROM tickets {where} "  # nosec B608
+        "ORDER BY change_seq LIMIT ?"
+    )
+    with db_transaction() as conn:
+        rows = conn.execute(query, (*params, limit + 1)).fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    count = len(fields)
+    return {
+        "tickets": [dict(zip(fields, row[:count])) for row in rows],
+        "has_more": has_more,
+        "last": rows[-1][-1] if rows else None,
+    }
+
+
+@retry_on_lock
+def get_ticket_counts():
+    """Returns {category_id: {status: total}} from the trigger-maintained counters."""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT category_id, status, total FROM ticket_counts WHERE total > 0"
+        )
+        counts = {}
+        for category_id, status, total in cursor.fetchall():
+            counts.setdefault(category_id, {})[status] = total
+        return counts
+
+
+@retry_on_lock
+def check_ticket_counts(repair=False):
+    """Recounts tickets, live and archived, and compares them with ticket_counts.
+
+    Returns a list of (category_id, status, stored, actual) for every pair
+    that has drifted. With repair=True the counters are rebuilt in the same
+    write transaction, so no ticket change can slip in between.
+    """
+    with db_transaction() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        actual = {
+            (category_id, status): total
+            for category_id, status, total in conn.execute(
+                "SELECT category_id, status, COUNT(*) FROM ("
+                " SELECT category_id, status FROM tickets"
+                " UNION ALL SELECT category_id, status FROM archived_tickets"
+                ") GROUP BY category_id, status"
+            )
+        }
+        stored = {
+            (category_id, status): total
+            for category_id, status, total in conn.execute(
+                "SELECT category_id, status, total FROM ticket_counts"
+            )
+        }
+        drift = []
+        for key in sorted(set(actual) | set(stored)):
+            if stored.get(key, 0) != actual.get(key, 0):
+                drift.append((*key, stored.get(key, 0), actual.get(key, 0)))
+        if repair and drift:
+            conn.execute("DELETE FROM ticket_counts")
+            conn.executemany(
+                "INSERT INTO ticket_counts (category_id, status, total)"
+                " VALUES (?, ?, ?)",
+                [(*key, total) for key, total in actual.items()],
+            )
+    return drift
+
+
+@retry_on_lock
+def _load_categories(_):
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(Category)
+        cursor.execute("SELECT category_id, category_name FROM categories")
+        return tuple(cursor.fetchall())
+
+
+@retry_on_lock
+def _load_username(user_id):
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM users WHERE user_id = ?", (user_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+
+_reference_caches = {
+    "categories": ReferenceCache(
+        "categories", _load_categories, ttl=REFERENCE_CACHE_TTL
+    ),
+    "usernames": ReferenceCache(
+        "usernames",
+        _load_username,
+        ttl=REFERENCE_CACHE_TTL,
+        max_entries=REFERENCE_CACHE_MAX_ENTRIES,
+    ),
+}
+
+metrics.Counter(
+    "reference_cache_hits_total",
+    "Reference data lookups served from the in-process cache.",
+    ("cache",),
+    source=lambda: {(name,): c.hits for name, c in _reference_caches.items()},
+)
+metrics.Counter(
+    "reference_cache_misses_total",
+    "Reference data lookups that had to query the database.",
+    ("cache",),
+    source=lambda: {(name,): c.misses for name, c in _reference_caches.items()},
+)
+
+
+@retry_on_lock
+def _reference_versions():
+    """Returns {cache name: version}, re-read only after another connection commits."""
     conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT category_id, category_name FROM categories")
-    categories = cursor.fetchall()
-    conn.close()
-    return categories
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if getattr(_local, "reference_data_version", None) != data_version:
+        _local.reference_versions = dict(
+            conn.execute("SELECT name, version FROM cache_versions").fetchall()
+        )
+        _local.reference_data_version = data_version
+    return _local.reference_versions
+
+
+def get_reference(name, key=None):
+    """Reads lookup data through its process-wide cache."""
+    version = _reference_versions().get(name)
+    return _reference_caches[name].get(key, version)
+
+
+def invalidate_reference_cache(name=None):
+    """Drops one reference cache, or all of them when name is None.
+
+    Other workers notice changes through the cache_versions triggers, but a
+    connection never sees its own commits in data_version, so code that
+    writes reference data should call this afterwards.
+    """
+    names = [name] if name else list(_reference_caches)
+    for cache_name in names:
+        _reference_caches[cache_name].invalidate()
+    # Also forget the versions this thread last saw
+    _local.reference_data_version = None
+
+
+def reference_cache_stats():
+    """Returns hit/miss/size counters for every reference cache."""
+    return {name: cache.stats() for name, cache in _reference_caches.items()}
+
+
+def get_categories():
+    return get_reference("categories")
+
+
+def get_username(user_id):
+    return get_reference("usernames", user_id)
+
+
+def _close_ticket_row(conn, ticket_id):
+    conn.execute(
+        "UPDATE tickets SET status = 'closed', updated_at = ? WHERE ticket_id = ?",
+        (_now(), ticket_id),
+    )
 
 
 def close_ticket(ticket_id):
-    conn = get_db_connection()
+    _write(_close_ticket_row, ticket_id)
+
+
+def _insert_comment_row(conn, ticket_id, user_id, message):
     cursor = conn.cursor()
     cursor.execute(
-        "UPDATE tickets SET status = 'closed' WHERE ticket_id = ?", (ticket_id,)
+        "INSERT INTO comments (ticket_id, user_id, message) VALUES (?, ?, ?)",
+        (ticket_id, user_id, message),
     )
-    conn.commit()
-    conn.close()
+    # A new comment counts as a change to its ticket for updated_since
+    conn.execute(
+        "UPDATE tickets SET updated_at = ? WHERE ticket_id = ?", (_now(), ticket_id)
+    )
+    return cursor.lastrowid
 
 
 def insert_comment(ticket_id, user_id, message):
+    """Adds a comment and returns its comment_id."""
+    return _write(_insert_comment_row, ticket_id, user_id, message)
+
+
+@retry_on_lock
+def get_change_bounds():
+    """Returns (oldest seq still in the changes log, newest seq ever written).
+
+    A reader that has seen seq N missed pruned changes if N < oldest - 1.
+    """
+    with db_transaction() as conn:
+        # Separate subqueries: SQLite only reads MIN/MAX off the index one at a time
+        low, high = conn.execute(
+            "SELECT (SELECT MIN(seq) FROM changes), (SELECT MAX(seq) FROM changes)"
+        ).fetchone()
+        if high is None:
+            # Empty or pruned away; AUTOINCREMENT still knows the last seq
+            row = conn.execute(
+                "SELECT seq FROM sqlite_sequence WHERE name = 'changes'"
+            ).fetchone()
+            high = row[0] if row else 0
+            low = high + 1
+        return low, high
+
+
+@retry_on_lock
+def get_changes(after, owner_id=None, limit=None):
+    """Returns up to limit Change rows with seq > after, oldest first.
+
+    owner_id keeps only changes to that user's tickets.
+    """
+    limit = limit or CHANGES_BATCH_SIZE
+    condition = "AND changes.owner_id = ?" if owner_id else ""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(Change)
+        cursor.execute(
+            f"""
+            SELECT changes.seq, changes.kind, changes.ticket_id, changes.owner_id,
+                   changes.category_id, changes.status, changes.old_status,
+                   changes.comment_id,
+                   CASE WHEN changes.kind = 'ticket_created'
+                        THEN {_summary_sql('tickets.description')} END
+            FROM changes
+            LEFT JOIN tickets ON tickets.ticket_id = changes.ticket_id
+            WHERE changes.seq > ? {condition}
+            ORDER BY changes.seq
+            LIMIT ?
+        """,  # nosec B608
+            (after, owner_id, limit) if owner_id else (after, limit),
+        )
+        return cursor.fetchall()
+
+
+@retry_on_lock
+def prune_changes(days=None):
+    """Deletes changes older than days (CHANGES_RETENTION_DAYS); returns how many."""
+    days = CHANGES_RETENTION_DAYS if days is None else days
+    with db_transaction() as conn:
+        # seq follows time, so find the cut-off seq and delete by primary key
+        cursor = conn.execute(
+            """
+            DELETE FROM changes WHERE seq <= (
+                SELECT MAX(seq) FROM changes
+                WHERE created_at < datetime('now', ?)
+            )
+        """,
+            (f"-{days} days",),
+        )
+        return cursor.rowcount
+
+
+def _archive_batch(cutoff, batch_size):
+    """Moves up to batch_size closed tickets last updated before cutoff.
+
+    Returns how many were moved. Each batch is one short write transaction:
+    copy the tickets and their comments to the archive tables, then delete
+    them, so readers see every ticket in exactly one place.
+    """
+    with db_transaction() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        ids = [
+            ticket_id
+            for ticket_id, in conn.execute(
+                "SELECT ticket_id FROM tickets"
+                " WHERE status = 'closed' AND updated_at < ?"
+                " ORDER BY updated_at LIMIT ?",
+                (cutoff, batch_size),
+            )
+        ]
+        if not ids:
+            return 0
+        # At most ARCHIVE_BATCH_SIZE ids; values are bound parameters
+        where = f"WHERE ticket_id IN ({_placeholders(ids)})"
+        conn.execute(
+            f"INSERT INTO archived_tickets ({_TICKET_COLUMNS}, archived_at) "  # nosec B608
+            f"SELECT {_TICKET_COLUMNS}, ? FROM tickets {where}",
+            (_now(), *ids),
+        )
+        conn.execute(
+            "INSERT INTO archived_comments"  # nosec B608
+            " (comment_id, ticket_id, user_id, message, created_at)"
+            " SELECT comment_id, ticket_id, user_id, message, created_at"
+            f" FROM comments {where}",
+            ids,
+        )
+        conn.execute(f"DELETE FROM comments {where}", ids)  # nosec B608
+        conn.execute(f"DELETE FROM tickets {where}", ids)  # nosec B608
+        return len(ids)
+
+
+def archive_closed_tickets(days=None, batch_size=None, pause=0.0):
+    """Archives tickets closed and untouched for days (ARCHIVE_AFTER_DAYS).
+
+    Works through them batch_size (ARCHIVE_BATCH_SIZE) at a time, sleeping
+    pause seconds between batches so waiting writers get the lock, and
+    returns how many tickets were archived. The search indexes keep entries
+    for them until optimize_search_index() runs.
+    """
+    days = ARCHIVE_AFTER_DAYS if days is None else days
+    batch_size = batch_size or ARCHIVE_BATCH_SIZE
+    cutoff = (datetime.now() - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+    archive_batch = retry_on_lock(_archive_batch)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        if moved < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+
+@retry_on_lock
+def get_archived_tickets_page(after=None, page_size=None):
+    """Returns a page of archived tickets, highest ticket_id first.
+
+    Pass the page's ``next`` (a ticket_id) as ``after`` for the next page.
+    """
+    page_size = page_size or DASHBOARD_PAGE_SIZE
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(ArchivedTicket)
+        cursor.execute(
+            f"""
+            SELECT ticket_id, title, {_summary_sql('description')}, created_at,
+                   archived_at
+            FROM archived_tickets
+            WHERE ticket_id < ?
+            ORDER BY ticket_id DESC
+            LIMIT ?
+        """,  # nosec B608
+            (after or sys.maxsize, page_size + 1),
+        )
+        tickets = cursor.fetchall()
+
+    has_more = len(tickets) > page_size
+    tickets = tickets[:page_size]
+    return {"tickets": tickets, "next": tickets[-1].ticket_id if has_more else None}
+
+
+def _hash_api_token(token):
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+@retry_on_lock
+def create_api_token(username, name):
+    """Creates an API token for username; returns (token_id, token), or None.
+
+    The token itself is only returned here, the database keeps a hash of it.
+    """
+    token = secrets.token_urlsafe(32)
+    with db_transaction() as conn:
+        cursor = conn.execute(
+            """
+            INSERT INTO api_tokens (user_id, name, token_hash)
+            SELECT user_id, ?, ? FROM users WHERE username = ?
+        """,
+            (name, _hash_api_token(token), username),
+        )
+        if cursor.rowcount == 0:
+            return None
+        return cursor.lastrowid, token
+
+
+@retry_on_lock
+def get_api_token_user(token):
+    """Returns the User an API token belongs to, or None if it isn't valid."""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(User)
+        cursor.execute(
+            """
+            SELECT users.user_id, users.role, users.username
+            FROM api_tokens JOIN users ON api_tokens.user_id = users.user_id
+            WHERE api_tokens.token_hash = ?
+        """,
+            (_hash_api_token(token),),
+        )
+        return cursor.fetchone()
+
+
+@retry_on_lock
+def get_api_tokens(username=None):
+    """Lists API tokens (never the tokens themselves), optionally for one user."""
+    condition = "WHERE users.username = ?" if username else ""
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.row_factory = row_factory(ApiToken)
+        cursor.execute(
+            f"""
+            SELECT api_tokens.token_id, users.username, api_tokens.name,
+                   api_tokens.created_at
+            FROM api_tokens JOIN users ON api_tokens.user_id = users.user_id
+            {condition}
+            ORDER BY api_tokens.token_id
+        """,  # nosec B608
+            (username,) if username else (),
+        )
+        return cursor.fetchall()
+
+
+@retry_on_lock
+def revoke_api_token(token_id):
+    """Deletes an API token; returns False if there was no such token."""
+    with db_transaction() as conn:
+        cursor = conn.execute("DELETE FROM api_tokens WHERE token_id = ?", (token_id,))
+        return cursor.rowcount > 0
+
+
+@labels_queries
+def sync_username_index():
+    """Brings the in-memory username index up to date with the users table.
+
+    PRAGMA data_version only changes when another connection (another
+    thread or gunicorn worker) commits, so the common case costs no query.
+    """
     conn = get_db_connection()
+    version = conn.execute("PRAGMA data_version").fetchone()[0]
+    if _username_index.loaded and getattr(_local, "users_version", None) == version:
+        return
+
     cursor = conn.cursor()
     cursor.execute(
-        "INSERT INTO comments (ticket_id, user_id, message) VALUES (?, ?, ?)",
-        (ticket_id, user_id, message),
+        "SELECT user_id, username FROM users WHERE user_id > ? ORDER BY user_id",
+        (_username_index.max_user_id,),
     )
-    conn.commit()
-    conn.close()
+    rows = cursor.fetchall()
+    if not _username_index.loaded or _username_index.needs_rebuild(len(rows)):
+        cursor.execute("SELECT user_id, username FROM users")
+        _username_index.rebuild(cursor)
+    else:
+        _username_index.add_rows(rows)
+    _local.users_version = version
+
+
+def reset_caches():
+    """Forgets every in-process cache, e.g. after swapping databases."""
+    _username_index.reset()
+    for cache in _reference_caches.values():
+        cache.reset()
+    _local.reference_data_version = None
 
 
+@retry_on_lock
 def username_exists(username):
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT user_id FROM users WHERE username = ?", (username,))
-    exists = cursor.fetchone() is not None
-    conn.close()
-    return exists
+    """Checks if a username is taken, skipping the users query on index misses."""
+    sync_username_index()
+    if not _username_index.might_contain(username):
+        return False
+
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE username = ?", (username,))
+        return cursor.fetchone() is not None
+
+
+@retry_on_lock
+def usernames_exist(usernames):
+    """Returns {username: taken} for a batch, querying only possible matches."""
+    sync_username_index()
+    results = {username: False for username in usernames}
+    candidates = [u for u in results if _username_index.might_contain(u)]
+    if not candidates:
+        return results
+
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT username FROM users "
+            f"WHERE username IN ({_placeholders(candidates)})",  # nosec B608
+            candidates,
+        )
+        for (username,) in cursor:
+            results[username] = True
+    return results
+
+
+def build_match_query(text):
+    """Turns free text into an FTS5 query that matches every word.
+
+    Each word is quoted, so user input can never be parsed as FTS5 syntax.
+    Prefix queries are deliberately not generated: they expand to every
+    indexed term sharing the prefix and are far slower on large indexes.
+    Returns None when there is nothing to search for.
+    """
+    words = text.split()
+    if not words:
+        return None
+    return " ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+
+_MAX_ROWID = 2**63 - 1
+
+
+def _search_window(cursor, match, bounds):
+    """Returns the next window of live admin search matches, best first.
+
+    Each index contributes its newest SEARCH_CANDIDATES matches at or below
+    its bound in `bounds`, joined to live tickets before the limit so rows
+    the index still holds for deleted or archived tickets don't use up the
+    window. `bounds` is moved past the window, or set to None for an index
+    with no older matches left.
+    """
+    limits = {
+        source: SEARCH_CANDIDATES if bound else 0 for source, bound in bounds.items()
+    }
+    cursor.execute(
+        """
+        SELECT * FROM (
+            SELECT tickets_fts.rowid AS ticket_id, 'tickets' AS source,
+                   tickets_fts.rowid, bm25(tickets_fts) AS rank
+            FROM tickets_fts
+            JOIN tickets ON tickets.ticket_id = tickets_fts.rowid
+            WHERE tickets_fts MATCH ? AND tickets_fts.rowid <= ?
+            ORDER BY tickets_fts.rowid DESC LIMIT ?
+        )
+        UNION ALL
+        SELECT * FROM (
+            SELECT comments.ticket_id, 'comments', comments_fts.rowid,
+                   bm25(comments_fts)
+            FROM comments_fts
+            JOIN comments ON comments.comment_id = comments_fts.rowid
+            JOIN tickets ON tickets.ticket_id = comments.ticket_id
+            WHERE comments_fts MATCH ? AND comments_fts.rowid <= ?
+            ORDER BY comments_fts.rowid DESC LIMIT ?
+        )
+        ORDER BY rank
+    """,
+        (
+            match,
+            bounds["tickets"] or 0,
+            limits["tickets"],
+            match,
+            bounds["comments"] or 0,
+            limits["comments"],
+        ),
+    )
+    window = cursor.fetchall()
+    for source, limit in limits.items():
+        rowids = [row[2] for row in window if row[1] == source]
+        if len(rowids) < limit or not rowids:
+            bounds[source] = None
+        else:
+            bounds[source] = min(rowids) - 1
+    return window
+
+
+@retry_on_lock
+def search_tickets(text, user_id=None, limit=None):
+    """Returns (ticket_id, title, status, snippet) rows, best match first.
+
+    Ticket titles/descriptions and comment messages are searched through
+    their FTS5 indexes and merged per ticket. Admin searches (no user_id)
+    rank matches by bm25 within windows of the newest SEARCH_CANDIDATES
+    live matches of each index, so cost stays flat as the corpus grows.
+    Older windows are read only until `limit` tickets are found: on a
+    common term the newest window fills the page, and older tickets are
+    not returned however well they match. With user_id only that user's
+    open tickets are searched, mirroring the user dashboard; those few rows
+    drive the lookup, with title/description hits ahead of comment hits and
+    newer tickets first. Snippets are only built for the rows returned.
+    """
+    match = build_match_query(text)
+    if match is None:
+        return []
+    limit = limit or SEARCH_RESULTS_LIMIT
+
+    with db_transaction() as conn:
+        cursor = conn.cursor()
+        best = {}
+        if user_id is None:
+            # rowid bounds for the next window of each index; None once spent
+            bounds = {"tickets": _MAX_ROWID, "comments": _MAX_ROWID}
+            while len(best) < limit and any(bounds.values()):
+                window = _search_window(cursor, match, bounds)
+                for ticket_id, source, rowid, _ in window:
+                    if ticket_id not in best:
+                        best[ticket_id] = (source, rowid)
+                        if len(best) == limit:
+                            break
+        else:
+            cursor.execute(
+                """
+                SELECT tickets.ticket_id, 'tickets', tickets.ticket_id, 0 AS rank
+                FROM tickets
+                CROSS JOIN tickets_fts ON tickets_fts.rowid = tickets.ticket_id
+                WHERE tickets.user_id = ? AND tickets.status != 'closed'
+                  AND tickets_fts MATCH ?
+                UNION ALL
+                SELECT tickets.ticket_id, 'comments', comments.comment_id, 1
+                FROM tickets
+                CROSS JOIN comments ON comments.ticket_id = tickets.ticket_id
+                CROSS JOIN comments_fts ON comments_fts.rowid = comments.comment_id
+                WHERE tickets.user_id = ? AND tickets.status != 'closed'
+                  AND comments_fts MATCH ?
+                ORDER BY rank, 1 DESC
+            """,
+                (user_id, match, user_id, match),
+            )
+
+            # Keep the best match per ticket
+            for ticket_id, source, rowid, _ in cursor:
+                if ticket_id not in best:
+                    best[ticket_id] = (source, rowid)
+                    if len(best) == limit:
+                        break
+        if not best:
+            return []
+
+        snippets = {}
+        for source, column in (("tickets", -1), ("comments", 0)):
+            rowids = [rowid for kind, rowid in best.values() if kind == source]
+            if not rowids:
+                continue
+            cursor.execute(
+                f"SELECT rowid, snippet({source}_fts, {column}, ?, ?, '…', 12) "
+                f"FROM {source}_fts WHERE {source}_fts MATCH ? "
+                f"AND rowid IN ({_placeholders(rowids)})",  # nosec B608
+                (SNIPPET_START, SNIPPET_END, match, *rowids),
+            )
+            snippets.update(((source, rowid), text) for rowid, text in cursor)
+
+        ticket_ids = list(best)
+        cursor.execute(
+            "SELECT ticket_id, title, status FROM tickets "
+            f"WHERE ticket_id IN ({_placeholders(ticket_ids)})",  # nosec B608
+            ticket_ids,
+        )
+        tickets = {row[0]: row for row in cursor}
+
+    return [
+        (*tickets[ticket_id], snippets.get(best[ticket_id], ""))
+        for ticket_id in ticket_ids
+        if ticket_id in tickets
+    ]
+
+
+@retry_on_lock
+def optimize_search_index():
+    """Merges each full-text index into one segment.
+
+    FTS5 only marks deleted (and archived) rows as gone, and searches read
+    past those entries until their segments are merged. Each index is one
+    write transaction that lasts as long as the merge, so run it from
+    maintenance jobs, not from requests.
+    """
+    for index in ("tickets_fts", "comments_fts"):
+        with db_transaction() as conn:
+            conn.execute(
+                f"INSERT INTO {index} ({index}) VALUES ('optimize')"  # nosec B608
+            )
+
+
+@retry_on_lock
+def rebuild_search_index():
+    """Rebuilds both full-text indexes from the tickets and comments tables."""
+    with db_transaction() as conn:
+        conn.execute("INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild')")
+        conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
@@ -0,0 +1,99 @@
+import os
+import re
+import sqlite3
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+MIGRATION_FILE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+
+
+def load_migrations(migrations_dir=MIGRATIONS_DIR):
+    """Returns (version, name, sql) for every migration file, in version order."""
+    migrations = []
+    for filename in os.listdir(migrations_dir):
+        match = MIGRATION_FILE.match(filename)
+        if not match:
+            continue
+        with open(os.path.join(migrations_dir, filename), "r") as f:
+            migrations.append((int(match.group(1)), match.group(2), f.read()))
+
+    migrations.sort()
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError("Duplicate migration version numbers found.")
+    return migrations
+
+
+def split_statements(sql):
+    """Splits a SQL script into statements, keeping trigger bodies intact."""
+    statements = []
+    buffer = ""
+    for line in sql.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+
+    leftover = "\n".join(
+        line for line in buffer.splitlines() if not line.strip().startswith("--")
+    )
+    if leftover.strip():
+        raise ValueError(f"Incomplete SQL statement: {leftover.strip()[:60]}")
+    return statements
+
+
+def get_schema_version(conn):
+    """Returns the highest applied migration version, or 0 for a new database."""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.commit()
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR, target=None):
+    """Applies every pending migration and returns the versions applied.
+
+    Each migration runs in its own BEGIN IMMEDIATE transaction and the
+    version is re-checked once the write lock is held, so several gunicorn
+    workers starting at once apply each migration exactly once. target stops
+    after that version, e.g. to bulk-load rows before indexes and triggers
+    exist.
+    """
+    applied = []
+    current = get_schema_version(conn)
+
+    for version, name, sql in load_migrations(migrations_dir):
+        if version <= current:
+            continue
+        if target is not None and version > target:
+            break
+
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            current = conn.execute(
+                "SELECT COALESCE(MAX(version), 0) FROM schema_version"
+            ).fetchone()[0]
+            if version <= current:
+                conn.rollback()
+                continue
+
+            for statement in split_statements(sql):
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        current = version
+        applied.append(version)
+
+    return applied
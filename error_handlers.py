@@ -4,37 +4,39 @@ from flask import render_template, request
 def register_error_handlers(app):
     @app.errorhandler(400)
     def bad_request(e):
-        app.logger.warning(f"400 - Bad Request: {e}")
+        app.logger.warning("400 - Bad Request: %s", e)
         return render_template("error.html", message="Bad request."), 400
 
     @app.errorhandler(401)
     def unauthorized(e):
-        app.logger.warning(f"401 - Unauthorized: {e}")
+        app.logger.warning("401 - Unauthorized: %s", e)
         return render_template("error.html", message="Unauthorized access."), 401
 
     @app.errorhandler(403)
     def forbidden(e):
-        app.logger.warning(f"403 - Forbidden: {e}")
+        app.logger.warning("403 - Forbidden: %s", e)
         return render_template("error.html", message="Permission denied."), 403
 
     @app.errorhandler(404)
     def not_found(e):
-        app.logger.info(f"404 - Page not found: {request.url}")
+        app.logger.info("404 - Page not found: %s", request.url)
         return render_template("error.html", message="Page not found."), 404
 
     @app.errorhandler(422)
     def unprocessable(e):
-        app.logger.warning(f"422 - Unprocessable entity: {e}")
+        app.logger.warning("422 - Unprocessable entity: %s", e)
         return render_template("error.html", message="Unprocessable input."), 422
 
     @app.errorhandler(429)
     def too_many(e):
-        app.logger.warning(f"429 - Too many requests: {e}")
+        app.logger.warning("429 - Too many requests: %s", e)
+        retry_after = getattr(e, "retry_after", None)
         return (
             render_template(
                 "error.html", message="Too many requests. Please slow down."
             ),
             429,
+            {"Retry-After": str(retry_after)} if retry_after else {},
         )
 
     @app.errorhandler(500)
@@ -44,5 +46,5 @@ def register_error_handlers(app):
 
     @app.errorhandler(Exception)
     def unhandled_exception(e):
-        app.logger.critical(f"Unhandled exception: {e}", exc_info=True)
+        app.logger.critical("Unhandled exception: %s", e, exc_info=True)
         return render_template("error.html", message="Something went wrong."), 500
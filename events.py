@@ -0,0 +1,142 @@
+"""Server-Sent Events feed of ticket and comment changes, at /events.
+
+Each stream polls the changes log for rows after the last seq it sent and
+pushes them as ticket_created, status_changed, ticket_deleted,
+ticket_archived and comment_added events, with the seq as the event id.
+EventSource resends the last id it saw as Last-Event-ID when it
+reconnects, so a dropped connection carries on where it stopped instead
+of missing changes.
+
+Every open stream holds a worker thread, so streams end after
+EVENTS_MAX_SECONDS (the browser reconnects on its own) and each process
+serves at most EVENTS_MAX_STREAMS at once. That cap stays below
+WEB_THREADS, the threads gunicorn gives each worker, so other requests
+always find a free thread.
+"""
+
+import json
+import os
+import threading
+import time
+
+import config  # noqa: F401 - loads .env
+from flask import Response, jsonify, request, session
+
+from database_operations import get_change_bounds, get_changes
+
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", 1.0))
+EVENTS_KEEPALIVE = float(os.getenv("EVENTS_KEEPALIVE", 15))
+EVENTS_MAX_SECONDS = float(os.getenv("EVENTS_MAX_SECONDS", 300))
+# gunicorn --threads per worker; render.yaml starts gunicorn with this value
+WEB_THREADS = int(os.getenv("WEB_THREADS", 8))
+# How long the browser waits before reconnecting after a stream ends
+EVENTS_RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", 2000))
+
+
+def max_streams(web_threads, requested=None):
+    """Streams allowed per process: half the threads unless set, never all.
+
+    A stream holds its thread for up to EVENTS_MAX_SECONDS, so a cap of
+    web_threads or more would let dashboards starve every other route.
+    With a single thread that leaves none: the cap is 0 and live updates
+    are turned off (see register_events).
+    """
+    if requested in (None, ""):
+        return web_threads // 2
+    return max(0, min(int(requested), web_threads - 1))
+
+
+EVENTS_MAX_STREAMS = max_streams(WEB_THREADS, os.getenv("EVENTS_MAX_STREAMS"))
+_streams = threading.BoundedSemaphore(EVENTS_MAX_STREAMS)
+
+
+def format_event(change):
+    data = {
+        "ticket_id": change.ticket_id,
+        "category_id": change.category_id,
+        "status": change.status,
+        "old_status": change.old_status,
+        "comment_id": change.comment_id,
+        "summary": change.summary,
+    }
+    return (
+        f"id: {change.seq}\n"
+        f"event: {change.kind}\n"
+        f"data: {json.dumps(data, separators=(',', ':'))}\n\n"
+    )
+
+
+def change_stream(after, owner_id=None):
+    """Yields SSE messages for changes after seq `after` until the stream expires.
+
+    If the changes after `after` were already pruned (or the database was
+    reset), a single reset event tells the client to reload instead.
+    """
+    yield f"retry: {EVENTS_RETRY_MS}\n\n"
+    low, high = get_change_bounds()
+    if after > high or after < low - 1:
+        yield f"id: {high}\nevent: reset\ndata: {{}}\n\n"
+        after = high
+
+    deadline = time.monotonic() + EVENTS_MAX_SECONDS
+    last_write = time.monotonic()
+    while time.monotonic() < deadline:
+        changes = get_changes(after, owner_id=owner_id)
+        if changes:
+            yield "".join(format_event(change) for change in changes)
+            after = changes[-1].seq
+            last_write = time.monotonic()
+            continue
+        # Writing is also the only way to notice the client has gone
+        if time.monotonic() - last_write >= EVENTS_KEEPALIVE:
+            yield ": keepalive\n\n"
+            last_write = time.monotonic()
+        time.sleep(EVENTS_POLL_INTERVAL)
+
+
+def register_events(app):
+    if EVENTS_MAX_STREAMS == 0:
+        app.logger.warning(
+            "Live dashboard updates are off: WEB_THREADS=%s leaves no thread "
+            "for event streams.",
+            WEB_THREADS,
+        )
+
+    @app.context_processor
+    def live_events():
+        # Dashboards only open the feed when a stream can be served
+        return {"live_events": EVENTS_MAX_STREAMS > 0}
+
+    @app.route("/events")
+    def events():
+        if "user_id" not in session:
+            # An EventSource can't follow a redirect to the login page
+            return jsonify({"error": "Login required."}), 401
+        if EVENTS_MAX_STREAMS == 0:
+            return jsonify({"error": "Live updates are turned off."}), 404
+
+        resume = request.headers.get("Last-Event-ID") or request.args.get("since")
+        try:
+            after = int(resume) if resume else get_change_bounds()[1]
+        except ValueError:
+            return jsonify({"error": "Last-Event-ID must be a change number."}), 400
+
+        if not _streams.acquire(blocking=False):
+            app.logger.warning(
+                "Event stream refused: %s already open.", EVENTS_MAX_STREAMS
+            )
+            return (
+                jsonify({"error": "Too many open event streams."}),
+                503,
+                {"Retry-After": "10"},
+            )
+
+        owner_id = None if session["role"] == "admin" else session["user_id"]
+        response = Response(
+            change_stream(after, owner_id), mimetype="text/event-stream"
+        )
+        # Released when the server closes the response, streamed or not
+        response.call_on_close(_streams.release)
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
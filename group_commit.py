@@ -0,0 +1,189 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+
+import metrics
+
+BATCH_SIZE = metrics.Histogram(
+    "db_group_commit_batch_size",
+    "Writes committed together per group commit transaction.",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+
+class WriteOutcomeUnknown(Exception):
+    """submit() stopped waiting after the write had joined a batch."""
+
+
+class GroupCommitWriter:
+    """Commits writes from many threads together on one dedicated connection.
+
+    submit(func, *args) queues func(conn, *args) and blocks until the
+    transaction that ran it has committed, then returns func's result (or
+    raises its exception). The writer thread takes the first waiting write
+    plus up to max_batch - 1 more, both those that queued up while the last
+    batch was committing and any arriving within max_delay seconds, and
+    runs them all in one transaction, so a burst of writes pays for one
+    commit instead of one each. Every write runs under its own savepoint:
+    one that raises is rolled back on its own and the rest still commit.
+
+    retry wraps the batch transaction (e.g. retry_on_lock), which rolls
+    back before raising, so a batch whose BEGIN or COMMIT hit a lock is
+    simply run again. If the writer thread itself fails (say connect()
+    raises), every queued write gets the error and the next submit starts a
+    new thread; timeout bounds how long submit waits in any case.
+
+    A write that times out while still queued is cancelled and never runs,
+    and submit raises TimeoutError. One already in a batch can't be called
+    back, so submit raises WriteOutcomeUnknown instead: it may yet commit,
+    and retrying it could apply it twice.
+    """
+
+    def __init__(self, connect, max_batch=64, max_delay=0.0, retry=None, timeout=None):
+        self.connect = connect
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._run_batch = retry(self._run_batch) if retry else self._run_batch
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        future = Future()
+        self._writer_queue().put((func, args, future))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            if future.cancel():
+                raise TimeoutError("Write timed out before it ran.") from None
+            if future.done():
+                # Finished just as the wait ran out
+                return future.result()
+            raise WriteOutcomeUnknown(
+                "Write timed out while being committed; it may still commit."
+            ) from None
+
+    def close(self):
+        """Stops this process's writer thread once queued writes are done."""
+        with self._lock:
+            if self._pid == os.getpid():
+                self._queue.put(None)
+            self._queue = None
+            self._pid = None
+
+    def _writer_queue(self):
+        """Returns the queue of this process's writer, starting it if needed."""
+        if self._pid == os.getpid():
+            return self._queue
+        with self._lock:
+            # A forked gunicorn worker has the parent's queue but not its thread
+            if self._pid != os.getpid():
+                self._queue = queue.SimpleQueue()
+                threading.Thread(
+                    target=self._write_loop,
+                    args=(self._queue,),
+                    name="group-commit",
+                    daemon=True,
+                ).start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def _write_loop(self, jobs):
+        conn = None
+        batch = []
+        try:
+            conn = self.connect()
+            while True:
+                batch = self._next_batch(jobs)
+                if batch is None:
+                    return
+                self._commit(conn, batch)
+        except Exception as e:
+            self._fail(jobs, batch, e)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    def _fail(self, jobs, batch, error):
+        """Fails every waiting write and lets the next submit restart the writer."""
+        with self._lock:
+            if self._queue is jobs:
+                self._queue = None
+                self._pid = None
+        while True:
+            for _, _, future in batch:
+                # Queued writes may have been cancelled by a timed out submit
+                if future.done():
+                    continue
+                if future.running() or future.set_running_or_notify_cancel():
+                    future.set_exception(error)
+            try:
+                job = jobs.get_nowait()
+            except queue.Empty:
+                return
+            batch = [job] if job is not None else []
+
+    def _next_batch(self, jobs):
+        """Returns the next batch (possibly empty), or None to stop.
+
+        Writes whose submit already timed out were cancelled and are
+        dropped; the rest are marked running so they can't be cancelled.
+        """
+        first = jobs.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            try:
+                # Take whatever queued up meanwhile; wait only until the deadline
+                job = jobs.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if job is None:
+                # Finish this batch, then stop
+                jobs.put(None)
+                break
+            batch.append(job)
+        return [job for job in batch if job[2].set_running_or_notify_cancel()]
+
+    def _commit(self, conn, batch):
+        if not batch:
+            return
+        try:
+            outcomes = self._run_batch(conn, batch)
+        except Exception as e:
+            for _, _, future in batch:
+                future.set_exception(e)
+            return
+        BATCH_SIZE.observe(len(batch))
+        for (_, _, future), (failed, value) in zip(batch, outcomes):
+            if failed:
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+
+    def _run_batch(self, conn, batch):
+        """Runs one transaction; returns [(failed, result or exception)]."""
+        outcomes = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for func, args, _ in batch:
+                conn.execute("SAVEPOINT write")
+                try:
+                    value = func(conn, *args)
+                except Exception as e:
+                    conn.execute("ROLLBACK TO write")
+                    outcomes.append((True, e))
+                else:
+                    outcomes.append((False, value))
+                conn.execute("RELEASE write")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        return outcomes
@@ -1,32 +1,82 @@
 import os
+import atexit
 import logging
-from dotenv import load_dotenv
+import logging.handlers
+import queue
+import config  # noqa: F401 - loads .env
 
-load_dotenv()
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.getenv("LOG_FILE", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG").upper()
+
+_listener = None
+
+
+def _file_handler(path):
+    """Appends to path, reopening it if something else moved or removed it.
+
+    Every gunicorn worker writes the same file, so none of them may rotate
+    it: a rotating handler in one process renames the file under the
+    others, which then write to the old file or overwrite its backups.
+    Appends from several processes are safe, so rotation is left to an
+    external tool such as logrotate, and each process reopens the new file.
+    """
+    return logging.handlers.WatchedFileHandler(path, delay=True)
 
 
 def configure_logging():
-    log_dir = os.getenv("LOG_DIR", "logs")
-    log_file = os.getenv("LOG_FILE", "app.log")
-    os.makedirs(log_dir, exist_ok=True)
+    """Routes the root logger through a queue to a background writer thread.
 
-    # Root logger
-    logger = logging.getLogger()
-    logger.setLevel(logging.DEBUG)  # Set to lowest to allow filtering per handler
+    Request threads only put records on the queue; the console and the
+    log file are written by a QueueListener. Safe to call again:
+    the previous listener is stopped and replaced.
+    """
+    global _listener
+    os.makedirs(LOG_DIR, exist_ok=True)
+    level = logging.getLevelName(LOG_LEVEL)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{LOG_LEVEL}'.")
 
-    # Console handler (everything)
+    # Console handler (LOG_LEVEL and above)
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG)
+    console_handler.setLevel(level)
     console_format = logging.Formatter("%(levelname)-8s | %(message)s")
     console_handler.setFormatter(console_format)
-    logger.addHandler(console_handler)
 
     # File handler (warnings and above only)
-    file_handler = logging.FileHandler(os.path.join(log_dir, log_file))
+    file_handler = _file_handler(os.path.join(LOG_DIR, LOG_FILE))
     file_handler.setLevel(logging.WARNING)
     file_format = logging.Formatter("%(asctime)s | %(levelname)-8s | %(message)s")
     file_handler.setFormatter(file_format)
-    logger.addHandler(file_handler)
+
+    stop_logging()
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, console_handler, file_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    # Root logger: records below every handler's level are dropped before
+    # they are built, so filtered-out calls cost a level check
+    logger = logging.getLogger()
+    for handler in logger.handlers[:]:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            logger.removeHandler(handler)
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(min(level, logging.WARNING))
 
     # Silence werkzeug logs going to file (avoid bloated log file)
     logging.getLogger("werkzeug").setLevel(logging.INFO)
+
+
+def stop_logging():
+    """Flushes queued records and stops the background writer."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,303 @@
+"""In-process metrics exported in the Prometheus text format.
+
+Each process keeps its own counters and histograms and writes a snapshot to
+METRICS_DIR/<pid>.json every METRICS_FLUSH_INTERVAL seconds while they
+change. /metrics merges the snapshots of every gunicorn worker, so a scrape
+sees the whole server no matter which worker answers it.
+"""
+
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+import config  # noqa: F401 - loads .env
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Workers share their gunicorn master's pid as parent, so each server run
+# gets a fresh directory unless one is configured
+METRICS_DIR = os.getenv("METRICS_DIR") or os.path.join(
+    tempfile.gettempdir(), f"helpdesk-metrics-{os.getppid()}"
+)
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 1.0))
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = {}
+_lock = threading.Lock()
+_dirty = False
+_flusher_pid = None
+
+
+class Counter:
+    """A monotonically increasing value per label combination.
+
+    source, if given, is called at collection time and returns
+    {labels: value}, for counts another object already keeps.
+    """
+
+    type = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), source=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.source = source
+        self._values = {}
+        _register(self)
+
+    def inc(self, *labels, amount=1.0):
+        global _dirty
+        with _lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+            _dirty = True
+
+    def samples(self):
+        if self.source:
+            values = self.source()
+        else:
+            with _lock:
+                values = dict(self._values)
+        return [[list(labels), value] for labels, value in values.items()]
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Observations counted into fixed buckets per label combination."""
+
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+        _register(self)
+
+    def observe(self, value, *labels):
+        global _dirty
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            state = self._values.get(labels)
+            if state is None:
+                # One slot per bucket plus +Inf, then the sum
+                state = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            state[index] += 1
+            state[-1] += value
+            _dirty = True
+
+    def samples(self):
+        with _lock:
+            return [
+                [list(labels), list(state)] for labels, state in self._values.items()
+            ]
+
+    def reset(self):
+        with _lock:
+            self._values.clear()
+
+
+def _register(metric):
+    if metric.name in _registry:
+        raise ValueError(f"Metric {metric.name} is already registered.")
+    _registry[metric.name] = metric
+
+
+def snapshot():
+    """Returns this process's metrics as a JSON-serialisable dict."""
+    return {
+        name: {
+            "type": metric.type,
+            "help": metric.documentation,
+            "labelnames": list(metric.labelnames),
+            "buckets": list(getattr(metric, "buckets", ())),
+            "samples": metric.samples(),
+        }
+        for name, metric in _registry.items()
+    }
+
+
+def reset():
+    """Zeroes every metric in this process (for tests)."""
+    for metric in _registry.values():
+        metric.reset()
+
+
+def flush():
+    """Writes this process's snapshot for the other workers to merge."""
+    global _dirty
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = os.path.join(METRICS_DIR, f"{os.getpid()}.json")
+    partial = f"{path}.tmp"
+    _dirty = False
+    with open(partial, "w") as f:
+        json.dump(snapshot(), f)
+    # Readers never see a half-written file
+    os.replace(partial, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_INTERVAL)
+        if not _dirty:
+            continue
+        try:
+            flush()
+        except OSError:
+            pass
+
+
+def start_flusher():
+    """Starts this process's background snapshot writer; cheap to call often."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _lock:
+        if _flusher_pid != os.getpid():
+            threading.Thread(target=_flush_loop, daemon=True).start()
+            _flusher_pid = os.getpid()
+
+
+def merge(snapshots):
+    """Sums snapshots from several processes, label set by label set."""
+    merged = {}
+    for metrics in snapshots:
+        for name, metric in metrics.items():
+            target = merged.setdefault(name, dict(metric, samples={}))
+            for labels, value in metric["samples"]:
+                key = tuple(labels)
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = value
+                elif isinstance(value, list):
+                    target["samples"][key] = [a + b for a, b in zip(current, value)]
+                else:
+                    target["samples"][key] = current + value
+    return merged
+
+
+def _is_running(pid):
+    if os.name != "posix":
+        # Signal 0 only probes on POSIX; elsewhere keep every snapshot
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Merges every worker's latest snapshot with this process's live values.
+
+    Snapshots left by workers that have exited (and earlier server runs
+    sharing METRICS_DIR) are deleted rather than counted forever; their
+    counters drop out, which Prometheus reads as a counter reset.
+    """
+    own = f"{os.getpid()}.json"
+    snapshots = [snapshot()]
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        name = os.path.basename(path)
+        if name == own:
+            continue
+        pid = name[: -len(".json")]
+        if pid.isdigit() and not _is_running(int(pid)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            continue
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            # The worker is replacing it right now; the next scrape gets it
+            continue
+    return merge(snapshots)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n"))
+        for name, value in pairs
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def render(merged):
+    """Formats merged metrics in the Prometheus text exposition format."""
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labelnames = metric["labelnames"]
+        for labels, value in sorted(metric["samples"].items()):
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labelnames, labels)} {value}")
+                continue
+            cumulative = 0
+            bounds = [str(bound) for bound in metric["buckets"]] + ["+Inf"]
+            for bound, count in zip(bounds, value[:-1]):
+                cumulative += count
+                label_text = _format_labels(labelnames, labels, [("le", bound)])
+                lines.append(f"{name}_bucket{label_text} {cumulative}")
+            label_text = _format_labels(labelnames, labels)
+            lines.append(f"{name}_sum{label_text} {value[-1]}")
+            lines.append(f"{name}_count{label_text} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time to handle a request, by Flask endpoint, method and status code.",
+    ("endpoint", "method", "status"),
+)
+
+
+def register_metrics(app):
+    """Times every request and serves the merged metrics at /metrics."""
+    if not METRICS_ENABLED:
+        return
+    # Imported here so the bcrypt pool's worker processes don't load Flask
+    from flask import Response, request
+
+    wsgi_app = app.wsgi_app
+
+    # The start time rides in the WSGI environ: Flask's context-local proxies
+    # (g, request) cost microseconds per access, which adds up per request
+    def timed_wsgi_app(environ, start_response):
+        environ["metrics.request_started"] = time.perf_counter()
+        return wsgi_app(environ, start_response)
+
+    app.wsgi_app = timed_wsgi_app
+
+    @app.after_request
+    def record_request(response):
+        current = request._get_current_object()
+        started = current.environ.get("metrics.request_started")
+        if started is not None:
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                # 404s have no endpoint; don't let random URLs become labels
+                current.endpoint or "unmatched",
+                current.method,
+                str(response.status_code),
+            )
+            start_flusher()
+        return response
+
+    @app.route("/metrics")
+    def metrics_endpoint():
+        return Response(render(collect()), mimetype="text/plain; version=0.0.4")
@@ -1,5 +1,8 @@
+-- Baseline schema. IF NOT EXISTS lets databases created before migrations
+-- existed adopt version 1 without being rebuilt.
+
 -- Users Table
-CREATE TABLE users (
+CREATE TABLE IF NOT EXISTS users (
     user_id INTEGER PRIMARY KEY AUTOINCREMENT,
     username TEXT NOT NULL UNIQUE,
     email TEXT NOT NULL UNIQUE,
@@ -8,13 +11,13 @@ CREATE TABLE users (
 );
 
 -- Categories Table
-CREATE TABLE categories (
+CREATE TABLE IF NOT EXISTS categories (
     category_id INTEGER PRIMARY KEY AUTOINCREMENT,
     category_name TEXT NOT NULL UNIQUE
 );
 
 -- Tickets Table
-CREATE TABLE tickets (
+CREATE TABLE IF NOT EXISTS tickets (
     ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
     user_id INTEGER NOT NULL,
     category_id INTEGER NOT NULL,
@@ -27,7 +30,7 @@ CREATE TABLE tickets (
 );
 
 -- Comments Table
-CREATE TABLE comments (
+CREATE TABLE IF NOT EXISTS comments (
     comment_id INTEGER PRIMARY KEY AUTOINCREMENT,
     ticket_id INTEGER NOT NULL,
     user_id INTEGER NOT NULL,
@@ -36,6 +39,3 @@ CREATE TABLE comments (
     FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id),
     FOREIGN KEY (user_id) REFERENCES users(user_id)
 );
-
--- Basic seed to prevent foreign key errors in tests
-INSERT INTO categories (category_name) VALUES ('General');
@@ -0,0 +1,20 @@
+-- Secondary indexes for the hot queries in database_operations.py.
+-- users.username and users.email already have UNIQUE autoindexes, which
+-- cover username_exists() and the login lookup.
+
+-- Dashboard keyset pagination (ticket_id is the rowid, so it rides along)
+CREATE INDEX IF NOT EXISTS idx_tickets_created_at ON tickets (created_at);
+
+-- get_tickets_for_user(): user_id equality, status filtered from the index
+CREATE INDEX IF NOT EXISTS idx_tickets_user_status ON tickets (user_id, status);
+
+-- Dashboard status / category filters, still ordered for keyset paging
+CREATE INDEX IF NOT EXISTS idx_tickets_status_created
+    ON tickets (status, created_at);
+CREATE INDEX IF NOT EXISTS idx_tickets_category_created
+    ON tickets (category_id, created_at);
+
+-- get_comments_for_ticket(): ticket_id equality, already in created_at order.
+-- user_id is included so the join to users needs no extra comments lookup.
+CREATE INDEX IF NOT EXISTS idx_comments_ticket_created
+    ON comments (ticket_id, created_at, user_id);
@@ -0,0 +1,57 @@
+-- Full-text search over tickets and comments. Both indexes are external
+-- content tables, so the text is stored once and the triggers below keep
+-- the indexes in step with every insert, edit and delete.
+
+CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+    title,
+    description,
+    content='tickets',
+    content_rowid='ticket_id',
+    tokenize='porter unicode61'
+);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    message,
+    content='comments',
+    content_rowid='comment_id',
+    tokenize='porter unicode61'
+);
+
+CREATE TRIGGER IF NOT EXISTS tickets_fts_insert AFTER INSERT ON tickets BEGIN
+    INSERT INTO tickets_fts (rowid, title, description)
+    VALUES (new.ticket_id, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_fts_delete AFTER DELETE ON tickets BEGIN
+    INSERT INTO tickets_fts (tickets_fts, rowid, title, description)
+    VALUES ('delete', old.ticket_id, old.title, old.description);
+END;
+
+-- Status changes are the common update and do not touch the index
+CREATE TRIGGER IF NOT EXISTS tickets_fts_update
+AFTER UPDATE OF title, description ON tickets BEGIN
+    INSERT INTO tickets_fts (tickets_fts, rowid, title, description)
+    VALUES ('delete', old.ticket_id, old.title, old.description);
+    INSERT INTO tickets_fts (rowid, title, description)
+    VALUES (new.ticket_id, new.title, new.description);
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_fts_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO comments_fts (rowid, message) VALUES (new.comment_id, new.message);
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_fts_delete AFTER DELETE ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, message)
+    VALUES ('delete', old.comment_id, old.message);
+END;
+
+CREATE TRIGGER IF NOT EXISTS comments_fts_update
+AFTER UPDATE OF message ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, message)
+    VALUES ('delete', old.comment_id, old.message);
+    INSERT INTO comments_fts (rowid, message) VALUES (new.comment_id, new.message);
+END;
+
+-- Index whatever was already in the database
+INSERT INTO tickets_fts (tickets_fts) VALUES ('rebuild');
+INSERT INTO comments_fts (comments_fts) VALUES ('rebuild');
@@ -0,0 +1,36 @@
+-- Version counters for the in-process reference data caches. Triggers bump
+-- them on every change, so other gunicorn workers notice without a TTL wait.
+
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+
+INSERT OR IGNORE INTO cache_versions (name) VALUES ('categories'), ('usernames');
+
+CREATE TRIGGER IF NOT EXISTS categories_version_insert
+AFTER INSERT ON categories BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS categories_version_update
+AFTER UPDATE ON categories BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+CREATE TRIGGER IF NOT EXISTS categories_version_delete
+AFTER DELETE ON categories BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'categories';
+END;
+
+-- New users can't change an existing id -> username mapping, so only
+-- renames and deletes invalidate
+CREATE TRIGGER IF NOT EXISTS usernames_version_update
+AFTER UPDATE OF username ON users BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'usernames';
+END;
+
+CREATE TRIGGER IF NOT EXISTS usernames_version_delete
+AFTER DELETE ON users BEGIN
+    UPDATE cache_versions SET version = version + 1 WHERE name = 'usernames';
+END;
@@ -0,0 +1,3 @@
+-- Keyset paging of a ticket's comments by comment_id (load older/newer)
+CREATE INDEX IF NOT EXISTS idx_comments_ticket_comment
+    ON comments (ticket_id, comment_id);
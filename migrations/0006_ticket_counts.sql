@@ -0,0 +1,35 @@
+-- Ticket totals per (category, status), kept exact by triggers so the admin
+-- dashboard summary never has to GROUP BY over the whole tickets table.
+
+CREATE TABLE IF NOT EXISTS ticket_counts (
+    category_id INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (category_id, status)
+) WITHOUT ROWID;
+
+INSERT OR REPLACE INTO ticket_counts (category_id, status, total)
+SELECT category_id, status, COUNT(*) FROM tickets GROUP BY category_id, status;
+
+CREATE TRIGGER IF NOT EXISTS ticket_counts_insert
+AFTER INSERT ON tickets BEGIN
+    INSERT INTO ticket_counts (category_id, status, total)
+    VALUES (new.category_id, new.status, 1)
+    ON CONFLICT (category_id, status) DO UPDATE SET total = total + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ticket_counts_delete
+AFTER DELETE ON tickets BEGIN
+    UPDATE ticket_counts SET total = total - 1
+    WHERE category_id = old.category_id AND status = old.status;
+END;
+
+CREATE TRIGGER IF NOT EXISTS ticket_counts_update
+AFTER UPDATE OF status, category_id ON tickets
+WHEN old.status IS NOT new.status OR old.category_id IS NOT new.category_id BEGIN
+    UPDATE ticket_counts SET total = total - 1
+    WHERE category_id = old.category_id AND status = old.status;
+    INSERT INTO ticket_counts (category_id, status, total)
+    VALUES (new.category_id, new.status, 1)
+    ON CONFLICT (category_id, status) DO UPDATE SET total = total + 1;
+END;
@@ -0,0 +1,8 @@
+-- Checkpoints for bulk_data.py imports. Each batch updates its source's row
+-- in the same transaction as the inserts, so a resumed import never loads a
+-- record twice or skips one.
+CREATE TABLE IF NOT EXISTS import_progress (
+    source TEXT PRIMARY KEY,
+    records_done INTEGER NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
@@ -0,0 +1,15 @@
+-- When each ticket last changed (its fields or a new comment), for the
+-- API's updated_since filter. The app sets it on every write; rows inserted
+-- without one (seed data, bulk imports) take their created_at.
+
+ALTER TABLE tickets ADD COLUMN updated_at TIMESTAMP;
+
+UPDATE tickets SET updated_at = created_at;
+
+-- API ticket lists are keyset-paged on (updated_at, ticket_id)
+CREATE INDEX IF NOT EXISTS idx_tickets_updated_at ON tickets (updated_at);
+
+CREATE TRIGGER IF NOT EXISTS tickets_updated_at_default
+AFTER INSERT ON tickets WHEN new.updated_at IS NULL BEGIN
+    UPDATE tickets SET updated_at = new.created_at WHERE ticket_id = new.ticket_id;
+END;
@@ -0,0 +1,13 @@
+-- Bearer tokens for the /api/v1 JSON API. Only a SHA-256 of each token is
+-- stored; tokens are random, so a plain hash is enough to look them up by.
+
+CREATE TABLE IF NOT EXISTS api_tokens (
+    token_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    token_hash TEXT NOT NULL UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_api_tokens_user ON api_tokens (user_id);
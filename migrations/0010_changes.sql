@@ -0,0 +1,45 @@
+-- Append-only log of ticket and comment events, read by the /events feed.
+-- AUTOINCREMENT never reuses a seq and SQLite commits one writer at a time,
+-- so a reader that has seen seq N has also seen every change before it.
+-- owner_id is the ticket's owner, so users can be sent only their own.
+
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    ticket_id INTEGER NOT NULL,
+    owner_id INTEGER NOT NULL,
+    category_id INTEGER,
+    status TEXT,
+    old_status TEXT,
+    comment_id INTEGER,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TRIGGER IF NOT EXISTS changes_ticket_created
+AFTER INSERT ON tickets BEGIN
+    INSERT INTO changes (kind, ticket_id, owner_id, category_id, status)
+    VALUES ('ticket_created', new.ticket_id, new.user_id, new.category_id, new.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS changes_status_changed
+AFTER UPDATE OF status ON tickets WHEN old.status IS NOT new.status BEGIN
+    INSERT INTO changes
+        (kind, ticket_id, owner_id, category_id, status, old_status)
+    VALUES (
+        'status_changed', new.ticket_id, new.user_id, new.category_id,
+        new.status, old.status
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS changes_ticket_deleted
+AFTER DELETE ON tickets BEGIN
+    INSERT INTO changes (kind, ticket_id, owner_id, category_id, old_status)
+    VALUES ('ticket_deleted', old.ticket_id, old.user_id, old.category_id, old.status);
+END;
+
+CREATE TRIGGER IF NOT EXISTS changes_comment_added
+AFTER INSERT ON comments BEGIN
+    INSERT INTO changes (kind, ticket_id, owner_id, comment_id)
+    SELECT 'comment_added', new.ticket_id, user_id, new.comment_id
+    FROM tickets WHERE ticket_id = new.ticket_id;
+END;
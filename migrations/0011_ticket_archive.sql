@@ -0,0 +1,49 @@
+-- Cold storage for tickets closed long ago, and their comments. Archival
+-- moves rows here in small batches, so tickets and comments (and their
+-- indexes) only hold the tickets people still work on. ticket_id and
+-- comment_id are kept; AUTOINCREMENT never hands them out again.
+
+CREATE TABLE IF NOT EXISTS archived_tickets (
+    ticket_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    category_id INTEGER NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at TIMESTAMP,
+    updated_at TIMESTAMP,
+    archived_at TIMESTAMP NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS archived_comments (
+    comment_id INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL,
+    user_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    created_at TIMESTAMP
+);
+
+-- Read-through comment lookups and paging, as on comments
+CREATE INDEX IF NOT EXISTS idx_archived_comments_ticket_comment
+    ON archived_comments (ticket_id, comment_id);
+
+-- Archival picks closed tickets by how long ago they last changed. Partial,
+-- so it stays small and the dashboard's status filters never pick it over
+-- idx_tickets_status_created.
+CREATE INDEX IF NOT EXISTS idx_tickets_closed_updated
+    ON tickets (updated_at) WHERE status = 'closed';
+
+-- A ticket copied to the archive before it is deleted was archived, not
+-- deleted; dashboards drop it from their list and counts either way.
+DROP TRIGGER IF EXISTS changes_ticket_deleted;
+
+CREATE TRIGGER changes_ticket_deleted
+AFTER DELETE ON tickets BEGIN
+    INSERT INTO changes (kind, ticket_id, owner_id, category_id, old_status)
+    VALUES (
+        CASE WHEN EXISTS (
+            SELECT 1 FROM archived_tickets WHERE ticket_id = old.ticket_id
+        ) THEN 'ticket_archived' ELSE 'ticket_deleted' END,
+        old.ticket_id, old.user_id, old.category_id, old.status
+    );
+END;
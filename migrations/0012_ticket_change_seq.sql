@@ -0,0 +1,48 @@
+-- The API's ticket feed is keyset-paged on change_seq, not updated_at.
+-- updated_at has one-second resolution and is read before the write
+-- commits, so a cursor on it can skip a ticket changed in the same second
+-- or committed after a later timestamp. change_seq comes from a counter
+-- bumped inside the writing transaction, and SQLite commits one writer at
+-- a time, so every change gets a higher number than any already visible.
+
+CREATE TABLE IF NOT EXISTS ticket_change_seq (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    seq INTEGER NOT NULL
+);
+
+ALTER TABLE tickets ADD COLUMN change_seq INTEGER;
+
+-- Existing tickets are numbered in the order the old cursor walked them
+CREATE TEMP TABLE change_order (
+    seq INTEGER PRIMARY KEY,
+    ticket_id INTEGER NOT NULL
+);
+
+INSERT INTO change_order (ticket_id)
+SELECT ticket_id FROM tickets ORDER BY updated_at, ticket_id;
+
+UPDATE tickets SET change_seq = (
+    SELECT seq FROM change_order WHERE change_order.ticket_id = tickets.ticket_id
+);
+
+INSERT OR IGNORE INTO ticket_change_seq (id, seq)
+SELECT 1, COALESCE(MAX(seq), 0) FROM change_order;
+
+DROP TABLE change_order;
+
+CREATE INDEX IF NOT EXISTS idx_tickets_change_seq ON tickets (change_seq);
+
+-- The app sets updated_at on every write to a ticket, including new comments
+CREATE TRIGGER IF NOT EXISTS tickets_change_seq_insert
+AFTER INSERT ON tickets BEGIN
+    UPDATE ticket_change_seq SET seq = seq + 1;
+    UPDATE tickets SET change_seq = (SELECT seq FROM ticket_change_seq)
+    WHERE ticket_id = new.ticket_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS tickets_change_seq_update
+AFTER UPDATE OF updated_at ON tickets BEGIN
+    UPDATE ticket_change_seq SET seq = seq + 1;
+    UPDATE tickets SET change_seq = (SELECT seq FROM ticket_change_seq)
+    WHERE ticket_id = new.ticket_id;
+END;
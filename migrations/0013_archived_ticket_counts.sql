@@ -0,0 +1,36 @@
+-- Archival is a move, not a removal: ticket_counts keeps counting archived
+-- tickets, so the dashboard's per-category totals don't shrink as closed
+-- tickets age. A ticket is only uncounted when it is really deleted, live
+-- or from the archive.
+
+DROP TRIGGER IF EXISTS ticket_counts_delete;
+
+-- Archival copies the row to archived_tickets before deleting it
+CREATE TRIGGER ticket_counts_delete
+AFTER DELETE ON tickets
+WHEN NOT EXISTS (
+    SELECT 1 FROM archived_tickets WHERE ticket_id = old.ticket_id
+) BEGIN
+    UPDATE ticket_counts SET total = total - 1
+    WHERE category_id = old.category_id AND status = old.status;
+END;
+
+-- Deleting an archived ticket reaches dashboards like any other delete
+CREATE TRIGGER IF NOT EXISTS archived_ticket_deleted
+AFTER DELETE ON archived_tickets BEGIN
+    UPDATE ticket_counts SET total = total - 1
+    WHERE category_id = old.category_id AND status = old.status;
+    INSERT INTO changes (kind, ticket_id, owner_id, category_id, old_status)
+    VALUES ('ticket_deleted', old.ticket_id, old.user_id, old.category_id, old.status);
+END;
+
+-- Put back what earlier archival runs subtracted
+DELETE FROM ticket_counts;
+
+INSERT INTO ticket_counts (category_id, status, total)
+SELECT category_id, status, COUNT(*) FROM (
+    SELECT category_id, status FROM tickets
+    UNION ALL
+    SELECT category_id, status FROM archived_tickets
+)
+GROUP BY category_id, status;
@@ -0,0 +1,79 @@
+"""Row types returned by database_operations.
+
+Named tuples: as small as plain tuples (no per-row __dict__), readable by
+field name in code and templates, and still indexable by position.
+"""
+
+from collections import namedtuple
+
+
+class Ticket(
+    namedtuple(
+        "Ticket",
+        "ticket_id user_id category_id title description status created_at "
+        "updated_at",
+    )
+):
+    """A full ticket row, for the detail page."""
+
+    __slots__ = ()
+
+
+class TicketSummary(namedtuple("TicketSummary", "ticket_id summary status created_at")):
+    """The columns ticket lists show; summary is the start of the description."""
+
+    __slots__ = ()
+
+
+class ArchivedTicket(
+    namedtuple("ArchivedTicket", "ticket_id title summary created_at archived_at")
+):
+    """The columns the archive list shows."""
+
+    __slots__ = ()
+
+
+class Comment(
+    namedtuple("Comment", "comment_id ticket_id user_id message created_at username")
+):
+    """A comment joined with its author's username."""
+
+    __slots__ = ()
+
+
+class User(namedtuple("User", "user_id role username")):
+    """A signed-in user; never carries the password hash.
+
+    username comes last so the (user_id, role) layout get_user() always
+    returned keeps its positions.
+    """
+
+    __slots__ = ()
+
+
+class ApiToken(namedtuple("ApiToken", "token_id username name created_at")):
+    """An API token's details; the token itself is only shown when created."""
+
+    __slots__ = ()
+
+
+class Change(
+    namedtuple(
+        "Change",
+        "seq kind ticket_id owner_id category_id status old_status comment_id "
+        "summary",
+    )
+):
+    """A changes log entry; summary is set for ticket_created events."""
+
+    __slots__ = ()
+
+
+class Category(namedtuple("Category", "category_id category_name")):
+    __slots__ = ()
+
+
+def row_factory(row_type):
+    """Returns a sqlite3 row_factory that builds row_type from each row."""
+    make = row_type._make
+    return lambda cursor, row: make(row)
@@ -0,0 +1,168 @@
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import bcrypt
+import config  # noqa: F401 - loads .env
+import metrics
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# 0 hashes inline on the calling thread (handy for local scripts)
+HASH_POOL_WORKERS = int(os.getenv("HASH_POOL_WORKERS", 2))
+# Jobs allowed in flight (running + queued) per app process
+HASH_QUEUE_LIMIT = int(os.getenv("HASH_QUEUE_LIMIT", 8))
+HASH_TIMEOUT = float(os.getenv("HASH_TIMEOUT", 10))
+
+
+class HashingBusy(Exception):
+    """Raised when HASH_QUEUE_LIMIT hashing jobs are already in flight."""
+
+
+BCRYPT_SECONDS = metrics.Counter(
+    "bcrypt_seconds_total",
+    "Wall time spent waiting for bcrypt, including time queued for the pool.",
+    ("operation",),
+)
+BCRYPT_OPERATIONS = metrics.Counter(
+    "bcrypt_operations_total", "bcrypt hashes and checks run.", ("operation",)
+)
+BCRYPT_REJECTED = metrics.Counter(
+    "bcrypt_rejected_total", "bcrypt jobs turned away because the pool was full."
+)
+
+
+_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+_slots = None
+
+
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def _get_pool():
+    """Returns this process's pool, creating it after a gunicorn fork if needed."""
+    global _pool, _pool_pid, _slots
+    with _lock:
+        if _pool_pid != os.getpid():
+            # spawn, not fork: the parent may hold threads and DB connections
+            _pool = ProcessPoolExecutor(
+                max_workers=HASH_POOL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _slots = threading.BoundedSemaphore(HASH_QUEUE_LIMIT)
+            _pool_pid = os.getpid()
+        return _pool, _slots
+
+
+def shutdown_pool():
+    """Stops the hashing pool; the next hash starts a fresh one."""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.shutdown()
+        _pool = None
+        _pool_pid = None
+
+
+def _discard_pool(pool):
+    """Drops a pool whose worker died, so the next hash starts a fresh one."""
+    global _pool, _pool_pid
+    with _lock:
+        if _pool is pool:
+            _pool = None
+            _pool_pid = None
+    pool.shutdown(wait=False)
+
+
+def _run(func, *args):
+    if HASH_POOL_WORKERS > 0:
+        pool, slots = _get_pool()
+        if not slots.acquire(blocking=False):
+            BCRYPT_REJECTED.inc()
+            raise HashingBusy("Password hashing pool is saturated.")
+
+    operation = func.__name__.lstrip("_")
+    start = time.perf_counter()
+    try:
+        if HASH_POOL_WORKERS <= 0:
+            return func(*args)
+        try:
+            future = pool.submit(func, *args)
+        except BaseException:
+            slots.release()
+            raise
+        # Free the slot when the job really ends, even if we stop waiting for it
+        future.add_done_callback(lambda _: slots.release())
+        return future.result(timeout=HASH_TIMEOUT)
+    except BrokenProcessPool:
+        # A worker was killed (e.g. out of memory); this pool takes no more jobs
+        _discard_pool(pool)
+        raise
+    finally:
+        BCRYPT_SECONDS.inc(operation, amount=time.perf_counter() - start)
+        BCRYPT_OPERATIONS.inc(operation)
+
+
+def hash_password(password):
+    """Hashes a password with the configured cost on the hashing pool."""
+    return _run(_hashpw, password.encode("utf-8"), BCRYPT_ROUNDS)
+
+
+def check_password(password, hashed):
+    """Checks a password against a stored bcrypt hash on the hashing pool."""
+    return _run(_checkpw, password.encode("utf-8"), hashed)
+
+
+def get_cost(hashed):
+    """Returns the work factor stored in a bcrypt hash, e.g. 12 for $2b$12$..."""
+    return int(hashed.split(b"$")[2])
+
+
+def needs_rehash(hashed):
+    """Returns True if a stored hash was made with a different cost than configured."""
+    return get_cost(hashed) != BCRYPT_ROUNDS
+
+
+def calibrate(target_ms, min_rounds=4, max_rounds=16):
+    """Returns the highest cost whose hash time stays within target_ms.
+
+    Also returns the (rounds, milliseconds) of every cost it timed.
+    """
+    best = min_rounds
+    timings = []
+    for rounds in range(min_rounds, max_rounds + 1):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", bcrypt.gensalt(rounds))
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        timings.append((rounds, elapsed_ms))
+        if elapsed_ms > target_ms:
+            break
+        best = rounds
+    return best, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost for this host.")
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="longest acceptable time for a single hash (default: 250)",
+    )
+    args = parser.parse_args()
+
+    rounds, timings = calibrate(args.target_ms)
+    for cost, elapsed_ms in timings:
+        print(f"rounds={cost:<3} {elapsed_ms:8.1f} ms")
+    print(f"Recommended setting: BCRYPT_ROUNDS={rounds}")
+    if rounds < 10:
+        print("Warning: costs below 10 are weak; consider a higher --target-ms.")
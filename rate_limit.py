@@ -0,0 +1,247 @@
+"""Per-client rate limits for expensive routes (login, signup, username checks).
+
+Each limit is a token bucket keyed by route and client: the logged-in user,
+or the client IP for anonymous requests. A bucket holds `count` tokens and
+refills at count/period, so a client can burst `count` requests and then
+gets one more every period/count seconds. Requests with no token left get
+a 429 with Retry-After.
+
+Buckets are stored as the time they will next be full (GCRA), one float
+per key, so a decision is a single read-modify-write. The memory backend
+keeps them per process; RATE_LIMIT_BACKEND=sqlite shares them between
+gunicorn workers through a small SQLite file.
+"""
+
+import heapq
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from functools import wraps
+
+import config  # noqa: F401 - loads .env
+from flask import abort, current_app, request, session
+
+import metrics
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# memory (per process) or sqlite (shared by every worker on the machine)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_DB = os.getenv("RATE_LIMIT_DB") or os.path.join(
+    tempfile.gettempdir(), f"helpdesk-rate-limits-{os.getppid()}.db"
+)
+# Buckets kept by the memory backend before full ones are dropped
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", 100_000))
+# Reverse proxies in front of the app whose X-Forwarded-For can be trusted
+RATE_LIMIT_PROXIES = int(os.getenv("RATE_LIMIT_PROXIES", 0))
+# "count/period", period in seconds or second/minute/hour/day; empty is no limit
+RATE_LIMITS = {
+    "login": os.getenv("RATE_LIMIT_LOGIN", "10/minute"),
+    "signup": os.getenv("RATE_LIMIT_SIGNUP", "5/minute"),
+    "check_username": os.getenv("RATE_LIMIT_CHECK_USERNAME", "60/minute"),
+    "check_usernames": os.getenv("RATE_LIMIT_CHECK_USERNAMES", "20/minute"),
+}
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+RATE_LIMITED = metrics.Counter(
+    "rate_limited_total", "Requests refused with 429 by a rate limit.", ("limit",)
+)
+
+
+class Limit:
+    """count requests per period seconds, all of which may come at once."""
+
+    __slots__ = ("count", "period", "interval")
+
+    def __init__(self, count, period):
+        if count < 1 or period <= 0:
+            raise ValueError("A rate limit needs a positive count and period.")
+        self.count = count
+        self.period = float(period)
+        self.interval = self.period / count
+
+    def __repr__(self):
+        return f"Limit({self.count}/{self.period:g}s)"
+
+
+def parse_limit(text):
+    """Parses "10/minute" or "30/15" (seconds); returns None for an empty value."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    count, _, period = text.partition("/")
+    period = period.strip().lower()
+    try:
+        seconds = PERIODS[period] if period in PERIODS else float(period)
+        return Limit(int(count), seconds)
+    except ValueError:
+        raise ValueError(f"Bad rate limit {text!r}; expected e.g. '10/minute'.")
+
+
+class MemoryBackend:
+    """Buckets in a dict, for a single process."""
+
+    def __init__(self, max_keys=RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._full_at = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, limit, now):
+        """Takes a token; returns 0 if there was one, else seconds until there is."""
+        with self._lock:
+            full_at = self._full_at.get(key, now)
+            if full_at < now:
+                full_at = now
+            if full_at + limit.interval - now > limit.period:
+                return full_at + limit.interval - limit.period - now
+            self._full_at[key] = full_at + limit.interval
+            if len(self._full_at) > self.max_keys:
+                self._sweep(now)
+            return 0.0
+
+    def _sweep(self, now):
+        # A full bucket is the same as no bucket
+        self._full_at = {k: t for k, t in self._full_at.items() if t > now}
+        if len(self._full_at) > self.max_keys:
+            # Still too many clients: forget the half closest to full
+            keep = heapq.nlargest(
+                self.max_keys // 2, self._full_at.items(), key=lambda kv: kv[1]
+            )
+            self._full_at = dict(keep)
+
+    def reset(self):
+        with self._lock:
+            self._full_at.clear()
+
+
+class SqliteBackend:
+    """Buckets in a SQLite file, shared by every process that opens it.
+
+    The limits are only a guard, so the file is not synced to disk and is
+    safe to delete; it is recreated on first use.
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, path=RATE_LIMIT_DB):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        # A connection must not cross a fork into a gunicorn worker
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limits "
+                "(key TEXT PRIMARY KEY, full_at REAL NOT NULL) WITHOUT ROWID"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def take(self, key, limit, now):
+        conn = self._connection()
+        params = {
+            "key": key,
+            "now": now,
+            "interval": limit.interval,
+            "period": limit.period,
+        }
+        # One statement, so concurrent workers can't both take the last token
+        taken = conn.execute(
+            "INSERT INTO rate_limits (key, full_at) VALUES (:key, :now + :interval) "
+            "ON CONFLICT (key) DO UPDATE SET full_at = MAX(full_at, :now) + :interval "
+            "WHERE MAX(full_at, :now) + :interval - :now <= :period "
+            "RETURNING full_at",
+            params,
+        ).fetchone()
+        self._takes += 1
+        if self._takes % self.SWEEP_EVERY == 0:
+            conn.execute("DELETE FROM rate_limits WHERE full_at <= ?", (now,))
+        if taken:
+            return 0.0
+        row = conn.execute(
+            "SELECT full_at FROM rate_limits WHERE key = ?", (key,)
+        ).fetchone()
+        return max(row[0] + limit.interval - limit.period - now, 0.0) if row else 0.0
+
+    def reset(self):
+        self._connection().execute("DELETE FROM rate_limits")
+
+
+def make_backend(name=RATE_LIMIT_BACKEND):
+    if name == "memory":
+        return MemoryBackend()
+    if name == "sqlite":
+        return SqliteBackend()
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND {name!r}; use memory or sqlite.")
+
+
+backend = make_backend()
+_limits = {name: parse_limit(value) for name, value in RATE_LIMITS.items()}
+
+
+def client_ip():
+    """The client's address, read from X-Forwarded-For behind RATE_LIMIT_PROXIES."""
+    if RATE_LIMIT_PROXIES:
+        forwarded = request.headers.get("X-Forwarded-For", "").split(",")
+        if len(forwarded) >= RATE_LIMIT_PROXIES:
+            return forwarded[-RATE_LIMIT_PROXIES].strip()
+    return request.remote_addr or "unknown"
+
+
+def client_key(name):
+    user_id = session.get("user_id")
+    if user_id is not None:
+        return f"{name}|user:{user_id}"
+    return f"{name}|ip:{client_ip()}"
+
+
+def check(name):
+    """Takes a token from the current client's `name` bucket, or aborts with 429."""
+    limit = _limits.get(name)
+    if not RATE_LIMIT_ENABLED or limit is None:
+        return
+    try:
+        wait = backend.take(client_key(name), limit, time.time())
+    except sqlite3.Error:
+        # Better to serve without limits than not at all
+        current_app.logger.exception("Rate limit check failed; request allowed.")
+        return
+    if wait > 0:
+        RATE_LIMITED.inc(name)
+        current_app.logger.warning(
+            "Rate limit %s (%r) hit by %s", name, limit, client_key(name)
+        )
+        abort(429, retry_after=max(1, math.ceil(wait)))
+
+
+def rate_limited(name, methods=None):
+    """Counts the view's requests (only `methods`, if given) against limit `name`."""
+
+    def decorate(view):
+        @wraps(view)
+        def limited(*args, **kwargs):
+            if methods is None or request.method in methods:
+                check(name)
+            return view(*args, **kwargs)
+
+        return limited
+
+    return decorate
+
+
+def reset():
+    """Empties every bucket (for tests and benchmarks)."""
+    backend.reset()
@@ -0,0 +1,66 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ReferenceCache:
+    """Read-through cache for rarely-changing lookup data.
+
+    Entries are reloaded when they are older than ttl seconds or when the
+    caller passes a different version than the one they were loaded at, so
+    a version bumped by another worker invalidates them without waiting for
+    the TTL. At most max_entries keys are kept, least recently used first out.
+    A loader returning None is treated as "not found" and is not cached.
+    """
+
+    def __init__(self, name, loader, ttl, max_entries=1024):
+        self.name = name
+        self.loader = loader
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key=None, version=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, loaded_at, loaded_version = entry
+                if loaded_version == version and now - loaded_at < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+
+        # Load outside the lock so a slow query doesn't block other keys
+        value = self.loader(key)
+        if value is None:
+            # Don't remember misses; the row may be created later
+            return value
+        with self._lock:
+            self._entries[key] = (value, now, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key=None, everything=True):
+        """Drops one key (everything=False) or the whole cache."""
+        with self._lock:
+            if everything:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def reset(self):
+        """Drops every entry and zeroes the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
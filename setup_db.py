@@ -1,99 +1,125 @@
+import argparse
 import sqlite3
-import bcrypt
 import os
-from dotenv import load_dotenv
+import config  # noqa: F401 - loads .env
+from db_migrations import apply_migrations
+from database_operations import (
+    ARCHIVE_AFTER_DAYS,
+    CHANGES_RETENTION_DAYS,
+    archive_closed_tickets,
+    check_ticket_counts,
+    optimize_search_index,
+    prune_changes,
+    rebuild_search_index,
+)
 
-load_dotenv()
 DB_NAME = os.getenv("DB_NAME")
 
 
 def reset_database():
     """Deletes the existing database file if it exists."""
-    if os.path.exists(DB_NAME):
-        os.remove(DB_NAME)
-        print("Database reset.")
+    for path in (DB_NAME, f"{DB_NAME}-wal", f"{DB_NAME}-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    print("Database reset.")
 
 
 def create_tables():
-    """Creates the database and all required tables."""
+    """Creates or upgrades all required tables by applying pending migrations."""
     conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-
-    # Users Table
-    cursor.execute("""
-        CREATE TABLE users (
-            user_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT NOT NULL UNIQUE,
-            email TEXT NOT NULL UNIQUE,
-            password BLOB NOT NULL,
-            role TEXT NOT NULL
-        )
-    """)
-
-    # Categories Table
-    cursor.execute("""
-        CREATE TABLE categories (
-            category_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            category_name TEXT NOT NULL UNIQUE
-        )
-    """)
-
-    # Tickets Table
-    cursor.execute("""
-        CREATE TABLE tickets (
-            ticket_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            category_id INTEGER NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT NOT NULL,
-            status TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(user_id),
-            FOREIGN KEY (category_id) REFERENCES categories(category_id)
-        )
-    """)
-
-    # Comments Table
-    cursor.execute("""
-        CREATE TABLE comments (
-            comment_id INTEGER PRIMARY KEY AUTOINCREMENT,
-            ticket_id INTEGER NOT NULL,
-            user_id INTEGER NOT NULL,
-            message TEXT NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (ticket_id) REFERENCES tickets(ticket_id),
-            FOREIGN KEY (user_id) REFERENCES users(user_id)
-        )
-    """)
-
-    conn.commit()
+    applied = apply_migrations(conn)
     conn.close()
-    print("Database tables created successfully.")
-
-
-def insert_sample_data():
-    """Inserts sample data into the database."""
-    conn = sqlite3.connect(DB_NAME)
+    if applied:
+        print(f"Applied migrations: {', '.join(str(v) for v in applied)}.")
+    else:
+        print("Database schema is up to date.")
+
+
+# Sample accounts and their passwords. The hashes are precomputed (cost 12),
+# so seeding takes no bcrypt time; logging in upgrades them to BCRYPT_ROUNDS.
+SAMPLE_USERS = [
+    (
+        "admin1",
+        "adminpass1",
+        "$2b$12$AsA9uqC25ipyWhpTerDwZ.nU0fxqNU.QIYgGWoJBhVGqwyOUyErLy",
+    ),
+    (
+        "admin2",
+        "adminpass2",
+        "$2b$12$oi51L4vjLfyNFqbeIk6Pq.pZcZzCr7Emk07wX0H5kptkuKrjrasDe",
+    ),
+    (
+        "user1",
+        "userpass1",
+        "$2b$12$8.wVcvOAkBwAW1WsK7jTOu69IV4RYS0k/G5E7vymiklSrOk2bkLwW",
+    ),
+    (
+        "user2",
+        "userpass2",
+        "$2b$12$BkD3yDzketnXM6RQDKvSKOoJ5Yf1vv1w6TJxrnK7YIufoB/88tBZ.",
+    ),
+    (
+        "user3",
+        "userpass3",
+        "$2b$12$va6muPR0kPgA8dBmmFF.Tej.ZBxAM6WVD3ey.t0DchDf4L5QtRy7O",
+    ),
+    (
+        "user4",
+        "userpass4",
+        "$2b$12$tD3MVWfnJpPqN9EJZyuaRevcFfrI0GPvz.lGE6fPdMIYJnOceTFdu",
+    ),
+    (
+        "user5",
+        "userpass5",
+        "$2b$12$e6GY4Q.XiTRbrrwn67Gdx.GyiJXivVUk.HkkYb7E4bzYiQmTmWA7a",
+    ),
+    (
+        "user6",
+        "userpass6",
+        "$2b$12$QcnLzGnwX3dVOxpvkSkW3.KUelvcXBXl.ST9T5wYQST3A2Zg5R6GO",
+    ),
+    (
+        "user7",
+        "userpass7",
+        "$2b$12$PBKdqbYXn5QRQMNz3jfm2.cCdz7sfyPf5mAUBHjgZm.TQp3ck4Xl.",
+    ),
+    (
+        "user8",
+        "userpass8",
+        "$2b$12$tF7lx4Df8.l68fVTjfP2XOiu0amm3ODzKTGCcTOp6HRhlC1da/rt2",
+    ),
+]
+
+
+def seed_sample_data(conn):
+    """Inserts the sample data if the database has no users; returns True if it did.
+
+    The check and the inserts share one write transaction, so workers that
+    start together seed the database once. An existing database is never
+    changed.
+    """
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return False
+        insert_sample_data(conn)
+    return True
+
+
+def insert_sample_data(conn):
+    """Inserts sample data; the caller commits."""
     cursor = conn.cursor()
-
-    def hash_password(password_str):
-        return bcrypt.hashpw(password_str.encode("utf-8"), bcrypt.gensalt())
-
-    sample_users = [
-        ("admin1", "admin1@example.com", hash_password("adminpass1"), "admin"),
-        ("admin2", "admin2@example.com", hash_password("adminpass2"), "admin"),
-        ("user1", "user1@example.com", hash_password("userpass1"), "user"),
-        ("user2", "user2@example.com", hash_password("userpass2"), "user"),
-        ("user3", "user3@example.com", hash_password("userpass3"), "user"),
-        ("user4", "user4@example.com", hash_password("userpass4"), "user"),
-        ("user5", "user5@example.com", hash_password("userpass5"), "user"),
-        ("user6", "user6@example.com", hash_password("userpass6"), "user"),
-        ("user7", "user7@example.com", hash_password("userpass7"), "user"),
-        ("user8", "user8@example.com", hash_password("userpass8"), "user"),
-    ]
     cursor.executemany(
         "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
-        sample_users,
+        [
+            (
+                username,
+                f"{username}@example.com",
+                hashed.encode(),
+                "admin" if username.startswith("admin") else "user",
+            )
+            for username, _, hashed in SAMPLE_USERS
+        ],
     )
 
     sample_categories = [
@@ -146,12 +172,57 @@ def insert_sample_data():
         sample_comments,
     )
 
-    conn.commit()
-    conn.close()
-    print("Database populated successfully.")
-
 
 if __name__ == "__main__":
-    reset_database()
+    parser = argparse.ArgumentParser(description="Create or upgrade the database.")
+    parser.add_argument(
+        "--reset",
+        action="store_true",
+        help="delete the existing database and start from scratch",
+    )
+    parser.add_argument(
+        "--rebuild-search",
+        action="store_true",
+        help="rebuild the full-text search indexes from existing tickets/comments",
+    )
+    parser.add_argument(
+        "--check-counts",
+        action="store_true",
+        help="recount tickets, report drift in the dashboard counters and fix it",
+    )
+    parser.add_argument(
+        "--prune-changes",
+        action="store_true",
+        help=f"delete live-update changes older than {CHANGES_RETENTION_DAYS:g} days",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help=f"archive tickets closed over {ARCHIVE_AFTER_DAYS:g} days ago, then "
+        "optimize the search indexes",
+    )
+    args = parser.parse_args()
+
+    if args.reset:
+        reset_database()
     create_tables()
-    insert_sample_data()
+    conn = sqlite3.connect(DB_NAME)
+    if seed_sample_data(conn):
+        print("Database populated successfully.")
+    conn.close()
+    if args.rebuild_search:
+        rebuild_search_index()
+        print("Search indexes rebuilt.")
+    if args.check_counts:
+        drift = check_ticket_counts(repair=True)
+        for category_id, status, stored, actual in drift:
+            print(
+                f"Category {category_id} '{status}': counter {stored}, actual {actual}."
+            )
+        print(f"Ticket counters checked, {len(drift)} corrected.")
+    if args.prune_changes:
+        print(f"Pruned {prune_changes()} old changes.")
+    if args.archive:
+        print(f"Archived {archive_closed_tickets()} closed tickets.")
+        optimize_search_index()
+        print("Search indexes optimized.")
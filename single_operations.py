@@ -1,9 +1,8 @@
 import sqlite3
 from datetime import datetime
 import os
-from dotenv import load_dotenv
+import config  # noqa: F401 - loads .env
 
-load_dotenv()
 DB_NAME = os.getenv("DB_NAME")
 
 
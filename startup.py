@@ -0,0 +1,155 @@
+"""Where a cold start spends its time, up to the first response.
+
+    python startup.py                # new, empty database seeded on start
+    python startup.py --db app.db    # an existing database
+
+Starts the app in a fresh interpreter with -X importtime, as a new server
+process would, and serves one GET / through the test client. Prints the
+slowest imports, the init phases app.py times with phase(), the first
+request and the total, and exits with status 1 if the total is over
+TIME_TO_FIRST_RESPONSE_BUDGET. tests/test_startup.py enforces the same
+budget.
+
+app.py imports phase() from here, so the tools for measuring are only
+imported when measuring.
+"""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# Seconds from starting the interpreter to the first response, with an
+# empty database to seed, on one core of a developer machine or CI runner
+TIME_TO_FIRST_RESPONSE_BUDGET = 1.0
+
+PHASES = []
+
+
+@contextmanager
+def phase(name):
+    """Times a block of startup work under name."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        PHASES.append((name, time.perf_counter() - start))
+
+
+def summary():
+    return ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in PHASES)
+
+
+def first_response():
+    """Runs in the measured interpreter: imports the app and serves GET /."""
+    start = time.perf_counter()
+    import app
+
+    imported = time.perf_counter()
+    response = app.app.test_client().get("/")
+    response.close()
+    done = time.perf_counter()
+    print(
+        json.dumps(
+            {
+                "status": response.status_code,
+                "import_app": imported - start,
+                "phases": PHASES,
+                "first_request": done - imported,
+                "finished": time.time(),
+            }
+        )
+    )
+
+
+def parse_importtime(stderr, depth=1):
+    """[(module, cumulative seconds)] from -X importtime, down to depth."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        if level <= depth:
+            modules.append((name.strip(), int(cumulative) / 1_000_000))
+    return modules
+
+
+def measure(db_name, extra_env=None):
+    """Times a cold start against db_name in a new interpreter."""
+    import subprocess  # nosec B404
+
+    env = dict(os.environ, DB_NAME=db_name, **(extra_env or {}))
+    started = time.time()
+    result = subprocess.run(  # nosec B603
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            "import startup; startup.first_response()",
+        ],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"App failed to start:\n{result.stderr[-2000:]}")
+    child = json.loads(result.stdout.strip().splitlines()[-1])
+    child["total"] = child["finished"] - started
+    # The interpreter itself: everything before the app's own imports
+    child["interpreter"] = child["total"] - child["import_app"] - child["first_request"]
+    child["app_imports"] = child["import_app"] - sum(s for _, s in child["phases"])
+    child["imports"] = parse_importtime(result.stderr)
+    return child
+
+
+def report(result, top=12):
+    lines = ["slowest imports (cumulative ms)"]
+    imports = sorted(result["imports"], key=lambda m: m[1], reverse=True)
+    lines += [f"  {name:<40}{seconds * 1000:>8.1f}" for name, seconds in imports[:top]]
+    lines.append("\ninit phases in app.py (ms)")
+    lines += [
+        f"  {name:<40}{seconds * 1000:>8.1f}" for name, seconds in result["phases"]
+    ]
+    lines.append("\ntime to first response (ms)")
+    for label, key in (
+        ("interpreter start", "interpreter"),
+        ("app's imports", "app_imports"),
+        ("app's init phases", None),
+        ("first GET /", "first_request"),
+        ("total", "total"),
+    ):
+        seconds = result[key] if key else result["import_app"] - result["app_imports"]
+        lines.append(f"  {label:<40}{seconds * 1000:>8.1f}")
+    lines.append(f"  {'budget':<40}{TIME_TO_FIRST_RESPONSE_BUDGET * 1000:>8.1f}")
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+    import tempfile
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", help="existing database (default: a new one)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_name = args.db or os.path.join(tmp, "startup.db")
+        result = measure(
+            db_name, {"SEED_SAMPLE_DATA": "true", "METRICS_DIR": tmp, "LOG_DIR": tmp}
+        )
+    print(report(result))
+    within = result["total"] <= TIME_TO_FIRST_RESPONSE_BUDGET
+    print("within budget" if within else "OVER BUDGET")
+    return 0 if within else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
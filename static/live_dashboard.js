@@ -0,0 +1,135 @@
+// Keeps a dashboard's ticket table (and the admin summary counts) up to
+// date from the /events feed, so nobody has to reload the page.
+(function () {
+    "use strict";
+
+    var rows = document.querySelector("[data-live-events]");
+    if (!rows || !window.EventSource) {
+        return;
+    }
+
+    // The page's status and category filters; live changes keep to them
+    var statusFilter = rows.dataset.filterStatus;
+    var categoryFilter = rows.dataset.filterCategory;
+
+    function matchesFilters(change) {
+        if (statusFilter && change.status !== statusFilter) {
+            return false;
+        }
+        if (categoryFilter && String(change.category_id) !== categoryFilter) {
+            return false;
+        }
+        return !(change.status === "closed" && rows.hasAttribute("data-hide-closed"));
+    }
+
+    function row(ticketId) {
+        return rows.querySelector('tr[data-ticket-id="' + ticketId + '"]');
+    }
+
+    function highlight(tr) {
+        tr.classList.remove("live-updated");
+        // Restart the fade if the row changes again
+        void tr.offsetWidth;
+        tr.classList.add("live-updated");
+    }
+
+    function addCount(categoryId, status, amount) {
+        var cell = document.querySelector(
+            '[data-count="' + categoryId + "-" + status + '"]'
+        );
+        var total = document.querySelector(
+            '[data-count-total="' + categoryId + '"]'
+        );
+        [cell, total].forEach(function (el) {
+            if (el) {
+                el.textContent = Number(el.textContent) + amount;
+            }
+        });
+    }
+
+    function cell(text) {
+        var td = document.createElement("td");
+        td.textContent = text;
+        return td;
+    }
+
+    function newRow(change) {
+        var tr = document.createElement("tr");
+        tr.dataset.ticketId = change.ticket_id;
+        tr.appendChild(cell(change.ticket_id));
+        tr.appendChild(cell(change.summary || ""));
+        var status = cell(change.status);
+        status.dataset.field = "status";
+        tr.appendChild(status);
+        var view = document.createElement("a");
+        view.href = "/ticket/" + change.ticket_id;
+        view.textContent = "View";
+        var viewCell = cell("");
+        viewCell.appendChild(view);
+        tr.appendChild(viewCell);
+        return tr;
+    }
+
+    var handlers = {
+        ticket_created: function (change) {
+            addCount(change.category_id, change.status, 1);
+            if (
+                rows.hasAttribute("data-live-insert") &&
+                matchesFilters(change) &&
+                !row(change.ticket_id)
+            ) {
+                var tr = newRow(change);
+                rows.insertBefore(tr, rows.firstChild);
+                highlight(tr);
+            }
+        },
+        status_changed: function (change) {
+            addCount(change.category_id, change.old_status, -1);
+            addCount(change.category_id, change.status, 1);
+            var tr = row(change.ticket_id);
+            if (!tr) {
+                return;
+            }
+            // Left the page's filter, e.g. no longer open on an open-only list
+            if (!matchesFilters(change)) {
+                tr.remove();
+                return;
+            }
+            tr.querySelector('[data-field="status"]').textContent = change.status;
+            highlight(tr);
+        },
+        ticket_deleted: function (change) {
+            addCount(change.category_id, change.old_status, -1);
+            var tr = row(change.ticket_id);
+            if (tr) {
+                tr.remove();
+            }
+        },
+        // Archived tickets leave the list but are still counted
+        ticket_archived: function (change) {
+            var tr = row(change.ticket_id);
+            if (tr) {
+                tr.remove();
+            }
+        },
+        comment_added: function (change) {
+            var tr = row(change.ticket_id);
+            if (tr) {
+                tr.classList.add("live-commented");
+                highlight(tr);
+            }
+        }
+    };
+
+    var source = new EventSource(rows.dataset.liveEvents);
+    Object.keys(handlers).forEach(function (kind) {
+        source.addEventListener(kind, function (event) {
+            handlers[kind](JSON.parse(event.data));
+        });
+    });
+    // Changes were missed (the log was pruned), so start again from fresh
+    source.addEventListener("reset", function () {
+        source.close();
+        window.location.reload();
+    });
+})();
@@ -0,0 +1,160 @@
+"""Fingerprinted, precompressed copies of static/ served with far-future caching.
+
+Every file in static/ is copied into STATIC_BUILD_DIR under a name that
+includes a hash of its content (styles.css -> styles.3f9c2a71b0de.css),
+alongside .gz and (with the brotli package installed) .br versions.
+Templates link to them with asset_url('styles.css'), and /assets/ serves
+the smallest encoding the browser accepts as immutable for a year. A
+changed file gets a new name, so browsers never need to revalidate.
+
+Run `python static_assets.py` at build time; the app also builds whatever
+is missing when it starts, so a fresh checkout works without it.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import tempfile
+
+import config  # noqa: F401 - loads .env
+from flask import abort, request, send_file, url_for
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+STATIC_BUILD_DIR = os.getenv("STATIC_BUILD_DIR") or os.path.join(
+    ROOT, "build", "static"
+)
+STATIC_MAX_AGE = int(os.getenv("STATIC_MAX_AGE", 365 * 24 * 3600))
+
+# Already compressed formats gain nothing from another pass
+COMPRESSIBLE = (".css", ".js", ".svg", ".json", ".txt", ".html", ".map", ".ico")
+# Suffix on disk for each Content-Encoding
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+_manifest = {}
+
+
+def fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write(path, data):
+    """Writes atomically, so workers building at once never serve half a file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _compress(data, encoding):
+    if encoding == "gzip":
+        # mtime=0 keeps the output identical from build to build
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+
+def build(static_dir=STATIC_DIR, build_dir=STATIC_BUILD_DIR):
+    """Builds the fingerprinted copies and returns the manifest.
+
+    The manifest maps each logical name to its fingerprinted name and the
+    size of each encoding. Outputs that already exist are left alone, so
+    this is cheap to run on every start.
+    """
+    manifest = {}
+    for dirpath, _, filenames in os.walk(static_dir):
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            logical = os.path.relpath(source, static_dir).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(logical)
+            built = f"{stem}.{fingerprint(data)}{ext}"
+            target = os.path.join(build_dir, built)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            if not os.path.exists(target):
+                _write(target, data)
+            sizes = {"identity": len(data)}
+
+            if ext.lower() in COMPRESSIBLE:
+                for encoding, suffix in ENCODINGS.items():
+                    if encoding == "br" and brotli is None:
+                        continue
+                    if not os.path.exists(target + suffix):
+                        _write(target + suffix, _compress(data, encoding))
+                    sizes[encoding] = os.path.getsize(target + suffix)
+            manifest[logical] = {"path": built, "sizes": sizes}
+
+    _write(
+        os.path.join(build_dir, "manifest.json"),
+        json.dumps(manifest, indent=2, sort_keys=True).encode(),
+    )
+    return manifest
+
+
+def asset_url(filename):
+    """url_for('static', ...) for templates, pointing at the fingerprinted copy."""
+    entry = _manifest.get(filename)
+    if entry is None:
+        return url_for("static", filename=filename)
+    return url_for("asset", filename=entry["path"])
+
+
+def best_encoding(sizes):
+    """The smallest encoding of sizes that the request's Accept-Encoding allows."""
+    accepted = [
+        encoding
+        for encoding in sizes
+        if encoding == "identity" or request.accept_encodings[encoding] > 0
+    ]
+    return min(accepted, key=sizes.__getitem__)
+
+
+def register_static_assets(app):
+    _manifest.clear()
+    try:
+        _manifest.update(build())
+    except OSError:
+        # Pages still work from the plain static/ URLs, just without caching
+        app.logger.exception("Could not build static assets in %s", STATIC_BUILD_DIR)
+    served = {entry["path"]: entry for entry in _manifest.values()}
+
+    app.jinja_env.globals["asset_url"] = asset_url
+
+    @app.route("/assets/<path:filename>")
+    def asset(filename):
+        entry = served.get(filename)
+        if entry is None:
+            abort(404)
+        encoding = best_encoding(entry["sizes"])
+        path = os.path.join(STATIC_BUILD_DIR, filename)
+        if encoding != "identity":
+            path += ENCODINGS[encoding]
+        response = send_file(
+            path,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=STATIC_MAX_AGE,
+            conditional=True,
+        )
+        if encoding != "identity":
+            response.headers["Content-Encoding"] = encoding
+        if len(entry["sizes"]) > 1:
+            response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
+
+if __name__ == "__main__":
+    built = build()
+    for logical, entry in sorted(built.items()):
+        sizes = ", ".join(f"{k} {v}" for k, v in sorted(entry["sizes"].items()))
+        print(f"{logical} -> {entry['path']} ({sizes})")
+    print(f"{len(built)} assets in {STATIC_BUILD_DIR}", file=sys.stderr)
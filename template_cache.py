@@ -0,0 +1,122 @@
+"""Jinja bytecode cache and the {% cache %} tag for fragments shared between pages.
+
+Compiled templates are kept in TEMPLATE_BYTECODE_DIR, so a restarted worker
+loads them instead of compiling every template from source again. Jinja
+checks each entry against a checksum of the template source, so an edited
+template is recompiled.
+
+    {% cache "navbar", role, username %}...{% endcache %}
+
+renders its body, includes and all, once per distinct set of values and
+reuses the markup on later requests. Everything the body uses must be in
+the key. Fragments are kept in memory per process, and templates only
+change on a restart unless auto-reload is on (debug mode), so with
+auto-reload fragments are rendered every time instead.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import config  # noqa: F401 - loads .env
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+import metrics
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_BYTECODE_DIR = os.getenv("TEMPLATE_BYTECODE_DIR") or os.path.join(
+    ROOT, "build", "jinja"
+)
+TEMPLATE_FRAGMENT_CACHE = os.getenv("TEMPLATE_FRAGMENT_CACHE", "true").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+# Fragments kept per process (one per user for a per-user fragment)
+TEMPLATE_FRAGMENT_CACHE_SIZE = int(os.getenv("TEMPLATE_FRAGMENT_CACHE_SIZE", 2048))
+
+
+class FragmentCache:
+    """Rendered markup by key, least recently used first out."""
+
+    def __init__(self, max_entries=TEMPLATE_FRAGMENT_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, render):
+        with self._lock:
+            markup = self._entries.get(key)
+            if markup is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return markup
+            self.misses += 1
+
+        markup = render()
+        with self._lock:
+            self._entries[key] = markup
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return markup
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+fragments = FragmentCache()
+
+metrics.Counter(
+    "template_fragment_cache_hits_total",
+    "{% cache %} fragments reused instead of rendered.",
+    source=lambda: {(): fragments.hits},
+)
+metrics.Counter(
+    "template_fragment_cache_misses_total",
+    "{% cache %} fragments rendered and stored.",
+    source=lambda: {(): fragments.misses},
+)
+
+
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        key = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        block = nodes.Const(f"{parser.name}:{lineno}")
+        return nodes.CallBlock(
+            self.call_method("_cached", [block, nodes.List(key)]),
+            [],
+            [],
+            body,
+        ).set_lineno(lineno)
+
+    def _cached(self, block, key, caller):
+        if not TEMPLATE_FRAGMENT_CACHE or self.environment.auto_reload:
+            return caller()
+        return fragments.get((block, *key), caller)
+
+
+def register_template_caches(app):
+    """Must run before the first template is loaded."""
+    try:
+        os.makedirs(TEMPLATE_BYTECODE_DIR, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(TEMPLATE_BYTECODE_DIR)
+    except OSError:
+        app.logger.exception(
+            "Template bytecode cache disabled: can't use %s", TEMPLATE_BYTECODE_DIR
+        )
+    app.jinja_env.add_extension(FragmentCacheExtension)
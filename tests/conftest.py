@@ -1,12 +1,71 @@
+import itertools
 import os
 import pytest
 import sqlite3
-import app as flask_app_module
-from dotenv import load_dotenv
+import tempfile
+
+# Every test database is a copy of a template built once per session. The
+# copies live in SQLite's memdb VFS: in memory, but shared by every
+# connection in this process that opens the same name, so the pool, the
+# group commit writer and tests' own connections all see one database.
+# Names are unique per test and per pytest-xdist worker (each a process of
+# its own), so no two tests ever share one.
+WORKER = os.environ.get("PYTEST_XDIST_WORKER", "main")
+_test_numbers = itertools.count()
+
+# Keep worker metric snapshots written during tests out of the shared tmp dir
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="test-metrics-"))
+# The app logs to LOG_DIR on import; keep test runs out of the repo's logs/
+os.environ["LOG_DIR"] = tempfile.mkdtemp(prefix="test-logs-")
+# The database app.py migrates on import, in memory too
+os.environ["DB_NAME"] = f"file:/app-{WORKER}.db?vfs=memdb"
+
+import app as flask_app_module  # noqa: E402
+import database_operations  # noqa: E402
+import rate_limit  # noqa: E402
+from db_migrations import apply_migrations  # noqa: E402
+from dotenv import load_dotenv  # noqa: E402
+from setup_db import seed_sample_data  # noqa: E402
 
 load_dotenv()
 
 
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "sample_data: start from the setup_db.py sample data"
+    )
+    config.addinivalue_line(
+        "markers",
+        "file_db: use an on-disk database, for tests of WAL and other file behaviour",
+    )
+
+
+def build_template(sample_data=False):
+    conn = sqlite3.connect(":memory:")
+    apply_migrations(conn)
+    if sample_data:
+        seed_sample_data(conn)
+    else:
+        # Basic seed to prevent foreign key errors in tests
+        conn.execute("INSERT INTO categories (category_name) VALUES ('General')")
+        conn.commit()
+    return conn
+
+
+@pytest.fixture(scope="session")
+def empty_template():
+    conn = build_template()
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope="session")
+def sample_template():
+    conn = build_template(sample_data=True)
+    yield conn
+    conn.close()
+
+
 @pytest.fixture
 def client():
     flask_app_module.app.config["TESTING"] = True
@@ -15,21 +74,27 @@ def client():
 
 
 @pytest.fixture(scope="function", autouse=True)
-def temp_db(monkeypatch):
-    test_db = "temp_test.db"
+def temp_db(request, monkeypatch):
+    if request.node.get_closest_marker("sample_data"):
+        template = request.getfixturevalue("sample_template")
+    else:
+        template = request.getfixturevalue("empty_template")
 
-    if os.path.exists(test_db):
-        os.remove(test_db)
+    database_operations.close_db_connections()
+    database_operations.reset_caches()
+    rate_limit.reset()
 
-    monkeypatch.setattr("database_operations.DB_NAME", test_db)
+    if request.node.get_closest_marker("file_db"):
+        test_db = str(request.getfixturevalue("tmp_path") / "test.db")
+    else:
+        test_db = f"file:/test-{WORKER}-{next(_test_numbers)}.db?vfs=memdb"
+    # Also keeps an in-memory database alive until the test is over
+    conn = sqlite3.connect(test_db, uri=True)
+    template.backup(conn)
 
-    conn = sqlite3.connect(test_db)
-    with open("schema.sql", "r") as f:
-        conn.executescript(f.read())
-    conn.commit()
-    conn.close()
+    monkeypatch.setattr("database_operations.DB_NAME", test_db)
 
-    yield
+    yield test_db
 
-    if os.path.exists(test_db):
-        os.remove(test_db)
+    database_operations.close_db_connections()
+    conn.close()
@@ -0,0 +1,246 @@
+import pytest
+
+import api_tokens
+from database_operations import (
+    archive_closed_tickets,
+    close_ticket,
+    create_api_token,
+    delete_ticket,
+    get_api_tokens,
+    get_db_connection,
+    insert_comment,
+    insert_ticket,
+    insert_user,
+)
+
+
+def token_for(username, role):
+    insert_user(username, f"{username}@mail.com", "pass123", role)
+    _, token = create_api_token(username, "tests")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def tokens():
+    # Always created in this order, so ada is user 1 and bob user 2
+    return {"admin": token_for("ada", "admin"), "user": token_for("bob", "user")}
+
+
+@pytest.fixture
+def admin(tokens):
+    return tokens["admin"]
+
+
+@pytest.fixture
+def user(tokens):
+    return tokens["user"]
+
+
+def set_updated_at(ticket_id, value):
+    conn = get_db_connection()
+    conn.execute(
+        "UPDATE tickets SET updated_at = ? WHERE ticket_id = ?", (value, ticket_id)
+    )
+    conn.commit()
+
+
+def test_requests_need_a_valid_token(client, admin):
+    for headers in ({}, {"Authorization": "Bearer wrong"}, {"Authorization": "x"}):
+        res = client.get("/api/v1/tickets", headers=headers)
+        assert res.status_code == 401
+        assert res.headers["WWW-Authenticate"] == "Bearer"
+        assert res.get_json() == {"error": "A valid API token is required."}
+
+    # A logged-in browser session is not enough either
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="ada", role="admin")
+    assert client.get("/api/v1/tickets").status_code == 401
+    assert client.get("/api/v1/tickets", headers=admin).status_code == 200
+
+
+def test_create_then_fetch_with_fields(client, user):
+    res = client.post(
+        "/api/v1/tickets",
+        headers=user,
+        json={"title": "VPN down", "description": "Can't connect", "category_id": 1},
+    )
+    assert res.status_code == 201
+    created = res.get_json()
+    assert created["title"] == "VPN down"
+    assert created["status"] == "open"
+    assert created["updated_at"] == created["created_at"]
+
+    res = client.get(f"{res.headers['Location']}?fields=title,status", headers=user)
+    assert res.get_json() == {"title": "VPN down", "status": "open"}
+
+    res = client.get("/api/v1/tickets/1?fields=title,secret", headers=user)
+    assert res.status_code == 400
+
+    res = client.post("/api/v1/tickets", headers=user, json={"title": "No body"})
+    assert res.status_code == 400
+
+
+def test_list_pages_with_opaque_cursors(client, admin):
+    for i in range(5):
+        insert_ticket(1, 1, f"Ticket {i}", "Long description")
+
+    seen = []
+    first = "/api/v1/tickets?limit=2&fields=ticket_id,title"
+    url = first
+    while True:
+        page = client.get(url, headers=admin).get_json()
+        assert all(set(t) == {"ticket_id", "title"} for t in page["tickets"])
+        seen.extend(t["ticket_id"] for t in page["tickets"])
+        if not page["has_more"]:
+            break
+        url = f"{first}&cursor={page['next_cursor']}"
+    assert seen == [1, 2, 3, 4, 5]
+
+    # Nothing new yet: polling from the last cursor returns no tickets
+    poll = client.get(f"/api/v1/tickets?cursor={page['next_cursor']}", headers=admin)
+    assert poll.get_json()["tickets"] == []
+    assert poll.get_json()["next_cursor"] == page["next_cursor"]
+
+    assert (
+        "description"
+        not in client.get("/api/v1/tickets", headers=admin).get_json()["tickets"][0]
+    )
+    res = client.get("/api/v1/tickets?cursor=not-a-cursor", headers=admin)
+    assert res.status_code == 400
+
+
+def test_cursor_finds_changes_made_in_the_same_second(client, admin, monkeypatch):
+    monkeypatch.setattr("database_operations._now", lambda: "2026-01-01 12:00:00")
+    for i in range(3):
+        insert_ticket(1, 1, f"Ticket {i}", "Same second")
+    page = client.get("/api/v1/tickets?fields=ticket_id", headers=admin).get_json()
+    assert page["tickets"] == [{"ticket_id": 1}, {"ticket_id": 2}, {"ticket_id": 3}]
+
+    # Same updated_at as the cursor's ticket, and a lower ticket_id
+    close_ticket(1)
+    poll = client.get(
+        f"/api/v1/tickets?fields=ticket_id,status&cursor={page['next_cursor']}",
+        headers=admin,
+    ).get_json()
+    assert poll["tickets"] == [{"ticket_id": 1, "status": "closed"}]
+
+
+def test_updated_since_returns_only_changed_tickets(client, admin):
+    for i in range(3):
+        insert_ticket(1, 1, f"Ticket {i}", "Old news")
+        set_updated_at(i + 1, f"2024-01-0{i + 1} 12:00:00")
+
+    res = client.get(
+        "/api/v1/tickets?updated_since=2024-01-02T00:00:00&fields=ticket_id",
+        headers=admin,
+    )
+    assert res.get_json()["tickets"] == [{"ticket_id": 2}, {"ticket_id": 3}]
+
+    # A comment or a status change moves a ticket to the end of the feed
+    insert_comment(1, 1, "Still broken")
+    res = client.get(
+        "/api/v1/tickets?updated_since=2024-01-03T00:00:00&fields=ticket_id",
+        headers=admin,
+    )
+    assert res.get_json()["tickets"] == [{"ticket_id": 3}, {"ticket_id": 1}]
+
+    res = client.get(
+        "/api/v1/tickets?updated_since=2024-01-03T00:00:00Z&fields=ticket_id",
+        headers=admin,
+    )
+    assert res.status_code == 200
+
+    res = client.get("/api/v1/tickets?updated_since=yesterday", headers=admin)
+    assert res.status_code == 400
+
+
+def test_users_only_see_and_close_their_own_tickets(client, admin, user):
+    mine = insert_ticket(2, 1, "Mine", "Bob's")
+    theirs = insert_ticket(1, 1, "Theirs", "Ada's")
+
+    listed = client.get("/api/v1/tickets?fields=ticket_id", headers=user).get_json()
+    assert listed["tickets"] == [{"ticket_id": mine}]
+    assert client.get(f"/api/v1/tickets/{theirs}", headers=user).status_code == 404
+
+    res = client.patch(
+        f"/api/v1/tickets/{mine}", headers=user, json={"status": "in progress"}
+    )
+    assert res.status_code == 403
+    res = client.patch(
+        f"/api/v1/tickets/{mine}",
+        headers=user,
+        json={"status": "closed", "title": "Mine, fixed"},
+    )
+    assert res.get_json()["status"] == "closed"
+    assert res.get_json()["title"] == "Mine, fixed"
+
+    res = client.patch(
+        f"/api/v1/tickets/{mine}", headers=admin, json={"status": "open"}
+    )
+    assert res.get_json()["status"] == "open"
+
+
+def test_comments_are_added_and_paged(client, user):
+    ticket_id = insert_ticket(2, 1, "Chatty", "Lots to say")
+    url = f"/api/v1/tickets/{ticket_id}/comments"
+
+    for i in range(3):
+        res = client.post(url, headers=user, json={"message": f"Comment {i}"})
+        assert res.status_code == 201
+        assert res.get_json()["username"] == "bob"
+
+    first = client.get(f"{url}?limit=2&fields=message", headers=user).get_json()
+    assert first["comments"] == [{"message": "Comment 0"}, {"message": "Comment 1"}]
+    assert first["has_more"]
+    rest = client.get(f"{url}?cursor={first['next_cursor']}", headers=user).get_json()
+    assert [c["message"] for c in rest["comments"]] == ["Comment 2"]
+    assert not rest["has_more"]
+
+    assert client.post(url, headers=user, json={"message": " "}).status_code == 400
+
+
+def test_comment_on_a_ticket_deleted_meanwhile_is_not_found(client, user, monkeypatch):
+    ticket_id = insert_ticket(2, 1, "Short lived", "Gone soon")
+
+    def insert_then_delete(*args):
+        comment_id = insert_comment(*args)
+        delete_ticket(ticket_id)
+        return comment_id
+
+    monkeypatch.setattr("api.insert_comment", insert_then_delete)
+    url = f"/api/v1/tickets/{ticket_id}/comments"
+    res = client.post(url, headers=user, json={"message": "Anyone?"})
+    assert res.status_code == 404
+
+
+def test_token_cli_creates_lists_and_revokes(client, capsys):
+    insert_user("carol", "carol@mail.com", "pass123", "user")
+
+    assert api_tokens.main(["create", "carol", "--name", "bot"]) == 0
+    token = capsys.readouterr().out.strip()
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/api/v1/tickets", headers=headers).status_code == 200
+
+    (listed,) = get_api_tokens("carol")
+    assert listed.name == "bot"
+    assert token not in repr(listed)
+
+    assert api_tokens.main(["revoke", str(listed.token_id)]) == 0
+    assert client.get("/api/v1/tickets", headers=headers).status_code == 401
+    assert api_tokens.main(["create", "nobody"]) == 1
+
+
+def test_archived_tickets_can_be_read_but_not_changed(client, user):
+    ticket_id = insert_ticket(2, 1, "Old", "Long closed", status="closed")
+    insert_comment(ticket_id, 2, "Fixed")
+    set_updated_at(ticket_id, "2020-01-01 00:00:00")
+    assert archive_closed_tickets(days=30) == 1
+    url = f"/api/v1/tickets/{ticket_id}"
+
+    assert client.get(url, headers=user).get_json()["title"] == "Old"
+    comments = client.get(f"{url}/comments", headers=user).get_json()["comments"]
+    assert [c["message"] for c in comments] == ["Fixed"]
+    res = client.post(f"{url}/comments", headers=user, json={"message": "Again"})
+    assert res.status_code == 409
+    res = client.patch(url, headers=user, json={"status": "closed"})
+    assert res.status_code == 409
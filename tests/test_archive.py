@@ -0,0 +1,172 @@
+import threading
+
+import app as flask_app_module
+import archive
+import database_operations
+from database_operations import (
+    archive_closed_tickets,
+    check_ticket_counts,
+    delete_ticket,
+    get_archived_tickets_page,
+    get_changes,
+    get_comments_for_ticket,
+    get_comments_page,
+    get_db_connection,
+    get_ticket,
+    get_ticket_counts,
+    get_ticket_details,
+    insert_comment,
+    insert_ticket,
+    insert_user,
+    is_ticket_archived,
+)
+
+LONG_AGO = "2020-01-01 09:00:00"
+
+
+def old_ticket(title, status="closed", comments=0):
+    ticket_id = insert_ticket(1, 1, title, f"{title} details", status=status)
+    for i in range(comments):
+        insert_comment(ticket_id, 1, f"{title} comment {i}")
+    conn = get_db_connection()
+    conn.execute(
+        "UPDATE tickets SET updated_at = ? WHERE ticket_id = ?", (LONG_AGO, ticket_id)
+    )
+    conn.commit()
+    return ticket_id
+
+
+def count(table):
+    return get_db_connection().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def log_in(client, user_id, role):
+    with client.session_transaction() as sess:
+        sess.update(user_id=user_id, username=f"user{user_id}", role=role)
+
+
+def test_only_old_closed_tickets_move_with_their_comments():
+    insert_user("ada", "ada@mail.com", "pass123", "user")
+    archived = old_ticket("Printer", comments=3)
+    still_open = old_ticket("VPN", status="open", comments=1)
+    recent = insert_ticket(1, 1, "Monitor", "Closed today", status="closed")
+
+    assert archive_closed_tickets(days=30) == 1
+    assert is_ticket_archived(archived)
+    assert not is_ticket_archived(still_open) and not is_ticket_archived(recent)
+    assert (count("tickets"), count("comments")) == (2, 1)
+    assert (count("archived_tickets"), count("archived_comments")) == (1, 3)
+
+    # Reads find it in the archive, unchanged
+    assert get_ticket(archived).title == "Printer"
+    assert get_ticket(archived).updated_at == LONG_AGO
+    messages = [c.message for c in get_comments_for_ticket(archived)]
+    assert messages == [f"Printer comment {i}" for i in range(3)]
+    details = get_ticket_details(archived, limit=2)
+    assert details["archived"] and details["has_older"]
+    assert [c.message for c in details["comments"]] == messages[1:]
+    older, _ = get_comments_page(archived, before=details["comments"][0].comment_id)
+    assert [c.message for c in older] == messages[:1]
+    assert get_ticket_details(still_open)["archived"] is False
+
+    # Archived tickets are still counted, and dashboards hear it was archived
+    assert check_ticket_counts() == []
+    assert get_ticket_counts() == {1: {"open": 1, "closed": 2}}
+    assert get_changes(0)[-1].kind == "ticket_archived"
+
+    assert archive_closed_tickets(days=30) == 0
+
+
+def test_archival_runs_in_batches(monkeypatch):
+    for i in range(5):
+        old_ticket(f"Old {i}")
+    batches = []
+    archive_batch = database_operations._archive_batch
+
+    def counted(cutoff, batch_size):
+        batches.append(archive_batch(cutoff, batch_size))
+        return batches[-1]
+
+    monkeypatch.setattr("database_operations._archive_batch", counted)
+    assert archive_closed_tickets(days=30, batch_size=2) == 5
+    assert batches == [2, 2, 1]
+
+
+def test_archive_page_and_delete():
+    ids = [old_ticket(f"Old {i}", comments=1) for i in range(3)]
+    archive_closed_tickets(days=30)
+
+    first = get_archived_tickets_page(page_size=2)
+    assert [t.ticket_id for t in first["tickets"]] == ids[:0:-1]
+    assert first["tickets"][0].summary == "Old 2 details"
+    rest = get_archived_tickets_page(after=first["next"], page_size=2)
+    assert [t.ticket_id for t in rest["tickets"]] == ids[:1]
+    assert rest["next"] is None
+
+    delete_ticket(ids[0])
+    assert get_ticket(ids[0]) is None
+    assert count("archived_comments") == 2
+    assert get_changes(0)[-1].kind == "ticket_deleted"
+    assert get_ticket_counts() == {1: {"closed": 2}}
+    assert check_ticket_counts() == []
+
+
+def test_live_tickets_never_read_the_comment_archive():
+    insert_user("ada", "ada@mail.com", "pass123", "user")
+    live = insert_ticket(1, 1, "No comments yet", "Polled")
+    archived = old_ticket("Printer", comments=1)
+    archive_closed_tickets(days=30)
+
+    conn = get_db_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        assert get_comments_for_ticket(live) == []
+        assert get_comments_page(live, after=0) == ([], False)
+        assert len(get_comments_for_ticket(archived)) == 1
+    finally:
+        conn.set_trace_callback(None)
+    archive_reads = [s for s in statements if "archived_comments" in s]
+    assert len(archive_reads) == 1
+
+
+def test_archived_tickets_are_read_only_pages(client):
+    insert_user("ada", "ada@mail.com", "pass123", "user")
+    ticket_id = old_ticket("Printer", comments=1)
+    archive_closed_tickets(days=30)
+
+    log_in(client, 1, "user")
+    page = client.get(f"/ticket/{ticket_id}").get_data(as_text=True)
+    assert "Printer comment 0" in page and "Archived:" in page
+    assert 'class="comment-form"' not in page
+
+    res = client.post("/add_comment", data={"ticket_id": ticket_id, "message": "Hi"})
+    assert res.status_code == 302
+    assert count("comments") == 0 and count("archived_comments") == 1
+
+    assert client.get("/archive").status_code == 302
+    log_in(client, 1, "admin")
+    page = client.get("/archive").get_data(as_text=True)
+    assert f'href="/ticket/{ticket_id}"' in page
+
+
+def test_archiver_thread_archives_until_stopped():
+    ticket_id = old_ticket("Printer")
+    conn = get_db_connection()
+    conn.execute("UPDATE changes SET created_at = '2000-01-01 00:00:00'")
+    conn.commit()
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=archive.run_archiver, args=(flask_app_module.app, stop, 0.01)
+    )
+    thread.start()
+    for _ in range(200):
+        if is_ticket_archived(ticket_id):
+            break
+        stop.wait(0.01)
+    stop.set()
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert is_ticket_archived(ticket_id)
+    # The old ticket_created change is pruned; the new ticket_archived one stays
+    assert [c.kind for c in get_changes(0)] == ["ticket_archived"]
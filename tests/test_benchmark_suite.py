@@ -0,0 +1,47 @@
+import sqlite3
+
+from benchmarks import bench_database_operations as suite
+from benchmarks.dataset import generate
+
+
+def dump(db_name):
+    conn = sqlite3.connect(db_name)
+    rows = [
+        conn.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+        for table in ("users", "categories", "tickets", "comments", "ticket_counts")
+    ]
+    conn.close()
+    return rows
+
+
+def test_dataset_is_reproducible(tmp_path):
+    first = generate(tmp_path / "a.db", 300, seed=7, rounds=4)
+    generate(tmp_path / "b.db", 300, seed=7, rounds=4)
+    generate(tmp_path / "c.db", 300, seed=8, rounds=4)
+
+    assert first["tickets"] == 300 and first["comments"] > 300
+    assert dump(tmp_path / "a.db") == dump(tmp_path / "b.db")
+    assert dump(tmp_path / "a.db") != dump(tmp_path / "c.db")
+
+
+def test_every_public_function_has_a_case():
+    covered = {name.split("[")[0] for name in suite.CASES}
+
+    assert set(suite.public_functions()) - covered == set()
+
+
+def test_suite_runs_and_flags_regressions(tmp_path, monkeypatch):
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 4)
+    generate(tmp_path / "data.db", 200, rounds=4)
+
+    current = suite.run(str(tmp_path / "data.db"), min_time=0, max_runs=1)
+
+    assert set(current["results"]) == set(suite.CASES)
+    assert current["meta"]["tickets"] == 200
+    baseline = {"results": {"get_ticket": {"median_ms": 0.0001}}}
+    current["results"]["get_ticket"]["median_ms"] = 1.0
+    rows = {row[0]: row for row in suite.compare(current, baseline)}
+    assert rows["get_ticket"] == ("get_ticket", 0.0001, 1.0, 10000.0, True)
+    # Cases the baseline lacks are reported, not skipped
+    assert set(rows) == set(suite.CASES)
+    assert rows["get_user"][1] is None and not rows["get_user"][4]
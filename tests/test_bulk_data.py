@@ -0,0 +1,135 @@
+import io
+import json
+
+import pytest
+
+import bulk_data
+from bulk_data import export_rows, get_import_progress, import_rows
+from database_operations import get_db_connection, get_ticket, get_ticket_counts
+
+TICKETS_CSV = """ticket_id,user_id,category_id,title,description,status,created_at
+10,1,1,Printer jam,Paper stuck,open,2024-01-01 09:00:00
+11,1,1,,No title,open,
+12,2,1,VPN down,Can't connect,closed,
+13,2,1,Bad status,Whatever,lost,
+"""
+
+
+def test_csv_import_validates_and_inserts():
+    errors = io.StringIO()
+    counts = import_rows("tickets", io.StringIO(TICKETS_CSV), "csv", errors=errors)
+
+    assert counts == {"imported": 2, "rejected": 2, "skipped": 0}
+    assert get_ticket(10)[3:] == (
+        "Printer jam",
+        "Paper stuck",
+        "open",
+        "2024-01-01 09:00:00",
+        "2024-01-01 09:00:00",
+    )
+    assert get_ticket(12)[5] == "closed"
+    assert "line 3: title is required" in errors.getvalue()
+    assert "line 5: status" in errors.getvalue()
+    assert get_ticket_counts() == {1: {"open": 1, "closed": 1}}
+
+
+def test_ndjson_import_and_round_trip_export():
+    import_rows("tickets", io.StringIO(TICKETS_CSV), "csv", errors=io.StringIO())
+    lines = [
+        json.dumps({"ticket_id": 10, "user_id": 1, "message": "First"}),
+        "",
+        "not json",
+        json.dumps({"ticket_id": 10, "user_id": 2, "message": "Second"}),
+    ]
+    counts = import_rows(
+        "comments", io.StringIO("\n".join(lines)), "ndjson", errors=io.StringIO()
+    )
+    assert counts["imported"] == 2 and counts["rejected"] == 1
+    messages = get_db_connection().execute(
+        "SELECT message FROM comments WHERE ticket_id = 10 ORDER BY comment_id"
+    )
+    assert [m for m, in messages] == ["First", "Second"]
+
+    out = io.StringIO()
+    assert export_rows("tickets", out, "ndjson") == 2
+    exported = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [t["ticket_id"] for t in exported] == [10, 12]
+    assert exported[0]["created_at"] == "2024-01-01 09:00:00"
+
+    out = io.StringIO()
+    export_rows("comments", out, "csv")
+    assert (
+        out.getvalue().splitlines()[0]
+        == "comment_id,ticket_id,user_id,message,created_at"
+    )
+
+
+def test_rows_the_database_refuses_are_reported_not_fatal():
+    import_rows("tickets", io.StringIO(TICKETS_CSV), "csv", errors=io.StringIO())
+    lines = [
+        json.dumps({"comment_id": 1, "ticket_id": 10, "user_id": 1, "message": "A"}),
+        json.dumps({"comment_id": 1, "ticket_id": 10, "user_id": 1, "message": "B"}),
+        json.dumps({"comment_id": 2, "ticket_id": 12, "user_id": 2, "message": "C"}),
+    ]
+    errors = io.StringIO()
+    counts = import_rows(
+        "comments", io.StringIO("\n".join(lines)), "ndjson", source="c", errors=errors
+    )
+
+    assert counts == {"imported": 2, "rejected": 1, "skipped": 0}
+    assert "line 2: UNIQUE constraint failed" in errors.getvalue()
+    messages = get_db_connection().execute(
+        "SELECT message FROM comments ORDER BY comment_id"
+    )
+    assert [m for m, in messages] == ["A", "C"]
+    assert get_import_progress("c") == 3
+
+
+def test_interrupted_import_resumes_where_it_stopped(monkeypatch):
+    rows = "".join(
+        json.dumps(
+            {
+                "user_id": 1,
+                "category_id": 1,
+                "title": f"T{i}",
+                "description": "d",
+                "status": "open",
+            }
+        )
+        + "\n"
+        for i in range(10)
+    )
+    real_write = bulk_data._write_batch
+    calls = []
+
+    def failing_write(*args):
+        calls.append(args)
+        if len(calls) == 3:
+            raise RuntimeError("disk on fire")
+        return real_write(*args)
+
+    monkeypatch.setattr(bulk_data, "_write_batch", failing_write)
+    with pytest.raises(RuntimeError):
+        import_rows("tickets", io.StringIO(rows), "ndjson", source="t", batch_size=3)
+    assert get_import_progress("t") == 6
+
+    monkeypatch.setattr(bulk_data, "_write_batch", real_write)
+    counts = import_rows(
+        "tickets", io.StringIO(rows), "ndjson", source="t", resume=True, batch_size=3
+    )
+
+    assert counts == {"imported": 4, "rejected": 0, "skipped": 6}
+    assert get_ticket_counts() == {1: {"open": 10}}
+    assert get_import_progress("t") == 10
+
+
+def test_cli_round_trip(tmp_path):
+    source = tmp_path / "tickets.csv"
+    source.write_text(TICKETS_CSV)
+    target = tmp_path / "out.csv"
+
+    assert bulk_data.main(["import", "tickets", str(source)]) == 0
+    assert bulk_data.main(["import", "tickets", str(source), "--resume"]) == 0
+    assert bulk_data.main(["export", "tickets", str(target)]) == 0
+
+    assert len(target.read_text().splitlines()) == 3
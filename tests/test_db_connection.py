@@ -0,0 +1,76 @@
+import sqlite3
+import threading
+
+import pytest
+
+import database_operations
+from database_operations import (
+    get_db_connection,
+    close_db_connections,
+    retry_on_lock,
+    insert_ticket,
+    get_ticket,
+)
+
+
+def test_connection_is_reused_within_a_thread():
+    assert get_db_connection() is get_db_connection()
+
+
+def test_each_thread_gets_its_own_connection():
+    main_conn = get_db_connection()
+    seen = []
+
+    def worker():
+        seen.append(get_db_connection())
+        close_db_connections()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    thread.join()
+
+    assert seen[0] is not main_conn
+
+
+@pytest.mark.file_db
+def test_pragmas_are_applied():
+    conn = get_db_connection()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert (
+        conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        == database_operations.DB_BUSY_TIMEOUT_MS
+    )
+
+
+def test_helpers_work_through_the_pool():
+    insert_ticket(1, 1, "Pooled", "Uses the shared connection")
+    assert get_ticket(1)[3] == "Pooled"
+
+
+def test_retry_on_lock_backs_off_then_succeeds(monkeypatch):
+    monkeypatch.setattr("database_operations.DB_LOCK_BACKOFF", 0)
+    calls = []
+
+    @retry_on_lock
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise sqlite3.OperationalError("database is locked")
+        return "done"
+
+    assert flaky() == "done"
+    assert len(calls) == 3
+
+
+def test_retry_on_lock_ignores_other_errors():
+    calls = []
+
+    @retry_on_lock
+    def broken():
+        calls.append(1)
+        raise sqlite3.OperationalError("no such table: nope")
+
+    with pytest.raises(sqlite3.OperationalError):
+        broken()
+    assert len(calls) == 1
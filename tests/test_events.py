@@ -0,0 +1,191 @@
+import json
+import re
+
+import pytest
+
+import events
+from database_operations import (
+    close_ticket,
+    delete_ticket,
+    get_change_bounds,
+    get_changes,
+    get_db_connection,
+    insert_comment,
+    insert_ticket,
+    prune_changes,
+    update_ticket_status,
+)
+
+
+@pytest.fixture
+def short_streams(monkeypatch):
+    # Long enough for one poll, then the stream ends like a timed-out one
+    monkeypatch.setattr("events.EVENTS_MAX_SECONDS", 0.05)
+    monkeypatch.setattr("events.EVENTS_POLL_INTERVAL", 0.01)
+
+
+def log_in(client, user_id, role):
+    with client.session_transaction() as sess:
+        sess.update(user_id=user_id, username=f"user{user_id}", role=role)
+
+
+def read_events(response):
+    """Parses an SSE body into [(id, event, data)] and closes the stream."""
+    parsed = []
+    body = response.get_data(as_text=True)
+    # The test client leaves closing (which frees the stream slot) to us
+    response.close()
+    for block in body.split("\n\n"):
+        fields = dict(
+            line.split(": ", 1) for line in block.splitlines() if ": " in line
+        )
+        if "event" in fields:
+            parsed.append(
+                (int(fields["id"]), fields["event"], json.loads(fields["data"]))
+            )
+    return parsed
+
+
+def test_triggers_log_changes_in_order():
+    ticket_id = insert_ticket(1, 1, "Printer", "Out of toner")
+    update_ticket_status(ticket_id, "in progress")
+    update_ticket_status(ticket_id, "in progress")  # no change, no event
+    insert_comment(ticket_id, 1, "Ordered more")
+    close_ticket(ticket_id)
+    assert get_changes(0)[0].summary == "Out of toner"
+    delete_ticket(ticket_id)
+
+    changes = get_changes(0)
+    assert [c.kind for c in changes] == [
+        "ticket_created",
+        "status_changed",
+        "comment_added",
+        "status_changed",
+        "ticket_deleted",
+    ]
+    assert [c.seq for c in changes] == sorted(c.seq for c in changes)
+    assert (changes[3].old_status, changes[3].status) == ("in progress", "closed")
+    assert get_change_bounds() == (changes[0].seq, changes[-1].seq)
+
+
+def test_stream_resumes_from_last_event_id(client, short_streams, monkeypatch):
+    # One slot: the second stream below only opens if the first gave it back
+    monkeypatch.setattr("events._streams", events.threading.BoundedSemaphore(1))
+    log_in(client, 1, "admin")
+    first = insert_ticket(1, 1, "First", "Seen already")
+    insert_ticket(2, 1, "Second", "Not seen yet")
+    update_ticket_status(first, "closed")
+
+    res = client.get("/events", headers={"Last-Event-ID": "1"})
+    assert res.status_code == 200
+    assert res.mimetype == "text/event-stream"
+    assert res.get_data(as_text=True).startswith("retry: ")
+    got = read_events(res)
+    assert [(seq, kind) for seq, kind, _ in got] == [
+        (2, "ticket_created"),
+        (3, "status_changed"),
+    ]
+    assert got[0][2]["summary"] == "Not seen yet"
+    assert got[1][2]["old_status"] == "open"
+
+    # Without an id, a new stream starts from now
+    assert read_events(client.get("/events")) == []
+
+
+def test_users_only_get_their_own_tickets(client, short_streams):
+    log_in(client, 2, "user")
+    insert_ticket(1, 1, "Someone else's", "Private")
+    mine = insert_ticket(2, 1, "Mine", "Mine")
+    insert_comment(mine, 1, "Reply from support")
+
+    got = read_events(client.get("/events?since=0"))
+    assert [(kind, data["ticket_id"]) for _, kind, data in got] == [
+        ("ticket_created", mine),
+        ("comment_added", mine),
+    ]
+
+
+def test_pruned_history_sends_reset(client, short_streams):
+    log_in(client, 1, "admin")
+    for i in range(3):
+        insert_ticket(1, 1, f"Ticket {i}", "Old")
+    conn = get_db_connection()
+    conn.execute("UPDATE changes SET created_at = '2000-01-01 00:00:00'")
+    conn.commit()
+    assert prune_changes() == 3
+    assert get_change_bounds() == (4, 3)
+
+    got = read_events(client.get("/events", headers={"Last-Event-ID": "1"}))
+    assert got == [(3, "reset", {})]
+    # Caught up: nothing was missed
+    assert read_events(client.get("/events", headers={"Last-Event-ID": "3"})) == []
+
+
+def test_stream_needs_login_and_a_free_slot(client, monkeypatch):
+    assert client.get("/events").status_code == 401
+    log_in(client, 1, "admin")
+    assert client.get("/events", headers={"Last-Event-ID": "x"}).status_code == 400
+
+    monkeypatch.setattr("events._streams", events.threading.BoundedSemaphore(1))
+    events._streams.acquire()
+    res = client.get("/events")
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "10"
+
+
+def test_dashboard_starts_the_feed_at_the_latest_change(client):
+    insert_ticket(1, 1, "Existing", "Before the page loaded")
+    log_in(client, 1, "admin")
+    html = client.get("/dashboard").get_data(as_text=True)
+    assert 'data-live-events="/events?since=1"' in html
+    assert "data-live-insert" in html
+    assert 'data-ticket-id="1"' in html
+    assert re.search(r"/assets/live_dashboard\.[0-9a-f]{12}\.js", html)
+
+
+def test_filtered_dashboard_passes_its_filters_to_the_feed(client):
+    insert_ticket(1, 1, "Existing", "Open one")
+    log_in(client, 1, "admin")
+    html = client.get("/dashboard?status=open&category=1").get_data(as_text=True)
+    assert "data-live-insert" in html
+    assert 'data-filter-status="open"' in html
+    assert 'data-filter-category="1"' in html
+
+    html = client.get("/dashboard?user=user1").get_data(as_text=True)
+    assert "data-live-insert" not in html
+
+
+def render_web_threads():
+    """The --threads render.yaml starts gunicorn with, and its env vars."""
+    with open("render.yaml") as f:
+        text = f.read()
+    env = dict(re.findall(r"- key: (\w+)\s+value: (\S+)", text))
+    threads = re.search(r"--threads (\S+)", text).group(1)
+    if threads.startswith("$"):
+        threads = env[threads[1:]]
+    return int(threads), env
+
+
+def test_stream_cap_leaves_threads_for_other_requests():
+    threads, env = render_web_threads()
+    assert int(env["WEB_THREADS"]) == threads
+    cap = events.max_streams(threads, env.get("EVENTS_MAX_STREAMS"))
+    assert 0 < cap < threads
+    assert events.EVENTS_MAX_STREAMS < events.WEB_THREADS
+
+    assert events.max_streams(8) == 4
+    assert events.max_streams(8, "16") == 7
+
+
+def test_single_threaded_server_turns_live_updates_off(client, monkeypatch):
+    # A stream would hold the only thread, so none are allowed
+    assert events.max_streams(1) == 0
+    assert events.max_streams(1, "4") == 0
+
+    monkeypatch.setattr("events.EVENTS_MAX_STREAMS", 0)
+    log_in(client, 1, "admin")
+    html = client.get("/dashboard").get_data(as_text=True)
+    assert "data-live-events" not in html
+    res = client.get("/events")
+    assert res.status_code == 404
+    assert res.get_json() == {"error": "Live updates are turned off."}
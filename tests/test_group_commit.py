@@ -0,0 +1,181 @@
+import sqlite3
+import threading
+
+import pytest
+
+import database_operations
+import metrics
+from database_operations import get_ticket, insert_comment, insert_ticket
+from group_commit import BATCH_SIZE, GroupCommitWriter, WriteOutcomeUnknown
+
+
+@pytest.fixture
+def group_commit(monkeypatch):
+    monkeypatch.setattr("database_operations.DB_GROUP_COMMIT", True)
+    # Long enough that every thread's write lands in the first batch or two
+    monkeypatch.setattr("database_operations.DB_GROUP_COMMIT_MAX_DELAY_MS", 200)
+    BATCH_SIZE.reset()
+    yield
+    database_operations.close_group_writers()
+
+
+def test_writes_return_their_new_ids():
+    assert insert_ticket(1, 1, "First", "One") == 1
+    assert insert_ticket(1, 1, "Second", "Two") == 2
+    assert insert_comment(2, 1, "On the second") == 1
+
+
+def test_concurrent_writes_are_committed_together(group_commit):
+    ticket_id = insert_ticket(1, 1, "Busy ticket", "Lots of comments")
+    ids = []
+    start = threading.Barrier(8)
+
+    def comment(n):
+        start.wait()
+        ids.append(insert_comment(ticket_id, 1, f"Comment {n}"))
+        database_operations.close_db_connections()
+
+    threads = [threading.Thread(target=comment, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(ids) == list(range(1, 9))
+    # Callers only return after the commit, so another connection sees it all
+    other = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    assert other.execute("SELECT COUNT(*) FROM comments").fetchone() == (8,)
+    other.close()
+    # The ticket plus eight comments took fewer than nine transactions
+    samples = metrics.snapshot()["db_group_commit_batch_size"]["samples"]
+    commits = sum(sum(state[:-1]) for _, state in samples)
+    assert commits < 9
+    assert get_ticket(ticket_id)[3] == "Busy ticket"
+
+
+def test_failed_write_is_rolled_back_alone():
+    writer = GroupCommitWriter(
+        lambda: sqlite3.connect(
+            database_operations.DB_NAME, uri=True, check_same_thread=False
+        ),
+        max_delay=0.2,
+    )
+
+    def insert_then_fail(conn):
+        conn.execute("INSERT INTO categories (category_name) VALUES ('Doomed')")
+        raise ValueError("validation failed")
+
+    def insert(conn, name):
+        return conn.execute(
+            "INSERT INTO categories (category_name) VALUES (?)", (name,)
+        ).lastrowid
+
+    results = {}
+
+    def submit(key, func, *args):
+        try:
+            results[key] = writer.submit(func, *args)
+        except ValueError as e:
+            results[key] = e
+
+    threads = [
+        threading.Thread(target=submit, args=("a", insert, "Hardware")),
+        threading.Thread(target=submit, args=("b", insert_then_fail)),
+        threading.Thread(target=submit, args=("c", insert, "Network")),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    writer.close()
+
+    assert isinstance(results["b"], ValueError)
+    conn = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    names = [row[0] for row in conn.execute("SELECT category_name FROM categories")]
+    conn.close()
+    assert sorted(names) == ["General", "Hardware", "Network"]
+
+
+def test_writer_that_cannot_connect_fails_writes_and_restarts():
+    attempts = []
+
+    def connect():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise sqlite3.OperationalError("unable to open database file")
+        return sqlite3.connect(
+            database_operations.DB_NAME, uri=True, check_same_thread=False
+        )
+
+    writer = GroupCommitWriter(connect, timeout=5)
+
+    def insert(conn, name):
+        return conn.execute(
+            "INSERT INTO categories (category_name) VALUES (?)", (name,)
+        ).lastrowid
+
+    with pytest.raises(sqlite3.OperationalError):
+        writer.submit(insert, "Hardware")
+    assert writer.submit(insert, "Network") == 2
+    writer.close()
+    assert len(attempts) == 2
+
+
+@pytest.mark.parametrize("grouped", [False, True])
+def test_locked_writes_are_retried_in_one_layer(grouped, group_commit, monkeypatch):
+    monkeypatch.setattr("database_operations.DB_GROUP_COMMIT", grouped)
+    monkeypatch.setattr("database_operations.DB_LOCK_BACKOFF", 0)
+    calls = []
+
+    def locked(conn, *args):
+        calls.append(1)
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr("database_operations._insert_comment_row", locked)
+    with pytest.raises(sqlite3.OperationalError):
+        insert_comment(1, 1, "Never lands")
+    # The writer only retries whole batches, not a write that raised in one
+    expected = 1 if grouped else database_operations.DB_LOCK_RETRIES + 1
+    assert len(calls) == expected
+
+
+def test_timed_out_writes_are_cancelled_unless_already_running():
+    writer = GroupCommitWriter(
+        lambda: sqlite3.connect(
+            database_operations.DB_NAME, uri=True, check_same_thread=False
+        ),
+        max_batch=1,
+        timeout=0.1,
+    )
+    started, release = threading.Event(), threading.Event()
+
+    def insert(conn, name):
+        started.set()
+        release.wait(5)
+        return conn.execute(
+            "INSERT INTO categories (category_name) VALUES (?)", (name,)
+        ).lastrowid
+
+    outcomes = {}
+
+    def submit(name):
+        try:
+            outcomes[name] = writer.submit(insert, name)
+        except Exception as e:
+            outcomes[name] = e
+
+    running = threading.Thread(target=submit, args=("Hardware",))
+    running.start()
+    # Hardware holds the writer, so Network stays queued until it times out
+    started.wait(5)
+    submit("Network")
+    running.join()
+    release.set()
+    writer.close()
+
+    assert isinstance(outcomes["Hardware"], WriteOutcomeUnknown)
+    assert type(outcomes["Network"]) is TimeoutError
+    conn = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    names = [row[0] for row in conn.execute("SELECT category_name FROM categories")]
+    conn.close()
+    assert "Network" not in names
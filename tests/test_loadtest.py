@@ -0,0 +1,60 @@
+import app as flask_app_module
+import database_operations
+from benchmarks.dataset import generate
+from benchmarks.loadtest import (
+    FlaskClientTarget,
+    Workload,
+    load_scenario,
+    percentile,
+    render,
+    run,
+)
+
+
+def test_scenario_files_load():
+    scenario = load_scenario("mixed")
+
+    assert {spec["name"] for spec in scenario["requests"]} >= {"dashboard", "ticket"}
+    assert all(spec["expect"] for spec in scenario["requests"])
+
+
+def test_render_quotes_path_but_not_form():
+    spec = {"method": "POST", "path": "/x?status={status}", "form": {"s": "{status}"}}
+
+    assert render(spec, {"status": "in progress"}) == (
+        "POST",
+        "/x?status=in%20progress",
+        {"s": "in progress"},
+    )
+
+
+def test_percentile_is_nearest_rank():
+    ordered = list(range(1, 101))
+
+    assert percentile(ordered, 50) == 50
+    assert percentile(ordered, 99) == 99
+    assert percentile([7.0], 95) == 7.0
+
+
+def test_run_against_the_test_client(tmp_path, monkeypatch):
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 4)
+    db_name = str(tmp_path / "load.db")
+    generate(db_name, 200, rounds=4)
+    monkeypatch.setattr("database_operations.DB_NAME", db_name)
+    database_operations.sync_username_index()
+
+    scenario = load_scenario("mixed")
+    scenario["sessions"] = {"user": 2, "admin": 1}
+    scenario["concurrency"] = 2
+    report = run(
+        FlaskClientTarget(flask_app_module.app),
+        scenario,
+        Workload(db_name),
+        rate=100,
+        duration=0.5,
+    )
+
+    assert report["requests"] == 50
+    assert report["error_rate"] == 0
+    assert set(report["routes"]) <= {spec["name"] for spec in scenario["requests"]}
+    assert report["routes"]["ticket"]["p99_ms"] >= report["routes"]["ticket"]["p50_ms"]
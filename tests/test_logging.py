@@ -0,0 +1,69 @@
+import logging
+import logging.handlers
+import os
+
+import pytest
+
+import logger
+
+
+@pytest.fixture
+def log_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr("logger.LOG_DIR", str(tmp_path))
+    yield tmp_path
+    # Put the app's normal configuration back for the rest of the suite
+    monkeypatch.undo()
+    logger.configure_logging()
+
+
+def test_records_go_through_the_queue_to_the_file(log_dir, monkeypatch):
+    monkeypatch.setattr("logger.LOG_LEVEL", "INFO")
+    logger.configure_logging()
+    root = logging.getLogger()
+
+    logging.getLogger("tests").warning("Disk at %s%%", 91)
+    logging.getLogger("tests").info("not for the file")
+    logger.stop_logging()
+
+    queue_handlers = [
+        h for h in root.handlers if isinstance(h, logging.handlers.QueueHandler)
+    ]
+    assert len(queue_handlers) == 1
+    content = (log_dir / "app.log").read_text()
+    assert "WARNING  | Disk at 91%" in content
+    assert "not for the file" not in content
+
+
+def test_log_level_skips_formatting_filtered_calls(log_dir, monkeypatch):
+    monkeypatch.setattr("logger.LOG_LEVEL", "WARNING")
+    logger.configure_logging()
+    formatted = []
+
+    class Expensive:
+        def __str__(self):
+            formatted.append(1)
+            return "expensive"
+
+    logging.getLogger("tests").info("Value: %s", Expensive())
+    logger.stop_logging()
+
+    assert formatted == []
+
+
+def test_file_is_reopened_after_external_rotation(tmp_path):
+    handler = logger._file_handler(str(tmp_path / "app.log"))
+    log = logging.getLogger("tests.rotation")
+    log.propagate = False
+    log.addHandler(handler)
+    try:
+        log.error("Before rotation")
+        # What logrotate does; other workers keep the same handler open
+        os.rename(tmp_path / "app.log", tmp_path / "app.log.1")
+        log.error("After rotation")
+    finally:
+        log.removeHandler(handler)
+        handler.close()
+
+    assert sorted(os.listdir(tmp_path)) == ["app.log", "app.log.1"]
+    assert "Before rotation" in (tmp_path / "app.log.1").read_text()
+    assert "After rotation" in (tmp_path / "app.log").read_text()
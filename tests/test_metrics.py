@@ -0,0 +1,119 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import database_operations
+import metrics
+from database_operations import (
+    check_ticket_counts,
+    get_ticket,
+    insert_ticket,
+    iter_tickets,
+    retry_on_lock,
+)
+from password_hashing import hash_password
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics(tmp_path, monkeypatch):
+    monkeypatch.setattr("metrics.METRICS_DIR", str(tmp_path))
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def sample(name, *labels):
+    return metrics.collect()[name]["samples"].get(labels)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("demo_seconds", "Demo.", ("route",), buckets=(1, 5))
+    try:
+        for value in (0.5, 1, 3, 9):
+            histogram.observe(value, "home")
+
+        text = metrics.render(metrics.merge([metrics.snapshot()]))
+    finally:
+        del metrics._registry["demo_seconds"]
+
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{route="home",le="1"} 2' in text
+    assert 'demo_seconds_bucket{route="home",le="5"} 3' in text
+    assert 'demo_seconds_bucket{route="home",le="+Inf"} 4' in text
+    assert 'demo_seconds_sum{route="home"} 13.5' in text
+    assert 'demo_seconds_count{route="home"} 4' in text
+
+
+def test_sql_is_timed_per_database_function():
+    # An existing ticket, since a missing one also reads through to the archive
+    insert_ticket(1, 1, "Timed", "One lookup")
+    get_ticket(1)
+    check_ticket_counts()
+
+    # One observation per statement, labelled with the function that ran it
+    assert sum(sample("db_query_duration_seconds", "get_ticket")[:-1]) == 1
+    assert sample("db_query_duration_seconds", "check_ticket_counts") is not None
+    assert sample("db_query_duration_seconds", "_insert_ticket_row") is not None
+
+    # A stream's label doesn't leak into what the caller runs between rows
+    for _ in iter_tickets():
+        get_ticket(1)
+    # Opening its own connection counts towards the stream too
+    assert sample("db_query_duration_seconds", "iter_tickets") is not None
+    assert sum(sample("db_query_duration_seconds", "get_ticket")[:-1]) == 2
+    assert sample("db_query_duration_seconds", "other") is None
+
+
+def test_lock_retries_and_bcrypt_are_counted(monkeypatch):
+    monkeypatch.setattr("password_hashing.HASH_POOL_WORKERS", 0)
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 4)
+    monkeypatch.setattr("database_operations.DB_LOCK_BACKOFF", 0)
+    attempts = []
+
+    @retry_on_lock
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise sqlite3.OperationalError("database is locked")
+
+    flaky()
+    hash_password("secret")
+
+    assert sample("db_lock_retries_total", "flaky") == 2
+    assert sample("bcrypt_operations_total", "hashpw") == 1
+    assert sample("bcrypt_seconds_total", "hashpw") > 0
+
+
+def test_metrics_endpoint_merges_other_workers(client, tmp_path):
+    client.get("/")
+    database_operations.get_categories()
+    # Pretend another gunicorn worker (a live process) has done the same work
+    other = metrics.snapshot()
+    with open(os.path.join(tmp_path, f"{os.getppid()}.json"), "w") as f:
+        json.dump(other, f)
+    client.get("/")
+
+    res = client.get("/metrics")
+    text = res.get_data(as_text=True)
+
+    assert res.status_code == 200
+    assert res.mimetype == "text/plain"
+    labels = 'endpoint="home",method="GET",status="200"'
+    assert f"http_request_duration_seconds_count{{{labels}}} 3" in text
+    assert 'reference_cache_misses_total{cache="categories"} 2' in text
+
+
+def test_snapshots_of_exited_workers_are_pruned(tmp_path):
+    worker = subprocess.Popen([sys.executable, "-c", "pass"])
+    worker.wait()
+    dead = tmp_path / f"{worker.pid}.json"
+    counter = {"type": "counter", "help": "Counted by the exited worker."}
+    counter.update(labelnames=[], buckets=[], samples=[[[], 5.0]])
+    dead.write_text(json.dumps({"dead_worker_total": counter}))
+
+    assert "dead_worker_total" not in metrics.collect()
+    assert not dead.exists()
@@ -0,0 +1,49 @@
+import sqlite3
+
+from db_migrations import (
+    apply_migrations,
+    get_schema_version,
+    load_migrations,
+    split_statements,
+)
+
+
+def test_migrations_are_applied_once():
+    conn = sqlite3.connect(":memory:")
+    latest = load_migrations()[-1][0]
+
+    assert apply_migrations(conn) == [v for v, _, _ in load_migrations()]
+    assert apply_migrations(conn) == []
+    assert get_schema_version(conn) == latest
+
+
+def test_existing_unversioned_database_is_adopted():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("CREATE TABLE users (user_id INTEGER PRIMARY KEY, username TEXT)")
+    conn.execute("INSERT INTO users (username) VALUES ('kept')")
+    conn.commit()
+
+    apply_migrations(conn)
+
+    assert conn.execute("SELECT username FROM users").fetchone() == ("kept",)
+
+
+def test_split_statements_keeps_trigger_bodies_whole():
+    sql = """
+    -- comment
+    CREATE TABLE a (x);
+    CREATE TRIGGER t AFTER INSERT ON a BEGIN
+        UPDATE a SET x = 1;
+    END;
+    """
+    statements = split_statements(sql)
+    assert len(statements) == 2
+    assert statements[1].endswith("END;")
+
+
+def test_apply_up_to_target_then_the_rest():
+    conn = sqlite3.connect(":memory:")
+
+    assert apply_migrations(conn, target=1) == [1]
+    assert get_schema_version(conn) == 1
+    assert apply_migrations(conn)[0] == 2
@@ -0,0 +1,103 @@
+import threading
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+import pytest
+
+from database_operations import insert_user, get_user, get_db_connection
+import password_hashing
+from password_hashing import (
+    HashingBusy,
+    hash_password,
+    check_password,
+    get_cost,
+    needs_rehash,
+)
+
+
+def stored_hash(username):
+    return (
+        get_db_connection()
+        .execute("SELECT password FROM users WHERE username = ?", (username,))
+        .fetchone()[0]
+    )
+
+
+def test_hash_and_check_use_configured_cost(monkeypatch):
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 5)
+    hashed = hash_password("hunter22")
+
+    assert get_cost(hashed) == 5
+    assert check_password("hunter22", hashed)
+    assert not check_password("wrong", hashed)
+    assert not needs_rehash(hashed)
+
+
+def test_login_rehashes_when_cost_changes(monkeypatch):
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 4)
+    insert_user("erin", "erin@mail.com", "pass123", "user")
+    assert get_cost(stored_hash("erin")) == 4
+
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 5)
+    assert get_user("erin", "pass123") is not None
+    assert get_cost(stored_hash("erin")) == 5
+    assert get_user("erin", "pass123") is not None
+
+
+def test_saturated_pool_raises_busy(monkeypatch):
+    monkeypatch.setattr("password_hashing.HASH_POOL_WORKERS", 1)
+    exhausted = threading.BoundedSemaphore(1)
+    exhausted.acquire()
+    monkeypatch.setattr("password_hashing._get_pool", lambda: (None, exhausted))
+
+    with pytest.raises(HashingBusy):
+        hash_password("anything")
+
+
+def test_broken_pool_is_replaced_without_leaking_slots(monkeypatch):
+    monkeypatch.setattr("password_hashing.HASH_POOL_WORKERS", 1)
+    monkeypatch.setattr("password_hashing.HASH_QUEUE_LIMIT", 1)
+    password_hashing.shutdown_pool()
+    broken, slots = password_hashing._get_pool()
+
+    def submit(*args):
+        raise BrokenProcessPool("A worker was killed")
+
+    monkeypatch.setattr(broken, "submit", submit)
+    with pytest.raises(BrokenProcessPool):
+        hash_password("anything")
+    assert slots.acquire(blocking=False)
+
+    pool, _ = password_hashing._get_pool()
+    assert pool is not broken
+    monkeypatch.setattr("password_hashing.BCRYPT_ROUNDS", 4)
+    assert check_password("anything", hash_password("anything"))
+    password_hashing.shutdown_pool()
+
+
+def test_login_route_returns_503_when_busy(client, monkeypatch):
+    def busy(*args):
+        raise HashingBusy()
+
+    monkeypatch.setattr("database_operations.check_password", busy)
+    hashed = bcrypt.hashpw(b"pass123", bcrypt.gensalt(4))
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT INTO users (username, email, password, role) VALUES (?, ?, ?, ?)",
+        ("frank", "frank@mail.com", hashed, "user"),
+    )
+    conn.commit()
+
+    res = client.post("/login", data={"username": "frank", "password": "pass123"})
+    assert res.status_code == 503
+    assert res.headers["Retry-After"] == "1"
+    assert b"busy" in res.data
+
+
+def test_calibrate_returns_rather_than_prints(capsys):
+    rounds, timings = password_hashing.calibrate(0, min_rounds=4, max_rounds=5)
+
+    # Even the cheapest cost takes longer than 0 ms, so timing stops there
+    assert rounds == 4
+    assert [cost for cost, _ in timings] == [4]
+    assert capsys.readouterr().out == ""
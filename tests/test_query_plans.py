@@ -0,0 +1,120 @@
+import re
+
+import pytest
+
+from database_operations import (
+    insert_ticket,
+    get_db_connection,
+    get_tickets_for_user,
+    get_tickets_page,
+    get_ticket,
+    get_comments_for_ticket,
+    get_user,
+    username_exists,
+    update_ticket_status,
+    close_ticket,
+    delete_ticket,
+    search_tickets,
+    get_ticket_details,
+    get_comments_page,
+    get_ticket_changes,
+    update_ticket,
+    get_api_token_user,
+    get_api_tokens,
+    revoke_api_token,
+    get_changes,
+    get_change_bounds,
+    archive_closed_tickets,
+    get_archived_tickets_page,
+    is_ticket_archived,
+)
+
+# Every query here must be answered from an index. get_all_tickets() and
+# get_categories() return whole tables by design, and prune_changes() is a
+# maintenance job, so they are not listed.
+INDEXED_CALLS = {
+    "get_tickets_for_user": lambda: get_tickets_for_user(1),
+    "get_ticket": lambda: get_ticket(1),
+    "get_comments_for_ticket": lambda: get_comments_for_ticket(1),
+    "get_user": lambda: get_user("nobody", "secret"),
+    "username_exists": lambda: username_exists("nobody"),
+    "update_ticket_status": lambda: update_ticket_status(1, "in progress"),
+    "close_ticket": lambda: close_ticket(1),
+    "delete_ticket": lambda: delete_ticket(1),
+    "page_first": lambda: get_tickets_page(),
+    "page_after": lambda: get_tickets_page(after="5:2024-01-01 00:00:00"),
+    "page_before": lambda: get_tickets_page(before="5:2024-01-01 00:00:00"),
+    "page_status": lambda: get_tickets_page(status="open"),
+    "page_category": lambda: get_tickets_page(category_id=1),
+    "page_username": lambda: get_tickets_page(username="nobody"),
+    "page_user": lambda: get_tickets_page(user_id=1, include_closed=False),
+    "get_ticket_details": lambda: (
+        insert_ticket(1, 1, "Planned", "Has comments"),
+        get_ticket_details(1, before=10),
+    ),
+    "get_comments_page": lambda: get_comments_page(1, after=5),
+    "changes_since": lambda: get_ticket_changes(
+        updated_since="2024-01-01 00:00:00", after=5
+    ),
+    "changes_user": lambda: get_ticket_changes(user_id=1),
+    "update_ticket": lambda: update_ticket(1, {"title": "Renamed"}),
+    "api_token_user": lambda: get_api_token_user("token"),
+    "api_tokens_for_user": lambda: get_api_tokens("nobody"),
+    "revoke_api_token": lambda: revoke_api_token(1),
+    "changes_admin": lambda: get_changes(5),
+    "changes_owner": lambda: get_changes(5, owner_id=1),
+    "change_bounds": lambda: (
+        insert_ticket(1, 1, "Logged", "Makes a change"),
+        get_change_bounds(),
+    ),
+    "archive": lambda: (
+        insert_ticket(1, 1, "Old", "Long closed", status="closed"),
+        archive_closed_tickets(days=-1),
+    ),
+    "get_ticket_archived": lambda: get_ticket(999),
+    "comments_archived": lambda: get_comments_for_ticket(999),
+    "details_archived": lambda: (
+        archive_closed_tickets(days=-1),
+        get_ticket_details(999),
+    ),
+    "comments_page_archived": lambda: get_comments_page(999, before=5),
+    "is_ticket_archived": lambda: is_ticket_archived(1),
+    "archive_page_first": lambda: get_archived_tickets_page(),
+    "archive_page_after": lambda: get_archived_tickets_page(after=50),
+    "search_admin": lambda: search_tickets("printer"),
+    "search_user": lambda: search_tickets("printer", user_id=1),
+}
+
+QUERY = re.compile(r"^\s*(WITH|SELECT|UPDATE|DELETE)\b", re.IGNORECASE)
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+def capture_queries(call):
+    conn = get_db_connection()
+    statements = []
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if QUERY.match(s)]
+
+
+@pytest.mark.parametrize("name", sorted(INDEXED_CALLS))
+def test_query_uses_an_index(name):
+    queries = capture_queries(INDEXED_CALLS[name])
+    assert queries, f"{name} issued no queries"
+
+    conn = get_db_connection()
+    # Scanning a CTE or subquery result is fine; only stored tables count
+    tables = {
+        row[0]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    for query in queries:
+        plan = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+        details = [row[3] for row in plan]
+        scans = [
+            d for d in details if FULL_SCAN.match(d) and FULL_SCAN.match(d)[1] in tables
+        ]
+        assert not scans, f"{name} full-scans: {query.strip()} -> {details}"
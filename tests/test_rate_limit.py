@@ -0,0 +1,121 @@
+import pytest
+
+import rate_limit
+from rate_limit import Limit, MemoryBackend, SqliteBackend, parse_limit
+
+
+@pytest.fixture(autouse=True)
+def limits_on(monkeypatch):
+    monkeypatch.setattr("rate_limit.RATE_LIMIT_ENABLED", True)
+
+
+def set_limit(monkeypatch, name, text):
+    monkeypatch.setitem(rate_limit._limits, name, parse_limit(text))
+
+
+def test_parse_limit():
+    assert parse_limit("10/minute").interval == 6
+    assert parse_limit("3/1.5").period == 1.5
+    assert parse_limit(" ") is None
+    for bad in ("ten/minute", "10/fortnight", "0/minute", "10"):
+        with pytest.raises(ValueError):
+            parse_limit(bad)
+
+
+@pytest.mark.parametrize(
+    "make", [MemoryBackend, lambda: SqliteBackend(":memory:")], ids=["memory", "sqlite"]
+)
+def test_bucket_allows_a_burst_then_refills(make):
+    backend = make()
+    limit = Limit(3, 30)
+
+    assert [backend.take("a", limit, 100.0) for _ in range(3)] == [0, 0, 0]
+    assert backend.take("a", limit, 100.0) == pytest.approx(10)
+    # Other keys have buckets of their own
+    assert backend.take("b", limit, 100.0) == 0
+
+    # One token back every period/count seconds, and never more than count
+    assert backend.take("a", limit, 105.0) == pytest.approx(5)
+    assert backend.take("a", limit, 110.0) == 0
+    assert backend.take("a", limit, 110.0) == pytest.approx(10)
+    assert [backend.take("a", limit, 500.0) for _ in range(4)][-1] > 0
+
+
+def test_sqlite_buckets_are_shared_between_connections(tmp_path):
+    path = str(tmp_path / "limits.db")
+    first, second = SqliteBackend(path), SqliteBackend(path)
+    limit = Limit(2, 60)
+
+    assert first.take("login|ip:1", limit, 0.0) == 0
+    assert second.take("login|ip:1", limit, 0.0) == 0
+    assert first.take("login|ip:1", limit, 0.0) == pytest.approx(30)
+
+
+def test_memory_backend_drops_full_buckets_when_over_capacity():
+    backend = MemoryBackend(max_keys=4)
+    limit = Limit(1, 10)
+    for i in range(4):
+        backend.take(f"old{i}", limit, 0.0)
+    backend.take("new", limit, 100.0)
+    assert set(backend._full_at) == {"new"}
+
+
+def test_login_gets_429_with_retry_after(client, monkeypatch):
+    set_limit(monkeypatch, "login", "2/minute")
+    form = {"username": "nobody", "password": "wrong"}
+
+    assert client.post("/login", data=form).status_code == 302
+    assert client.post("/login", data=form).status_code == 302
+    res = client.post("/login", data=form)
+    assert res.status_code == 429
+    assert res.headers["Retry-After"] == "30"
+    assert b"Too many requests" in res.data
+
+    # Another address has its own bucket
+    res = client.post("/login", data=form, environ_base={"REMOTE_ADDR": "10.0.0.9"})
+    assert res.status_code == 302
+
+
+def test_signed_in_users_are_limited_per_user(client, monkeypatch):
+    set_limit(monkeypatch, "check_username", "1/minute")
+    for user_id in (1, 2):
+        with client.session_transaction() as sess:
+            sess.update(user_id=user_id, username=f"u{user_id}", role="user")
+        assert client.get("/check_username?username=x").status_code == 200
+        assert client.get("/check_username?username=x").status_code == 429
+
+
+def test_signup_page_views_are_not_counted(client, monkeypatch):
+    set_limit(monkeypatch, "signup", "1/minute")
+    for _ in range(3):
+        assert client.get("/signup").status_code == 200
+    form = {"username": "a", "email": "", "password": "", "confirm_password": ""}
+    assert client.post("/signup", data=form).status_code == 200
+    assert client.post("/signup", data=form).status_code == 429
+
+
+def test_forwarded_for_is_used_only_behind_configured_proxies(client, monkeypatch):
+    set_limit(monkeypatch, "check_username", "1/minute")
+    spoofed = {"X-Forwarded-For": "1.1.1.1"}
+    assert client.get("/check_username", headers=spoofed).status_code == 200
+    # Not trusted by default, so a new header value doesn't get a new bucket
+    res = client.get("/check_username", headers={"X-Forwarded-For": "2.2.2.2"})
+    assert res.status_code == 429
+
+    monkeypatch.setattr("rate_limit.RATE_LIMIT_PROXIES", 1)
+    res = client.get("/check_username", headers={"X-Forwarded-For": "6.6.6.6, 2.2.2.2"})
+    assert res.status_code == 200
+    res = client.get("/check_username", headers={"X-Forwarded-For": "7.7.7.7, 2.2.2.2"})
+    assert res.status_code == 429
+
+
+def test_disabled_limits_and_backend_errors_let_requests_through(client, monkeypatch):
+    set_limit(monkeypatch, "check_username", "1/minute")
+    monkeypatch.setattr("rate_limit.RATE_LIMIT_ENABLED", False)
+    for _ in range(3):
+        assert client.get("/check_username").status_code == 200
+
+    monkeypatch.setattr("rate_limit.RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr("rate_limit.backend", SqliteBackend("/nonexistent/dir/x.db"))
+    for _ in range(3):
+        assert client.get("/check_username").status_code == 200
@@ -0,0 +1,70 @@
+import sqlite3
+
+import database_operations
+from database_operations import (
+    get_categories,
+    get_username,
+    insert_user,
+    invalidate_reference_cache,
+    reference_cache_stats,
+)
+from reference_cache import ReferenceCache
+
+
+def add_category_from_other_worker(name):
+    other = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    other.execute("INSERT INTO categories (category_name) VALUES (?)", (name,))
+    other.commit()
+    other.close()
+
+
+def test_categories_are_served_from_cache():
+    first = get_categories()
+    second = get_categories()
+
+    assert first == ((1, "General"),)
+    assert second is first
+    assert reference_cache_stats()["categories"] == {"hits": 1, "misses": 1, "size": 1}
+
+
+def test_change_from_another_worker_invalidates():
+    get_categories()
+    add_category_from_other_worker("Hardware")
+
+    assert [name for _, name in get_categories()] == ["General", "Hardware"]
+
+
+def test_explicit_invalidation_and_ttl(monkeypatch):
+    loads = []
+    cache = ReferenceCache("demo", lambda key: loads.append(key) or key, ttl=60)
+
+    cache.get("a")
+    cache.get("a")
+    cache.invalidate()
+    cache.get("a")
+    assert loads == ["a", "a"]
+
+    cache.ttl = 0
+    cache.get("a")
+    assert loads == ["a", "a", "a"]
+
+
+def test_username_lookup_is_cached_and_misses_are_not():
+    insert_user("kim", "kim@mail.com", "pass123", "user")
+
+    assert get_username(1) == "kim"
+    assert get_username(1) == "kim"
+    assert get_username(99) is None
+    assert reference_cache_stats()["usernames"]["hits"] == 1
+    assert reference_cache_stats()["usernames"]["size"] == 1
+
+    invalidate_reference_cache("usernames")
+    assert reference_cache_stats()["usernames"]["size"] == 0
+
+
+def test_cache_stats_is_admin_only(client):
+    assert client.get("/cache_stats").status_code == 403
+
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="admin", role="admin")
+    assert "categories" in client.get("/cache_stats").get_json()
@@ -0,0 +1,79 @@
+from database_operations import (
+    insert_user,
+    insert_ticket,
+    insert_comment,
+    close_ticket,
+    delete_ticket,
+    search_tickets,
+    rebuild_search_index,
+    build_match_query,
+    SNIPPET_START,
+    get_db_connection,
+)
+
+
+def test_search_matches_tickets_and_comments():
+    insert_user("dave", "dave@mail.com", "pass123", "user")
+    insert_ticket(1, 1, "Printer jammed", "Paper stuck in tray two")
+    insert_ticket(1, 1, "VPN drops", "Connection resets hourly")
+    insert_comment(2, 1, "Replaced the printer cable as well")
+
+    results = search_tickets("printer")
+    assert {r[0] for r in results} == {1, 2}
+    assert all(SNIPPET_START in r[3] for r in results)
+
+    assert [r[0] for r in search_tickets("papers")] == [1]  # porter stemming
+
+
+def test_user_search_is_limited_to_own_open_tickets():
+    insert_ticket(1, 1, "Laptop battery", "Mine")
+    insert_ticket(2, 1, "Laptop screen", "Someone else's")
+    insert_ticket(1, 1, "Laptop dock", "Closed one")
+    close_ticket(3)
+
+    assert [r[0] for r in search_tickets("laptop", user_id=1)] == [1]
+    assert len(search_tickets("laptop")) == 3
+
+
+def test_index_follows_deletes_and_rebuilds():
+    insert_ticket(1, 1, "Keyboard", "Sticky keys")
+    delete_ticket(1)
+    assert search_tickets("keyboard") == []
+
+    rebuild_search_index()
+    assert search_tickets("keyboard") == []
+
+
+def test_admin_search_reads_older_windows_to_fill_the_page(monkeypatch):
+    monkeypatch.setattr("database_operations.SEARCH_CANDIDATES", 2)
+    for n in range(3):
+        insert_ticket(1, 1, f"Monitor {n}", "Flickers")
+    # Newer matches that would fill a window without adding tickets
+    for _ in range(4):
+        insert_comment(3, 1, "Monitor still flickers")
+    conn = get_db_connection()
+    conn.execute(
+        "INSERT INTO tickets_fts (rowid, title, description) "
+        "VALUES (99, 'Monitor gone', 'Stale')"
+    )
+    conn.commit()
+
+    assert {r[0] for r in search_tickets("monitor", limit=3)} == {1, 2, 3}
+    assert len(search_tickets("monitor", limit=2)) == 2
+
+
+def test_match_query_quotes_user_input():
+    assert build_match_query('  "NEAR( x') == '"""NEAR(" "x"'
+    assert build_match_query("   ") is None
+    assert search_tickets('"unbalanced AND (') == []
+
+
+def test_search_route_escapes_snippets(client):
+    insert_ticket(1, 1, "<script>alert(1)</script> crash", "Boom")
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="admin", role="admin")
+
+    res = client.get("/search?q=crash")
+    assert res.status_code == 200
+    assert b"<mark>crash</mark>" in res.data
+    assert b"<script>alert" not in res.data
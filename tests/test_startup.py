@@ -0,0 +1,95 @@
+import os
+import sqlite3
+
+import bcrypt
+import pytest
+
+import startup
+from database_operations import get_db_connection, insert_user
+from setup_db import SAMPLE_USERS, seed_sample_data
+
+
+def count(table):
+    conn = get_db_connection()
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_seeding_fills_an_empty_database_once():
+    conn = get_db_connection()
+    # conftest adds a category, so empty means no users
+    conn.execute("DELETE FROM categories")
+    conn.commit()
+
+    assert seed_sample_data(conn) is True
+    counts = {t: count(t) for t in ("users", "categories", "tickets", "comments")}
+    assert counts == {"users": 10, "categories": 10, "tickets": 10, "comments": 10}
+
+    assert seed_sample_data(conn) is False
+    assert {t: count(t) for t in counts} == counts
+
+
+def test_seeding_never_touches_a_database_with_users():
+    insert_user("ada", "ada@mail.com", "pass123", "admin")
+    assert seed_sample_data(get_db_connection()) is False
+    assert count("users") == 1
+    assert count("tickets") == 0
+
+
+@pytest.mark.sample_data
+def test_sample_users_can_log_in(client):
+    username, password, _ = SAMPLE_USERS[0]
+    assert count("tickets") == 10
+    res = client.post("/login", data={"username": username, "password": password})
+    assert res.status_code == 302
+    with client.session_transaction() as sess:
+        assert sess["username"] == username
+
+
+def test_precomputed_hashes_match_the_sample_passwords():
+    for username, password, hashed in SAMPLE_USERS:
+        assert bcrypt.checkpw(password.encode(), hashed.encode()), username
+
+
+def test_parse_importtime_keeps_top_levels():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       100 |        100 |   json.decoder\n"
+        "import time:       200 |        300 | json\n"
+        "import time:        50 |         50 |     deep\n"
+        "[2026-01-01] INFO app: not an import line\n"
+    )
+    assert startup.parse_importtime(stderr) == [
+        ("json.decoder", 0.0001),
+        ("json", 0.0003),
+    ]
+
+
+def test_cold_start_fits_the_time_to_first_response_budget(tmp_path):
+    db_name = str(tmp_path / "cold.db")
+    result = startup.measure(
+        db_name,
+        {
+            "SEED_SAMPLE_DATA": "true",
+            "METRICS_DIR": str(tmp_path),
+            "LOG_DIR": str(tmp_path),
+        },
+    )
+
+    assert result["status"] == 200
+    assert [name for name, _ in result["phases"]] == [
+        "logging",
+        "extensions",
+        "static assets",
+        "migrations",
+        "sample data",
+        "username index",
+    ]
+    # Wall-clock time only means something without pytest-xdist workers
+    # starting their own apps on the same CPUs
+    if "PYTEST_XDIST_WORKER" not in os.environ:
+        assert result["total"] <= startup.TIME_TO_FIRST_RESPONSE_BUDGET, startup.report(
+            result
+        )
+    conn = sqlite3.connect(db_name)
+    assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 10
+    conn.close()
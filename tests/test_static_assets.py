@@ -0,0 +1,83 @@
+import gzip
+import os
+import re
+
+import pytest
+
+import static_assets
+
+STYLES = os.path.join(static_assets.STATIC_DIR, "styles.css")
+
+
+def styles_url(client):
+    page = client.get("/").get_data(as_text=True)
+    (url,) = re.findall(r'href="(/assets/styles\.[0-9a-f]{12}\.css)"', page)
+    return url
+
+
+def test_pages_link_fingerprinted_assets(client):
+    with open(STYLES, "rb") as f:
+        digest = static_assets.fingerprint(f.read())
+    assert styles_url(client) == f"/assets/styles.{digest}.css"
+
+
+def test_assets_are_immutable_and_plain_without_accept_encoding(client):
+    res = client.get(styles_url(client), headers={"Accept-Encoding": "identity"})
+    assert res.status_code == 200
+    assert res.mimetype == "text/css"
+    assert "Content-Encoding" not in res.headers
+    assert res.headers["Vary"] == "Accept-Encoding"
+    assert res.cache_control.immutable
+    assert res.cache_control.max_age == 365 * 24 * 3600
+    with open(STYLES, "rb") as f:
+        assert res.data == f.read()
+    res.close()
+
+
+def test_smallest_accepted_encoding_is_served(client):
+    url = styles_url(client)
+    res = client.get(url, headers={"Accept-Encoding": "gzip, deflate"})
+    assert res.headers["Content-Encoding"] == "gzip"
+    with open(STYLES, "rb") as f:
+        assert gzip.decompress(res.data) == f.read()
+    res.close()
+
+    if static_assets.brotli is None:
+        pytest.skip("brotli is not installed")
+    res = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert res.headers["Content-Encoding"] == "br"
+    with open(STYLES, "rb") as f:
+        assert static_assets.brotli.decompress(res.data) == f.read()
+    res.close()
+
+
+def test_unknown_fingerprints_are_not_served(client):
+    assert client.get("/assets/styles.000000000000.css").status_code == 404
+    assert client.get("/assets/../app.py").status_code == 404
+
+
+def test_build_is_repeatable_and_skips_existing_files(tmp_path):
+    source, out = tmp_path / "static", tmp_path / "build"
+    (source / "js").mkdir(parents=True)
+    (source / "site.css").write_text("body { color: red; }\n" * 50)
+    (source / "js" / "app.js").write_text("console.log('hi');\n")
+    (source / "logo.png").write_bytes(b"\x89PNG not really")
+
+    manifest = static_assets.build(str(source), str(out))
+    assert set(manifest) == {"site.css", "js/app.js", "logo.png"}
+    assert manifest["js/app.js"]["path"].startswith("js/app.")
+    # Images are already compressed
+    assert set(manifest["logo.png"]["sizes"]) == {"identity"}
+    css = manifest["site.css"]
+    assert css["sizes"]["gzip"] < css["sizes"]["identity"]
+    built = out / css["path"]
+    first = (built.with_name(built.name + ".gz")).stat().st_mtime_ns
+
+    assert static_assets.build(str(source), str(out)) == manifest
+    assert (built.with_name(built.name + ".gz")).stat().st_mtime_ns == first
+
+    # A changed file gets a new name; the old one stays for cached pages
+    (source / "site.css").write_text("body { color: blue; }\n")
+    changed = static_assets.build(str(source), str(out))
+    assert changed["site.css"]["path"] != css["path"]
+    assert built.exists()
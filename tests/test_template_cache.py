@@ -0,0 +1,92 @@
+import pytest
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+import app as flask_app_module
+import template_cache
+from database_operations import insert_ticket, insert_user
+from template_cache import FragmentCacheExtension, fragments
+
+
+@pytest.fixture(autouse=True)
+def empty_fragments():
+    fragments.reset()
+    yield
+    fragments.reset()
+
+
+def log_in(client, user_id, username, role="user"):
+    with client.session_transaction() as sess:
+        sess.update(user_id=user_id, username=username, role=role)
+
+
+def test_navbar_is_rendered_once_per_user(client):
+    insert_user("ada", "ada@mail.com", "pass123", "user")
+    insert_user("bob", "bob@mail.com", "pass123", "user")
+    insert_ticket(1, 1, "Printer", "Jammed")
+
+    log_in(client, 1, "ada")
+    for _ in range(3):
+        assert b"Logged in as ada" in client.get("/dashboard").data
+    # The navbar and the chrome once each, then served from the cache
+    assert fragments.stats() == {"hits": 4, "misses": 2, "size": 2}
+
+    log_in(client, 2, "bob")
+    page = client.get("/dashboard").data
+    assert b"Logged in as bob" in page
+    assert b"Logged in as ada" not in page
+    # Same chrome for the same role; a navbar of bob's own
+    assert fragments.stats()["size"] == 3
+
+    assert b"Logged in as bob" in client.get("/ticket/1").data
+
+
+def render(env, template, **context):
+    return env.get_template(template).render(**context)
+
+
+def test_cache_tag_keys_on_its_values_and_skips_auto_reload(monkeypatch):
+    loader = DictLoader(
+        {"page.html": "{% cache 'greeting', name %}Hi {{ name }}{{ n }}{% endcache %}"}
+    )
+    env = Environment(loader=loader, extensions=[FragmentCacheExtension])
+    env.auto_reload = False
+
+    assert render(env, "page.html", name="ada", n=1) == "Hi ada1"
+    # n isn't part of the key, so the first rendering is reused
+    assert render(env, "page.html", name="ada", n=2) == "Hi ada1"
+    assert render(env, "page.html", name="bob", n=3) == "Hi bob3"
+
+    env.auto_reload = True
+    assert render(env, "page.html", name="ada", n=4) == "Hi ada4"
+    monkeypatch.setattr("template_cache.TEMPLATE_FRAGMENT_CACHE", False)
+    env.auto_reload = False
+    assert render(env, "page.html", name="ada", n=5) == "Hi ada5"
+
+
+def test_bytecode_cache_is_reused_until_the_template_changes(tmp_path):
+    source = {"page.html": "v1"}
+    cache_dir = tmp_path / "jinja"
+    cache_dir.mkdir()
+
+    def fresh_env():
+        return Environment(
+            loader=DictLoader(source),
+            bytecode_cache=FileSystemBytecodeCache(str(cache_dir)),
+        )
+
+    assert render(fresh_env(), "page.html") == "v1"
+    (cached,) = cache_dir.iterdir()
+    written = cached.stat().st_mtime_ns
+
+    assert render(fresh_env(), "page.html") == "v1"
+    assert cached.stat().st_mtime_ns == written
+
+    source["page.html"] = "v2"
+    assert render(fresh_env(), "page.html") == "v2"
+
+
+def test_app_uses_both_caches():
+    env = flask_app_module.app.jinja_env
+    assert isinstance(env.bytecode_cache, FileSystemBytecodeCache)
+    assert env.bytecode_cache.directory == template_cache.TEMPLATE_BYTECODE_DIR
+    assert any(isinstance(e, FragmentCacheExtension) for e in env.extensions.values())
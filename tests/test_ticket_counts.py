@@ -0,0 +1,60 @@
+import sqlite3
+
+import database_operations
+from database_operations import (
+    check_ticket_counts,
+    close_ticket,
+    delete_ticket,
+    get_ticket_counts,
+    insert_ticket,
+    update_ticket_status,
+)
+
+
+def test_counters_follow_inserts_updates_and_deletes():
+    insert_ticket(1, 1, "One", "First")
+    insert_ticket(1, 1, "Two", "Second")
+    insert_ticket(1, 1, "Three", "Third", status="in progress")
+    assert get_ticket_counts() == {1: {"open": 2, "in progress": 1}}
+
+    update_ticket_status(1, "in progress")
+    close_ticket(2)
+    assert get_ticket_counts() == {1: {"in progress": 2, "closed": 1}}
+
+    delete_ticket(3)
+    assert get_ticket_counts() == {1: {"in progress": 1, "closed": 1}}
+    assert check_ticket_counts() == []
+
+
+def test_unchanged_status_does_not_double_count():
+    insert_ticket(1, 1, "One", "First")
+    update_ticket_status(1, "open")
+
+    assert get_ticket_counts() == {1: {"open": 1}}
+
+
+def test_checker_reports_and_repairs_drift():
+    insert_ticket(1, 1, "One", "First")
+    insert_ticket(1, 1, "Two", "Second")
+    other = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    other.execute("UPDATE ticket_counts SET total = 7")
+    other.execute("INSERT INTO ticket_counts VALUES (9, 'closed', 3)")
+    other.commit()
+    other.close()
+
+    assert check_ticket_counts() == [(1, "open", 7, 2), (9, "closed", 3, 0)]
+    assert check_ticket_counts(repair=True)
+    assert check_ticket_counts() == []
+    assert get_ticket_counts() == {1: {"open": 2}}
+
+
+def test_admin_dashboard_shows_summary(client):
+    insert_ticket(1, 1, "One", "First")
+    insert_ticket(1, 1, "Two", "Second", status="closed")
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="admin", role="admin")
+
+    res = client.get("/dashboard")
+    assert res.status_code == 200
+    assert b"dashboard-summary" in res.data
+    assert b"<td>General</td>" in res.data
@@ -0,0 +1,60 @@
+from database_operations import (
+    insert_user,
+    insert_ticket,
+    insert_comment,
+    get_ticket_details,
+    get_comments_page,
+)
+
+
+def seed_thread(comment_count):
+    insert_user("lena", "lena@mail.com", "pass123", "user")
+    insert_ticket(1, 1, "Incident", "Long running")
+    for i in range(comment_count):
+        insert_comment(1, 1, f"Update {i + 1}")
+
+
+def test_details_load_ticket_and_newest_comments(monkeypatch):
+    monkeypatch.setattr("database_operations.COMMENT_PAGE_SIZE", 3)
+    seed_thread(5)
+
+    details = get_ticket_details(1)
+    assert details["ticket"][3] == "Incident"
+    assert [c[3] for c in details["comments"]] == ["Update 3", "Update 4", "Update 5"]
+    assert details["has_older"] is True
+
+    older = get_ticket_details(1, before=3)
+    assert [c[0] for c in older["comments"]] == [1, 2]
+    assert older["has_older"] is False
+
+    assert get_ticket_details(99) is None
+
+
+def test_comments_after_an_id_are_deltas_only():
+    seed_thread(4)
+
+    comments, has_more = get_comments_page(1, after=2, limit=1)
+    assert [c[0] for c in comments] == [3]
+    assert has_more is True
+
+    comments, has_more = get_comments_page(1, after=4)
+    assert comments == []
+    assert has_more is False
+
+
+def test_comments_endpoint(client):
+    seed_thread(2)
+    assert client.get("/ticket/1/comments?after=0").status_code == 401
+
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="lena", role="user")
+
+    data = client.get("/ticket/1/comments?after=1").get_json()
+    assert [c["message"] for c in data["comments"]] == ["Update 2"]
+    assert data["comments"][0]["username"] == "lena"
+    assert client.get("/ticket/1/comments").status_code == 400
+
+    res = client.get("/ticket/1")
+    assert res.status_code == 200
+    assert b"Update 2" in res.data
+    assert client.get("/ticket/42").status_code == 404
@@ -0,0 +1,112 @@
+import html
+import re
+
+from database_operations import (
+    TICKET_SUMMARY_CHARS,
+    get_db_connection,
+    get_ticket,
+    get_tickets_page,
+    insert_ticket,
+    insert_user,
+)
+
+
+def seed_tickets(count, **kwargs):
+    for i in range(count):
+        insert_ticket(1, 1, f"Ticket {i + 1}", "Paged", **kwargs)
+
+
+def test_pages_walk_forward_and_back():
+    seed_tickets(5)
+
+    first = get_tickets_page(page_size=2)
+    assert [t.ticket_id for t in first["tickets"]] == [5, 4]
+    assert first["prev"] is None
+
+    second = get_tickets_page(page_size=2, after=first["next"])
+    assert [t.ticket_id for t in second["tickets"]] == [3, 2]
+
+    last = get_tickets_page(page_size=2, after=second["next"])
+    assert [t.ticket_id for t in last["tickets"]] == [1]
+    assert last["next"] is None
+
+    back = get_tickets_page(page_size=2, before=last["prev"])
+    assert [t.ticket_id for t in back["tickets"]] == [3, 2]
+
+
+def test_oldest_sort_and_status_filter():
+    seed_tickets(3)
+    seed_tickets(2, status="closed")
+
+    page = get_tickets_page(sort="oldest", status="closed")
+    assert [t.ticket_id for t in page["tickets"]] == [4, 5]
+
+    page = get_tickets_page(include_closed=False)
+    assert all(t.status != "closed" for t in page["tickets"])
+
+
+def test_username_filter():
+    insert_user("carol", "carol@mail.com", "pass123", "user")
+    insert_ticket(1, 1, "Carol's", "Mine")
+    insert_ticket(2, 1, "Someone else's", "Not mine")
+
+    page = get_tickets_page(username="carol")
+    assert [t.summary for t in page["tickets"]] == ["Mine"]
+
+
+def test_admin_dashboard_renders_page_links(client, monkeypatch):
+    monkeypatch.setattr("database_operations.DASHBOARD_PAGE_SIZE", 2)
+    seed_tickets(3)
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="admin", role="admin")
+
+    res = client.get("/dashboard?status=open")
+    assert res.status_code == 200
+    assert b"Next" in res.data
+    assert b"Previous" not in res.data
+
+    res = client.get("/dashboard?after=not-a-cursor")
+    assert res.status_code == 400
+
+
+def test_page_links_keep_the_dashboard_filters(client, monkeypatch):
+    monkeypatch.setattr("database_operations.DASHBOARD_PAGE_SIZE", 2)
+    insert_user("ada", "ada@mail.com", "pass123", "user")
+    get_db_connection().execute(
+        "INSERT INTO categories (category_name) VALUES ('Hardware')"
+    )
+    for i in range(3):
+        insert_ticket(1, 2, "Paged", f"Match {i}")
+        insert_ticket(1, 1, "Paged", f"Other category {i}")
+        insert_ticket(2, 2, "Paged", f"Other user {i}")
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="ada", role="admin")
+
+    page = client.get("/dashboard?category=2&user=ada&sort=oldest").get_data(
+        as_text=True
+    )
+    link = html.unescape(re.search(r'href="([^"]*after=[^"]*)"', page).group(1))
+    assert "category=2" in link and "user=ada" in link and "sort=oldest" in link
+
+    page = client.get(link).get_data(as_text=True)
+    assert "Match 2" in page
+    assert "Match 0" not in page and "Other" not in page
+
+
+def test_user_dashboard_page_links_carry_only_the_sort(client, monkeypatch):
+    monkeypatch.setattr("database_operations.DASHBOARD_PAGE_SIZE", 1)
+    seed_tickets(2)
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="ada", role="user")
+
+    page = client.get("/dashboard").get_data(as_text=True)
+    link = html.unescape(re.search(r'href="([^"]*after=[^"]*)"', page).group(1))
+    assert re.fullmatch(r"/dashboard\?after=[^&]+&sort=newest", link)
+
+
+def test_lists_carry_a_summary_not_the_whole_description():
+    insert_ticket(1, 1, "Wordy", "x" * 300)
+
+    (ticket,) = get_tickets_page()["tickets"]
+    assert ticket.summary == "x" * TICKET_SUMMARY_CHARS + "..."
+    assert get_ticket(1).description == "x" * 300
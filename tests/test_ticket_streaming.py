@@ -0,0 +1,165 @@
+import sqlite3
+import tracemalloc
+
+import pytest
+
+import database_operations
+import metrics
+from database_operations import get_ticket, insert_ticket, iter_tickets
+
+
+@pytest.fixture
+def admin(client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, username="admin", role="admin")
+    return client
+
+
+def seed_tickets(count):
+    conn = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    conn.executemany(
+        "INSERT INTO tickets (user_id, category_id, title, description, status) "
+        "VALUES (1, 1, ?, ?, 'open')",
+        ((f"Ticket {i}", f"Streamed ticket number {i} " * 8) for i in range(count)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def streamed_peak(client):
+    """Returns (peak bytes allocated while streaming /dashboard/all, body)."""
+    tracemalloc.start()
+    response = client.get("/dashboard/all", buffered=False)
+    length, tail = 0, ""
+    for chunk in response.response:
+        length += len(chunk)
+        tail = (tail + chunk.decode())[-2000:]
+    response.close()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, length, tail
+
+
+def test_iter_tickets_filters_and_sorts():
+    insert_ticket(1, 1, "Open", "First")
+    insert_ticket(1, 1, "Closed", "Second", status="closed")
+    insert_ticket(1, 1, "Open", "Third")
+
+    assert [t.ticket_id for t in iter_tickets()] == [3, 2, 1]
+    assert [t.ticket_id for t in iter_tickets(sort="oldest", status="open")] == [1, 3]
+
+
+def test_memory_stays_flat_as_rows_grow(admin, monkeypatch):
+    monkeypatch.setattr("database_operations.STREAM_BATCH_SIZE", 50)
+    # tracemalloc sees every thread; keep the metrics flusher's snapshot of
+    # earlier tests' metrics out of the peak
+    metrics.reset()
+    seed_tickets(500)
+    streamed_peak(admin)  # compile the template and warm caches
+    small_peak, small_length, _ = streamed_peak(admin)
+
+    seed_tickets(4500)
+    large_peak, large_length, tail = streamed_peak(admin)
+
+    assert large_length > 8 * small_length
+    assert "</html>" in tail
+    # Ten times the rows, roughly the same memory
+    assert large_peak < small_peak * 1.5
+
+
+def test_disconnect_ends_the_read_transaction(admin, monkeypatch):
+    monkeypatch.setattr("database_operations.STREAM_BATCH_SIZE", 50)
+    monkeypatch.setattr("app.STREAM_BUFFER_CHARS", 1)
+    seed_tickets(500)
+    # Something else keeping the generator alive (a traceback, the server)
+    # must not keep its snapshot open
+    streams = []
+
+    def kept_iter_tickets(**filters):
+        streams.append(iter_tickets(**filters))
+        return streams[-1]
+
+    monkeypatch.setattr("app.iter_tickets", kept_iter_tickets)
+    opened = []
+
+    def open_connection(db_name):
+        opened.append(open_connection.real(db_name))
+        return opened[-1]
+
+    open_connection.real = database_operations._open_connection
+    monkeypatch.setattr("database_operations._open_connection", open_connection)
+
+    response = admin.get("/dashboard/all", buffered=False)
+    next(iter(response.response))
+    (conn,) = opened
+    assert conn.in_transaction
+    response.close()
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+
+
+@pytest.mark.file_db
+def test_queries_between_rows_leave_the_snapshot_alone(monkeypatch):
+    monkeypatch.setattr("database_operations.STREAM_BATCH_SIZE", 2)
+    for i in range(5):
+        insert_ticket(1, 1, f"Ticket {i}", "Before the stream")
+
+    seen = []
+    for ticket in iter_tickets(sort="oldest"):
+        seen.append(ticket.ticket_id)
+        if len(seen) == 1:
+            # What a template helper might do while the list renders
+            insert_ticket(1, 1, "Late", "Added mid-stream")
+            assert get_ticket(6).title == "Late"
+            assert not database_operations.get_db_connection().in_transaction
+
+    assert seen == [1, 2, 3, 4, 5]
+
+
+def test_page_keeps_session_and_filters(admin):
+    insert_ticket(1, 1, "Open", "Still open")
+    insert_ticket(1, 1, "Closed", "All done", status="closed")
+
+    response = admin.get("/dashboard/all?status=closed")
+    assert response.status_code == 200
+    assert response.headers["X-Accel-Buffering"] == "no"
+    html = response.get_data(as_text=True)
+    assert "All done" in html
+    assert "Still open" not in html
+    assert "admin" in html  # navbar rendered from the session
+
+
+def test_non_admin_is_redirected(client):
+    with client.session_transaction() as sess:
+        sess.update(user_id=2, username="bob", role="user")
+    response = client.get("/dashboard/all")
+    assert response.status_code == 302
+
+
+def test_bad_filter_gets_error_page(admin):
+    assert admin.get("/dashboard/all?sort=sideways").status_code == 400
+
+
+def test_failure_before_streaming_gets_error_page(admin, monkeypatch):
+    def broken(**filters):
+        raise sqlite3.OperationalError("disk I/O error")
+        yield
+
+    monkeypatch.setattr("app.iter_tickets", broken)
+    response = admin.get("/dashboard/all")
+    assert response.status_code == 500
+
+
+def test_failure_mid_stream_ends_list_with_message(admin, monkeypatch):
+    def flaky(**filters):
+        yield from iter_tickets(**filters)
+        raise sqlite3.OperationalError("disk I/O error")
+
+    insert_ticket(1, 1, "Fine", "Made it out")
+    monkeypatch.setattr("app.iter_tickets", flaky)
+    response = admin.get("/dashboard/all")
+    html = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert "Made it out" in html
+    assert "this list is incomplete" in html
+    assert "</html>" in html
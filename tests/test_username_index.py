@@ -0,0 +1,73 @@
+import sqlite3
+
+import database_operations
+from database_operations import (
+    insert_user,
+    username_exists,
+    usernames_exist,
+    sync_username_index,
+)
+from username_index import BloomFilter
+
+
+def count_user_queries(call):
+    statements = []
+    conn = database_operations.get_db_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        result = call()
+    finally:
+        conn.set_trace_callback(None)
+    return result, [s for s in statements if "FROM users" in s]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(1000, 0.01)
+    names = [f"user{i}" for i in range(1000)]
+    for name in names:
+        bloom.add(name)
+
+    assert all(name in bloom for name in names)
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_unknown_username_skips_the_database():
+    insert_user("grace", "grace@mail.com", "pass123", "user")
+    sync_username_index()
+
+    exists, queries = count_user_queries(lambda: username_exists("nobody-here"))
+    assert exists is False
+    assert queries == []
+
+    exists, queries = count_user_queries(lambda: username_exists("grace"))
+    assert exists is True
+    assert len(queries) == 1
+
+
+def test_index_sees_users_added_by_other_workers():
+    sync_username_index()
+    assert username_exists("heidi") is False
+
+    # Simulate another gunicorn worker writing through its own connection
+    other = sqlite3.connect(database_operations.DB_NAME, uri=True)
+    other.execute(
+        "INSERT INTO users (username, email, password, role) "
+        "VALUES ('heidi', 'heidi@mail.com', x'00', 'user')"
+    )
+    other.commit()
+    other.close()
+
+    assert username_exists("heidi") is True
+
+
+def test_batched_check(client):
+    insert_user("ivan", "ivan@mail.com", "pass123", "user")
+
+    assert usernames_exist(["ivan", "judy"]) == {"ivan": True, "judy": False}
+
+    res = client.post("/check_usernames", json={"usernames": ["ivan", "judy"]})
+    assert res.get_json() == {"results": {"ivan": True, "judy": False}}
+
+    res = client.post("/check_usernames", json={"usernames": "ivan"})
+    assert res.status_code == 400
@@ -0,0 +1,83 @@
+import hashlib
+import math
+import threading
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings, using double hashing."""
+
+    def __init__(self, capacity, fp_rate):
+        self.capacity = max(capacity, 1)
+        self.size = max(64, int(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+class UsernameIndex:
+    """Per-process Bloom filter of every username in the users table.
+
+    A miss means the username is definitely free; a hit only means it might
+    be taken and must be confirmed against the database. Users are only ever
+    appended (AUTOINCREMENT ids), so the index catches up with other workers
+    by loading rows above the highest user_id it has seen.
+    """
+
+    def __init__(self, fp_rate=0.01, min_capacity=1024):
+        self.fp_rate = fp_rate
+        self.min_capacity = min_capacity
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.bloom = BloomFilter(self.min_capacity, self.fp_rate)
+            self.max_user_id = 0
+            self.loaded = False
+
+    def needs_rebuild(self, incoming):
+        """True if adding incoming more names would exceed the filter's capacity."""
+        return self.bloom.count + incoming > self.bloom.capacity
+
+    def rebuild(self, rows):
+        """Replaces the filter with one sized for rows of (user_id, username)."""
+        rows = list(rows)
+        bloom = BloomFilter(max(self.min_capacity, len(rows) * 2), self.fp_rate)
+        for _, username in rows:
+            bloom.add(username)
+        with self._lock:
+            self.bloom = bloom
+            self.max_user_id = max((user_id for user_id, _ in rows), default=0)
+            self.loaded = True
+
+    def add_rows(self, rows):
+        """Adds (user_id, username) rows newer than anything seen so far."""
+        with self._lock:
+            for user_id, username in rows:
+                self.bloom.add(username)
+                self.max_user_id = max(self.max_user_id, user_id)
+            self.loaded = True
+
+    def add(self, username):
+        with self._lock:
+            self.bloom.add(username)
+
+    def might_contain(self, username):
+        return username in self.bloom